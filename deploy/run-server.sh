@@ -3,4 +3,5 @@ set -e
 # python3 create_db.py
 # alembic upgrade head
 # python3 seed_db.py
-uvicorn src.app:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+# One worker per CPU unless WEB_CONCURRENCY is set; kill -HUP for a rolling restart
+exec python3 -m src.server
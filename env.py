@@ -3,7 +3,65 @@ import os
 
 APP_ENV = os.getenv("APP_ENV")
 
+LOG_FILE = os.getenv("LOG_FILE", "logs.jsonl")
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", 50 * 1024 * 1024))
+LOG_FILE_BACKUP_COUNT = int(os.getenv("LOG_FILE_BACKUP_COUNT", 5))
+# Each process writes and rotates its own LOG_FILE with its pid in the name
+# (logs.<pid>.jsonl): size-based rotation is not safe with several processes
+# on one file, and the launcher always runs more than one. Only turn this off
+# for a single process, or ship stdout and rotate externally.
+LOG_FILE_PER_PROCESS = os.getenv("LOG_FILE_PER_PROCESS", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# "drop": shed DEBUG/INFO when the writer falls behind, "block": always wait
+LOG_QUEUE_POLICY = os.getenv("LOG_QUEUE_POLICY", "drop")
+# Keep 1 in N DEBUG records per call site (1 keeps everything)
+LOG_DEBUG_SAMPLE_EVERY = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", 100))
+# File/line/function in every record; costs a stack walk per log call
+LOG_CALLER_INFO = os.getenv("LOG_CALLER_INFO", "false").lower() == "true"
+
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Connections all processes on the host may hold together; each web worker
+# and each of DB_EXTRA_PROCESSES gets an equal share
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", 40))
+# Pools outside the WEB_CONCURRENCY workers: the replacement started during a
+# rolling restart and the RMQ worker
+DB_EXTRA_PROCESSES = int(os.getenv("DB_EXTRA_PROCESSES", 2))
+
+# Statements slower than this are logged; a sample of slow SELECTs is EXPLAINed
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 200))
+DB_EXPLAIN_SAMPLE_RATE = float(os.getenv("DB_EXPLAIN_SAMPLE_RATE", 0.05))
+DB_EXPLAIN_COOLDOWN_SECONDS = float(os.getenv("DB_EXPLAIN_COOLDOWN_SECONDS", 300))
+
+# Worker processes, set by src.server (CPU count unless given)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+HOST = os.getenv("HOST", "0.0.0.0")  # noqa: S104
+PORT = int(os.getenv("PORT", 8000))
+GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", 30))
+
+# How long startup waits for each dependency before serving without it
+DB_CONNECT_TIMEOUT_SECONDS = float(os.getenv("DB_CONNECT_TIMEOUT_SECONDS", 5))
+REDIS_CONNECT_TIMEOUT_SECONDS = float(os.getenv("REDIS_CONNECT_TIMEOUT_SECONDS", 2))
+RMQ_CONNECT_TIMEOUT_SECONDS = float(os.getenv("RMQ_CONNECT_TIMEOUT_SECONDS", 5))
+
+# /readyz is served from probes run on this interval in the background
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", 5))
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", 2))
+
+# Shared by every process on the host (set by src.server for its workers)
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+METRICS_FLUSH_INTERVAL_SECONDS = float(os.getenv("METRICS_FLUSH_INTERVAL_SECONDS", 5))
+
+# Loop lag is sampled every interval; stalls longer than the threshold are
+# logged with the blocking stack. A non-zero budget fails tests that block.
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", 0.1))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", 100))
+LOOP_BLOCK_BUDGET_MS = float(os.getenv("LOOP_BLOCK_BUDGET_MS", 0))
+
+# "none" (off), "memory" or "file" (JSON lines in TRACE_FILE)
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+# Share of new traces recorded; continued traces keep the caller's decision
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.01))
 
 REDIS_DATABASE_INDEX = int(os.getenv("REDIS_DATABASE_INDEX", 0))
 REDIS_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", 10))
@@ -12,5 +70,40 @@ REDIS_URL = os.getenv("REDIS_URL")
 RMQ_BROKER_URL= os.getenv("RMQ_BROKER_URL")
 RMQ_QUEUE= os.getenv("RMQ_QUEUE")
 RMQ_EXCHANGE= os.getenv("RMQ_EXCHANGE")
+RMQ_CODEC = os.getenv("RMQ_CODEC", "json")
+RMQ_MAX_RETRIES = int(os.getenv("RMQ_MAX_RETRIES", 5))
+RMQ_RETRY_BASE_DELAY_MS = int(os.getenv("RMQ_RETRY_BASE_DELAY_MS", 1000))
+RMQ_DEDUP_TTL_SECONDS = int(os.getenv("RMQ_DEDUP_TTL_SECONDS", 86400))
+RMQ_DEDUP_LEASE_SECONDS = int(os.getenv("RMQ_DEDUP_LEASE_SECONDS", 300))
+RMQ_QUEUE_HIGH_WATER_MARK = int(os.getenv("RMQ_QUEUE_HIGH_WATER_MARK", 10000))
+RMQ_DEPTH_POLL_INTERVAL_SECONDS = float(os.getenv("RMQ_DEPTH_POLL_INTERVAL_SECONDS", 5))
+RMQ_BACKPRESSURE_RETRY_AFTER_SECONDS = int(
+    os.getenv("RMQ_BACKPRESSURE_RETRY_AFTER_SECONDS", 30)
+)
+
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 100))
+
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 86400))
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", 30))
+
+# Upper bound for the adaptive limiter, defaults to the DB pool size + overflow
+CONCURRENCY_MAX_LIMIT = int(os.getenv("CONCURRENCY_MAX_LIMIT", 40))
+CONCURRENCY_TARGET_LATENCY_MS = int(os.getenv("CONCURRENCY_TARGET_LATENCY_MS", 250))
+CONCURRENCY_QUEUE_SIZE = int(os.getenv("CONCURRENCY_QUEUE_SIZE", 100))
+CONCURRENCY_MAX_WAIT_MS = int(os.getenv("CONCURRENCY_MAX_WAIT_MS", 1000))
+
+# Per-request deadline, clients may ask for less (or up to the max) with the
+# X-Request-Timeout header
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", 10))
+REQUEST_TIMEOUT_MAX_SECONDS = float(os.getenv("REQUEST_TIMEOUT_MAX_SECONDS", 60))
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+# Must outlive the slowest request, or a retry could run while the first is live
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 120))
+
+# Sent as X-Admin-Key to reach /admin; the endpoints are off while unset
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+# Upper bound for GET /admin/profile?seconds=
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
 
 ROOT_PATH = os.getenv("ROOT_PATH")
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""Encode/decode + validation throughput of the RMQ message codecs.
+
+    python3 -m scripts.benchmarks.bench_codec
+
+"legacy" is the path the worker used before codecs existed:
+json.dumps on publish, json.loads + UserCreate(**data) on consume.
+"""
+
+import json
+import timeit
+from collections.abc import Callable
+
+from src.rmq.codec import JsonCodec, MsgpackCodec, msgpack
+from src.schemas.user_schema import UserCreate
+
+MESSAGE = UserCreate(
+    name="benchmark_user", password="correct horse battery staple", org_id=42
+).model_dump()
+
+
+def cases() -> dict[str, Callable[[], object]]:
+    json_codec = JsonCodec()
+    json_body = json_codec.encode(MESSAGE)
+    benchmarks = {
+        "legacy.encode": lambda: json.dumps(MESSAGE).encode(),
+        "legacy.decode+validate": lambda: UserCreate(**json.loads(json_body.decode())),
+        "json.encode": lambda: json_codec.encode(MESSAGE),
+        "json.decode+validate": lambda: UserCreate.model_validate(
+            json_codec.decode(json_body)
+        ),
+        # pydantic parses the JSON itself, skipping the intermediate dict
+        "json.validate_json": lambda: UserCreate.model_validate_json(json_body),
+    }
+    if msgpack is not None:
+        msgpack_codec = MsgpackCodec()
+        msgpack_body = msgpack_codec.encode(MESSAGE)
+        benchmarks.update(
+            {
+                "msgpack.encode": lambda: msgpack_codec.encode(MESSAGE),
+                "msgpack.decode+validate": lambda: UserCreate.model_validate(
+                    msgpack_codec.decode(msgpack_body)
+                ),
+            }
+        )
+    return benchmarks
+
+
+def main(number: int = 100_000, repeat: int = 5):
+    print(f"payload: json={len(JsonCodec().encode(MESSAGE))} bytes", end="")
+    if msgpack is not None:
+        print(f", msgpack={len(MsgpackCodec().encode(MESSAGE))} bytes")
+    else:
+        print(" (msgpack not installed)")
+    for name, func in cases().items():
+        best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+        print(f"{name:28s} {best * 1e6:8.3f} us/op  {1 / best:12,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""CPU-bound and mock-I/O pieces of the request path.
+
+    python3 -m scripts.benchmarks.bench_hotpaths
+
+Covers schema validation, JWT signing/decoding, Argon2 hashing at a few cost
+settings, UserService.get_user_profile against an in-memory Redis, and what
+the auth_required dependency chain adds to a route. Routes are called as raw
+ASGI, without an HTTP client or middleware, so the difference between
+"deps.bare" and "deps.auth_required" is the dependency resolution and the
+work it triggers (token decode, cached profile lookup).
+
+Run it through scripts.benchmarks.suite to save a baseline and compare.
+"""
+
+import asyncio
+from collections.abc import Callable
+
+from fastapi import Depends, FastAPI
+
+from src.app.routers.deps import auth_required
+from src.auth.security import (
+    create_access_token,
+    decode_access_token,
+    get_password_hash,
+)
+from src.database.models import User
+from src.redis_client import MockRedisClient, RedisClient
+from src.schemas.user_schema import UserPublic
+from src.services.user_service import UserService
+
+USER = User(id=42, name="benchmark_user", password="x", org_id=1, version=3)  # noqa: S106
+USER_JSON = UserPublic.model_validate(USER).model_dump_json()
+PASSWORD = "correct horse battery staple"  # noqa: S105
+
+# Argon2id (time_cost, memory_cost KiB, parallelism) to weigh against
+# "auth.argon2.recommended", pwdlib's default (3, 65536, 4) that the app uses.
+# "owasp" is the OWASP minimum.
+ARGON2_PROFILES = {
+    "owasp": (2, 19456, 1),
+    "strong": (4, 131072, 4),
+}
+
+
+class _StubRepo:
+    """UserRepository.get without a database."""
+
+    async def get(self, _user_id: int, _columns: object = None) -> User:
+        return USER
+
+
+class _EmptyRedis:
+    """Always misses, so every lookup goes to the (stub) repository."""
+
+    async def get(self, _key: str) -> None:
+        return None
+
+    async def setex(self, _key: str, _seconds: int, _value: str) -> bool:
+        return True
+
+
+class _RedisPy:
+    """Stands in for the redis-py client inside RedisClient, read-only."""
+
+    def __init__(self, data: dict[str, str]):
+        self.data = data
+
+    async def get(self, key: str) -> str | None:
+        return self.data.get(key)
+
+
+def _service(redis: object) -> UserService:
+    service = UserService(session=None, redis=redis)
+    service.repo = _StubRepo()
+    return service
+
+
+def _argon2(time_cost: int, memory_cost: int, parallelism: int) -> Callable[[], str]:
+    from pwdlib import PasswordHash  # noqa: PLC0415
+    from pwdlib.hashers.argon2 import Argon2Hasher  # noqa: PLC0415
+
+    hasher = PasswordHash((Argon2Hasher(time_cost, memory_cost, parallelism),))
+    return lambda: hasher.hash(PASSWORD)
+
+
+def _asgi_get(app: FastAPI, path: str, headers: list[tuple[bytes, bytes]]):  # noqa: ANN202
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    status = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    async def call() -> int:
+        status.clear()
+        await app(scope, receive, send)
+        return status[0]
+
+    return call
+
+
+def _deps_app() -> FastAPI:
+    """A bare route and one behind auth_required, with no overrides.
+
+    dependency_overrides would be analysed again on every request and swamp
+    what is measured, so the real chain runs: get_db opens a session (which
+    never connects, nothing queries) and RedisClient gets a fake client that
+    has the user cached.
+    """
+    RedisClient()._client = _RedisPy({"user:42": USER_JSON})  # noqa: SLF001
+    app = FastAPI()
+
+    @app.get("/bare")
+    async def bare() -> dict:
+        return {}
+
+    @app.get("/auth", dependencies=[Depends(auth_required)])
+    async def authenticated() -> dict:
+        return {}
+
+    return app
+
+
+def cases() -> dict[str, Callable[[], object]]:
+    """Name -> zero-argument callable; returned awaitables are awaited."""
+    token = create_access_token(user_id=42)
+    cached = MockRedisClient()
+    cached.storage["user:42"] = USER_JSON
+    hit, miss = _service(cached), _service(_EmptyRedis())
+
+    app = _deps_app()
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    bare = _asgi_get(app, "/bare", [])
+    authenticated = _asgi_get(app, "/auth", headers)
+    # Fail loudly rather than benchmark an error path
+    assert asyncio.run(bare()) == 200  # noqa: PLR2004
+    assert asyncio.run(authenticated()) == 200  # noqa: PLR2004
+
+    benchmarks = {
+        "schema.UserPublic.from_orm": lambda: UserPublic.model_validate(USER),
+        "schema.UserPublic.from_json": lambda: UserPublic.model_validate_json(
+            USER_JSON
+        ),
+        "auth.create_access_token": lambda: create_access_token(user_id=42),
+        "auth.decode_access_token": lambda: decode_access_token(token),
+        "auth.argon2.recommended": lambda: get_password_hash(PASSWORD),
+        "service.get_user_profile.hit": lambda: hit.get_user_profile(42),
+        "service.get_user_profile.miss": lambda: miss.get_user_profile(42),
+        "deps.bare": bare,
+        "deps.auth_required": authenticated,
+    }
+    for name, params in ARGON2_PROFILES.items():
+        benchmarks[f"auth.argon2.{name}"] = _argon2(*params)
+    return benchmarks
+
+
+def main():
+    from scripts.benchmarks.suite import main as suite  # noqa: PLC0415
+
+    suite(["hotpaths"])
+
+
+if __name__ == "__main__":
+    main()
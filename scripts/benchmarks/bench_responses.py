@@ -0,0 +1,115 @@
+"""p50/p99 of GET /user and GET /org with stubbed services.
+
+    python3 -m scripts.benchmarks.bench_responses
+
+The services are replaced by stubs that return 100 prebuilt models, so the
+numbers isolate routing, validation and serialization from DB and Redis.
+"legacy" mounts the pre-ModelResponse route shapes (re-validate in the router,
+then let FastAPI validate and serialize the response_model again).
+"""
+
+import asyncio
+import statistics
+import time
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, FastAPI, Query
+from httpx import ASGITransport, AsyncClient
+
+from src.app import app
+from src.app.routers.deps import auth_required, get_org_service, get_user_service
+from src.schemas.org_schema import OrgPublic
+from src.schemas.user_schema import UserPublic
+
+USERS = [UserPublic(id=i, name=f"user_{i}") for i in range(100)]
+ORGS = [
+    OrgPublic(
+        id=i,
+        name=f"org_{i}",
+        config={"plan": "pro", "seats": i, "features": ["sso", "audit"]},
+    )
+    for i in range(100)
+]
+
+
+class StubUserService:
+    async def list_active_users(self, limit: int = 100, offset: int = 0):
+        return USERS[offset : offset + limit]
+
+
+class StubOrgService:
+    async def list_orgs(self, limit: int = 100, offset: int = 0):
+        return ORGS[offset : offset + limit]
+
+
+def legacy_app() -> FastAPI:
+    # Same signatures and router dependencies as the real routes, so only
+    # the response path differs.
+    user_router = APIRouter(prefix="/user", dependencies=[Depends(auth_required)])
+    org_router = APIRouter(prefix="/org", dependencies=[Depends(auth_required)])
+
+    @user_router.get("")
+    async def list_users(
+        limit: Annotated[int, Query(le=100)] = 100,
+        offset: int = 0,
+        service: StubUserService = Depends(get_user_service),
+    ) -> list[UserPublic]:
+        users = await service.list_active_users(limit=limit, offset=offset)
+        return [UserPublic.model_validate(u) for u in users]
+
+    @org_router.get("")
+    async def list_orgs(
+        limit: Annotated[int, Query(le=100)] = 100,
+        offset: int = 0,
+        service: StubOrgService = Depends(get_org_service),
+    ) -> list[OrgPublic]:
+        return list(await service.list_orgs(limit=limit, offset=offset))
+
+    legacy = FastAPI()
+    legacy.include_router(user_router)
+    legacy.include_router(org_router)
+    return legacy
+
+
+def override(target: FastAPI) -> FastAPI:
+    target.dependency_overrides[auth_required] = lambda: None
+    target.dependency_overrides[get_user_service] = StubUserService
+    target.dependency_overrides[get_org_service] = StubOrgService
+    return target
+
+
+async def measure(
+    targets: dict[str, FastAPI], path: str, requests: int
+) -> dict[str, list[float]]:
+    # Interleave the apps request by request so machine noise hits both alike
+    timings = {name: [] for name in targets}
+    clients = {
+        name: AsyncClient(transport=ASGITransport(app=target), base_url="http://bench")
+        for name, target in targets.items()
+    }
+    for i in range(requests + requests // 10):
+        for name, client in clients.items():
+            start = time.perf_counter()
+            response = await client.get(path)
+            elapsed = time.perf_counter() - start
+            response.raise_for_status()
+            if i >= requests // 10:  # the first 10% is warm-up
+                timings[name].append(elapsed)
+    for client in clients.values():
+        await client.aclose()
+    return timings
+
+
+async def main(requests: int = 5000):
+    targets = {"legacy": override(legacy_app()), "current": override(app)}
+    for path in ("/user", "/org"):
+        for name, samples in (await measure(targets, path, requests)).items():
+            cuts = statistics.quantiles(samples, n=100)
+            print(
+                f"GET {path:6s} {name:8s} "
+                f"p50={cuts[49] * 1e3:7.3f} ms  p99={cuts[98] * 1e3:7.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""Import time and time-to-first-request of the app.
+
+    python3 -m scripts.benchmarks.bench_startup
+
+Each run is a fresh interpreter, so nothing is cached in sys.modules.
+"import" is `import src.app` alone. "first request" runs from spawning a
+single uvicorn worker to the first HTTP response, so it includes the
+lifespan. Dependencies that aren't reachable fail fast or hit their connect
+timeout, and that shows up here the same way it would in a deploy.
+"""
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import src.app; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_time() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_to_first_request(timeout: float = 60) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.app:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "WEB_CONCURRENCY": "1"},
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                # Any HTTP answer (401 here) means the worker is serving
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/user", timeout=1)
+            except urllib.error.HTTPError:
+                return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+            else:
+                return time.perf_counter() - start
+        error_message = f"no response within {timeout}s"
+        raise TimeoutError(error_message)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(name: str, samples: list[float]) -> None:
+    print(
+        f"{name:14s} median={statistics.median(samples) * 1e3:8.1f} ms  "
+        f"min={min(samples) * 1e3:8.1f} ms  max={max(samples) * 1e3:8.1f} ms"
+    )
+
+
+def main(runs: int = 5):
+    report("import", [import_time() for _ in range(runs)])
+    report("first request", [time_to_first_request() for _ in range(runs)])
+
+
+if __name__ == "__main__":
+    main()
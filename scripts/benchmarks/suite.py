@@ -0,0 +1,250 @@
+"""Run the microbenchmarks and compare them against a saved baseline.
+
+    python3 -m scripts.benchmarks.suite --out results/bench/base.json
+    python3 -m scripts.benchmarks.suite --compare results/bench/base.json
+    python3 -m scripts.benchmarks.suite hotpaths --filter argon2
+
+Every case is calibrated to a batch that runs for about --sample-ms, then
+timed for --samples batches. Each batch gives one per-op time, so a case ends
+up with a distribution rather than a single best-of-N number. Cases that
+return an awaitable are awaited, a whole batch per run_until_complete, so the
+event loop overhead is amortised the same way as the timing loop.
+
+--compare tests each case against the baseline with a Mann-Whitney U test
+(rank based, no normality assumption, robust to the odd slow batch). A case
+is reported faster or slower only if p < --alpha and the medians differ by
+more than --min-change percent, and the exit code is 1 if any case got
+slower. Baselines are only comparable on the same machine and interpreter.
+
+Log records below WARNING are dropped while measuring: src logs at DEBUG, and
+formatting and queueing those would swamp the code being measured.
+"""
+
+import argparse
+import asyncio
+import importlib
+import inspect
+import json
+import logging
+import math
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Suite name -> module with a `cases()` function
+SUITES = {
+    "codec": "scripts.benchmarks.bench_codec",
+    "hotpaths": "scripts.benchmarks.bench_hotpaths",
+}
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _runner(
+    func: Callable[[], object], loop: asyncio.AbstractEventLoop
+) -> Callable[[int], float]:
+    """A function timing `n` calls of `func`, in seconds."""
+    if not inspect.isawaitable(probe := func()):
+        return lambda n: _time_sync(func, n)
+    loop.run_until_complete(probe)
+
+    async def batch(n: int) -> float:
+        start = time.perf_counter()
+        for _ in range(n):
+            await func()
+        return time.perf_counter() - start
+
+    return lambda n: loop.run_until_complete(batch(n))
+
+
+def _time_sync(func: Callable[[], object], n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return time.perf_counter() - start
+
+
+def measure(
+    func: Callable[[], object],
+    loop: asyncio.AbstractEventLoop,
+    *,
+    samples: int,
+    sample_seconds: float,
+) -> list[float]:
+    """Per-op seconds for `samples` batches of about `sample_seconds` each."""
+    run = _runner(func, loop)
+    n = 1
+    while (elapsed := run(n)) < sample_seconds:
+        if elapsed < sample_seconds / 100:
+            n *= 10
+        else:  # long enough to trust, aim straight for the target
+            n = math.ceil(n * sample_seconds / elapsed)
+    run(n)  # warm-up at the final batch size
+    return [run(n) / n for _ in range(samples)]
+
+
+def mann_whitney(a: list[float], b: list[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test, normal approximation.
+
+    Ties get average ranks and the variance is corrected for them. Fine from
+    about 10 samples per side, which is what the suite collects.
+    """
+    n1, n2 = len(a), len(b)
+    n = n1 + n2
+    values = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    rank_sum = 0.0
+    tie_term = 0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and values[j + 1][0] == values[i][0]:
+            j += 1
+        average_rank = (i + j) / 2 + 1
+        rank_sum += average_rank * sum(1 for _, side in values[i : j + 1] if not side)
+        ties = j - i + 1
+        tie_term += ties**3 - ties
+        i = j + 1
+    u = rank_sum - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0  # every value equal
+    z = max(abs(u - mean) - 0.5, 0) / math.sqrt(variance)  # continuity correction
+    return math.erfc(z / math.sqrt(2))
+
+
+def run_suites(
+    names: list[str], pattern: str | None, *, samples: int, sample_seconds: float
+) -> dict[str, list[float]]:
+    selected = re.compile(pattern) if pattern else None
+    results: dict[str, list[float]] = {}
+    loop = asyncio.new_event_loop()
+    try:
+        for suite in names:
+            for name, func in importlib.import_module(SUITES[suite]).cases().items():
+                case = f"{suite}.{name}"
+                if selected and not selected.search(case):
+                    continue
+                results[case] = times = measure(
+                    func, loop, samples=samples, sample_seconds=sample_seconds
+                )
+                median = statistics.median(times)
+                spread = (max(times) - min(times)) / median * 100
+                print(
+                    f"{case:44s} {median * 1e6:12.3f} us/op"
+                    f"  {1 / median:12,.0f} ops/s  ±{spread:4.1f}%"
+                )
+    finally:
+        loop.close()
+    return results
+
+
+def compare(
+    results: dict[str, list[float]],
+    baseline: dict[str, list[float]],
+    *,
+    alpha: float,
+    min_change: float,
+) -> list[str]:
+    """Print the change per case; returns the cases that got slower."""
+    slower = []
+    print(f"\n{'case':44s} {'baseline':>12s} {'now':>12s} {'change':>8s} {'p':>8s}")
+    for case, times in results.items():
+        if case not in baseline:
+            print(f"{case:44s} {'-':>12s} (new)")
+            continue
+        before = statistics.median(baseline[case])
+        now = statistics.median(times)
+        change = (now / before - 1) * 100
+        p = mann_whitney(baseline[case], times)
+        verdict = ""
+        if p < alpha and abs(change) > min_change:
+            verdict = "slower" if change > 0 else "faster"
+            if change > 0:
+                slower.append(case)
+        print(
+            f"{case:44s} {before * 1e6:10.3f}us {now * 1e6:10.3f}us"
+            f" {change:+7.1f}% {p:8.4f}  {verdict}"
+        )
+    return slower
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("suites", nargs="*", help=f"default: all of {list(SUITES)}")
+    parser.add_argument("--filter", default=None, help="regex on suite.case")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--sample-ms", type=float, default=50)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--alpha", type=float, default=0.01)
+    parser.add_argument("--min-change", type=float, default=5, help="percent")
+    args = parser.parse_args(argv)
+    if unknown := set(args.suites) - SUITES.keys():
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    started_at = datetime.now(timezone.utc).isoformat()
+    logging.disable(logging.INFO)
+    results = run_suites(
+        args.suites or list(SUITES),
+        args.filter,
+        samples=args.samples,
+        sample_seconds=args.sample_ms / 1000,
+    )
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(
+            json.dumps(
+                {
+                    "meta": {
+                        "started_at": started_at,
+                        "git_revision": _git_revision(),
+                        "python": platform.python_version(),
+                        "machine": platform.machine(),
+                        "processor": platform.processor(),
+                    },
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+        print(f"results written to {args.out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline["meta"].get("python") != platform.python_version():
+            print(f"note: baseline ran on Python {baseline['meta'].get('python')}")
+        slower = compare(
+            results,
+            baseline["results"],
+            alpha=args.alpha,
+            min_change=args.min_change,
+        )
+        if slower:
+            print(f"regression: {', '.join(slower)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,21 @@
 import asyncio
+import bisect
+import functools
+import itertools
+import json
+import multiprocessing
+import random
 import subprocess
 import sys
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
 
+import asyncpg
 from sqlalchemy_utils import create_database, database_exists, drop_database
 
+from src.auth.security import get_password_hash
 from src.database import engine, get_db
 from src.schemas.org_schema import OrgCreate
 from src.schemas.user_schema import UserCreate
@@ -51,6 +62,7 @@ async def create_org():
         org_data = OrgCreate(name="manish")
         await org_service.create_org(org_data)
 
+
 async def create_user():
     async_get_db = asynccontextmanager(get_db)
     async with async_get_db() as session:
@@ -59,16 +71,233 @@ async def create_user():
         await user_service.register_user(user_data)
 
 
-print("argument list", sys.argv)
+# seed_bulk: org sizes follow a Zipf law, a few orgs hold most users like in
+# a real multi-tenant table. With s=1.1 and 10k orgs the largest holds ~15%
+# of the users and half the orgs fewer than 0.003%.
+ORG_SIZE_SKEW = 1.1
+SEED_CHUNK_ROWS = 100_000
+# Users get one of these passwords, hashed once up front instead of per row:
+# user_<id> logs in with password-<id % SEED_PASSWORDS>
+SEED_PASSWORDS = 8
 
-for arg in sys.argv[1:]:
-    if arg == "create_db":
-        asyncio.run(create_db())
-    elif arg == "drop_db":
-        drop_db()
-    elif arg == "create_tables":
-        create_tables()
-    elif arg == "seed_db":
-        asyncio.run(seed_db())
-    else:
-        print("invalid arg", arg)
+PLANS = ("free", "free", "free", "team", "team", "enterprise")
+FEATURES = ("sso", "audit_log", "webhooks", "api_access", "custom_roles", "exports")
+REGIONS = ("us-east-1", "us-west-2", "eu-west-1", "ap-south-1")
+
+
+def _dsn() -> str:
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def org_config(rng: random.Random) -> str | None:
+    """A JSONB blob shaped like a tenant settings document, ~100-650 bytes."""
+    if rng.random() < 0.05:  # noqa: PLR2004
+        return None
+    plan = rng.choice(PLANS)
+    config = {
+        "plan": plan,
+        "region": rng.choice(REGIONS),
+        "features": {f: rng.random() < 0.5 for f in FEATURES},  # noqa: PLR2004
+        "limits": {
+            "seats": rng.choice((5, 25, 100, 1000)),
+            "api_rpm": rng.choice((60, 600, 6000)),
+        },
+    }
+    if plan == "enterprise":
+        config["sso"] = {
+            "provider": rng.choice(("okta", "azure_ad", "google")),
+            "domains": [f"corp{rng.randrange(10_000)}.example" for _ in range(3)],
+            "enforce": rng.random() < 0.7,  # noqa: PLR2004
+        }
+    if plan != "free":
+        config["webhooks"] = [
+            {
+                "url": f"https://hooks.example/{rng.getrandbits(64):x}",
+                "events": rng.sample(
+                    ("user.created", "user.deleted", "org.updated"), 2
+                ),
+            }
+            for _ in range(rng.randrange(4))
+        ]
+    return json.dumps(config)
+
+
+@functools.cache
+def _org_weights(orgs: int) -> list[float]:
+    """Cumulative Zipf weights, rank 1 first."""
+    return list(
+        itertools.accumulate(1 / rank**ORG_SIZE_SKEW for rank in range(1, orgs + 1))
+    )
+
+
+async def _copy_orgs(dsn: str, start: int, count: int, *, seed: int) -> None:
+    rng = random.Random(seed + start)  # noqa: S311
+    rows = (
+        (org_id, f"org_{org_id}", org_config(rng), 1)
+        for org_id in range(start, start + count)
+    )
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.copy_records_to_table(
+            "orgs", records=rows, columns=("id", "name", "config", "version")
+        )
+    finally:
+        await connection.close()
+
+
+async def _copy_users(  # noqa: PLR0913
+    dsn: str,
+    start: int,
+    count: int,
+    *,
+    seed: int,
+    first_org_id: int,
+    orgs: int,
+    hashes: list[str],
+) -> None:
+    rng = random.Random(seed + start)  # noqa: S311
+    weights = _org_weights(orgs)
+    total = weights[-1]
+    # Ranks are shuffled over ids with a fixed seed, so the largest org is not
+    # always the lowest id but every chunk agrees on which one it is
+    ranks = list(range(orgs))
+    random.Random(orgs).shuffle(ranks)  # noqa: S311
+    rows = (
+        (
+            user_id,
+            f"user_{user_id}",
+            hashes[user_id % len(hashes)],
+            first_org_id + ranks[bisect.bisect(weights, rng.random() * total)],
+            1,
+        )
+        for user_id in range(start, start + count)
+    )
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.copy_records_to_table(
+            "users",
+            records=rows,
+            columns=("id", "name", "password", "org_id", "version"),
+        )
+    finally:
+        await connection.close()
+
+
+CopyChunk = Callable[..., Awaitable[None]]
+
+
+def _run_chunk(
+    copy: CopyChunk, dsn: str, start: int, count: int, **kwargs: object
+) -> int:
+    """Process pool entry point: one COPY on its own connection."""
+    asyncio.run(copy(dsn, start, count, **kwargs))
+    return count
+
+
+async def _load(
+    pool: ProcessPoolExecutor,
+    table: str,
+    copy: CopyChunk,
+    first_id: int,
+    total: int,
+    **kwargs: object,
+) -> None:
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    chunks = [
+        loop.run_in_executor(
+            pool,
+            functools.partial(
+                _run_chunk,
+                copy,
+                start=start,
+                count=min(SEED_CHUNK_ROWS, first_id + total - start),
+                **kwargs,
+            ),
+        )
+        for start in range(first_id, first_id + total, SEED_CHUNK_ROWS)
+    ]
+    loaded = 0
+    for chunk in asyncio.as_completed(chunks):
+        loaded += await chunk
+        print(f"{table}: {loaded}/{total} rows", end="\r")
+    print(f"{table}: {loaded} rows in {time.perf_counter() - started:.1f}s")
+
+
+async def _next_id(connection: asyncpg.Connection, table: str) -> int:
+    return await connection.fetchval(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")  # noqa: S608
+
+
+async def seed_bulk(users: int = 1_000_000, orgs: int = 10_000, seed: int = 0):
+    """Load `orgs` orgs and `users` users with COPY, in parallel chunks.
+
+    Rows are appended after the current max ids, then the id sequences are
+    moved past them and both tables analyzed. Generating rows is CPU bound,
+    so chunks run in a process pool, each on its own connection.
+    """
+    dsn = _dsn()
+    connection = await asyncpg.connect(dsn)
+    try:
+        first_org_id = await _next_id(connection, "orgs")
+        first_user_id = await _next_id(connection, "users")
+    finally:
+        await connection.close()
+    hashes = [get_password_hash(f"password-{i}") for i in range(SEED_PASSWORDS)]
+
+    started = time.perf_counter()
+    # Spawned, not forked: this process already runs the log pipeline thread
+    # and an event loop, and a fork could copy one of their locks held
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as pool:
+        await _load(pool, "orgs", _copy_orgs, first_org_id, orgs, dsn=dsn, seed=seed)
+        await _load(
+            pool,
+            "users",
+            _copy_users,
+            first_user_id,
+            users,
+            dsn=dsn,
+            seed=seed,
+            first_org_id=first_org_id,
+            orgs=orgs,
+            hashes=hashes,
+        )
+
+    connection = await asyncpg.connect(dsn)
+    try:
+        for table in ("orgs", "users"):
+            await connection.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'),"  # noqa: S608
+                f" (SELECT max(id) FROM {table}))"
+            )
+        await connection.execute("ANALYZE orgs, users")
+    finally:
+        await connection.close()
+    print(f"done in {time.perf_counter() - started:.1f}s, tables analyzed")
+
+
+def _seed_bulk_args(value: str) -> tuple[int, int]:
+    """`seed_bulk=<users>[,<orgs>]`"""
+    users, _, orgs = value.partition(",")
+    return int(users), int(orgs or 10_000)
+
+
+# Guarded: seed_bulk's process pool re-imports this module in its workers
+if __name__ == "__main__":
+    print("argument list", sys.argv)
+
+    for arg in sys.argv[1:]:
+        if arg == "create_db":
+            asyncio.run(create_db())
+        elif arg == "drop_db":
+            drop_db()
+        elif arg == "create_tables":
+            create_tables()
+        elif arg == "seed_db":
+            asyncio.run(seed_db())
+        elif arg == "seed_bulk":
+            asyncio.run(seed_bulk())
+        elif arg.startswith("seed_bulk="):
+            users, orgs = _seed_bulk_args(arg.split("=", 1)[1])
+            asyncio.run(seed_bulk(users, orgs))
+        else:
+            print("invalid arg", arg)
@@ -0,0 +1,458 @@
+"""Open-loop load test against a running app instance.
+
+    python3 -m scripts.loadtest --rate 200 --duration 30 --mix mixed
+    python3 -m scripts.loadtest --rate 200 --compare results/loadtest/base.json
+
+Requests start on a fixed schedule, `--rate` per second, whether or not the
+earlier ones have finished, like independent clients would. A closed loop (N
+workers that each wait for their response) slows down along with the server
+and stops sending exactly while it stalls, which hides the stall
+(coordinated omission). Here latency is measured from each request's
+scheduled start, so time spent behind a slow server counts. The time from the
+actual send is reported as `service` for comparison.
+
+Setup logs in as --username/--password (the user `scripts.db_scripts` seeds),
+reads --hot-users ids once so they are cached, and creates a few orgs.
+`get_user` picks a hot id with probability --cache-hit-ratio, otherwise a
+random id from --user-ids. Those are mostly misses only if the table is much
+larger than the run touches, so seed plenty of users first.
+
+Results are saved as JSON (--out). --compare prints the change against an
+earlier result file and exits 1 when p99 latency or throughput got worse by
+more than --threshold percent.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+PERCENTILES = (50, 90, 99, 99.9)
+PAGE_SIZE = 50
+
+MIXES = {
+    "read-heavy": {"get_user": 80, "list_users": 10, "org_get": 8, "login": 2},
+    "mixed": {
+        "get_user": 50,
+        "list_users": 10,
+        "login": 3,
+        "org_create": 6,
+        "org_get": 15,
+        "org_update": 6,
+        "org_delete": 3,
+        "register_async": 7,
+    },
+    "write-heavy": {
+        "get_user": 20,
+        "org_create": 20,
+        "org_update": 20,
+        "org_delete": 10,
+        "register_async": 30,
+    },
+}
+
+
+@dataclass
+class State:
+    username: str
+    password: str
+    headers: dict[str, str]
+    hot_users: list[int]
+    user_ids: range
+    cache_hit_ratio: float
+    list_pages: int
+    orgs: list[int]
+    rng: random.Random = field(default_factory=random.Random)
+    names: itertools.count = field(default_factory=itertools.count)
+
+    def unique_name(self) -> str:
+        return f"load-{uuid.uuid4().hex[:8]}-{next(self.names)}"
+
+
+# None means the operation had nothing to act on and sent nothing
+Operation = Callable[[httpx.AsyncClient, State], Awaitable[httpx.Response | None]]
+
+
+async def login(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.post(
+        "/auth/login", data={"username": state.username, "password": state.password}
+    )
+
+
+async def get_user(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    if state.hot_users and state.rng.random() < state.cache_hit_ratio:
+        user_id = state.rng.choice(state.hot_users)
+    else:
+        user_id = state.rng.choice(state.user_ids)
+    return await client.get(f"/user/{user_id}", headers=state.headers)
+
+
+async def list_users(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    offset = state.rng.randrange(state.list_pages) * PAGE_SIZE
+    return await client.get(
+        "/user",
+        params={"limit": PAGE_SIZE, "offset": offset},
+        headers=state.headers,
+    )
+
+
+async def org_create(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    response = await client.post(
+        "/org", json={"name": state.unique_name()}, headers=state.headers
+    )
+    if response.status_code == httpx.codes.CREATED:
+        state.orgs.append(response.json()["id"])
+    return response
+
+
+async def org_get(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    org_id = state.rng.choice(state.orgs)
+    return await client.get(f"/org/{org_id}", headers=state.headers)
+
+
+async def org_update(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.patch(
+        f"/org/{state.rng.choice(state.orgs)}",
+        json={"name": state.unique_name()},
+        headers=state.headers,
+    )
+
+
+async def org_delete(client: httpx.AsyncClient, state: State) -> httpx.Response | None:
+    # The first org always stays: the other org operations and register_async
+    # need an existing one, and a deleted org_id would send registrations to
+    # the DLQ on the foreign key
+    if len(state.orgs) < 2:  # noqa: PLR2004
+        return None
+    return await client.delete(f"/org/{state.orgs.pop()}", headers=state.headers)
+
+
+async def register_async(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.post(
+        "/user/register-async",
+        json={
+            "name": state.unique_name(),
+            "password": "load-test",
+            "org_id": state.orgs[0],
+        },
+        headers=state.headers,
+    )
+
+
+OPERATIONS: dict[str, Operation] = {
+    operation.__name__: operation
+    for operation in (
+        login,
+        get_user,
+        list_users,
+        org_create,
+        org_get,
+        org_update,
+        org_delete,
+        register_async,
+    )
+}
+
+
+@dataclass
+class Recorder:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    service: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+    max_schedule_lag: float = 0.0
+    elapsed: float = 0.0
+
+    def record(
+        self, name: str, status: str, scheduled: float, sent: float, done: float
+    ) -> None:
+        self.latencies[name].append(done - scheduled)
+        self.service[name].append(done - sent)
+        self.statuses[name][status] += 1
+
+
+async def _issue(  # noqa: PLR0913
+    client: httpx.AsyncClient,
+    state: State,
+    name: str,
+    *,
+    scheduled: float,
+    in_flight: asyncio.Semaphore,
+    recorder: Recorder,
+) -> None:
+    loop = asyncio.get_running_loop()
+    # Waiting for an in-flight slot still counts, it is measured from `scheduled`
+    async with in_flight:
+        sent = loop.time()
+        try:
+            response = await OPERATIONS[name](client, state)
+            if response is None:
+                return  # skipped, not a request
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        recorder.record(name, status, scheduled, sent, loop.time())
+
+
+async def run_load(  # noqa: PLR0913
+    client: httpx.AsyncClient,
+    state: State,
+    mix: dict[str, float],
+    *,
+    rate: float,
+    duration: float,
+    max_in_flight: int,
+) -> Recorder:
+    names, weights = list(mix), list(mix.values())
+    recorder = Recorder()
+    in_flight = asyncio.Semaphore(max_in_flight)
+    tasks: set[asyncio.Task] = set()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for i in range(int(rate * duration)):
+        scheduled = start + i / rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # The generator itself is behind; big values mean it, not the
+            # server, is the bottleneck
+            recorder.max_schedule_lag = max(recorder.max_schedule_lag, -delay)
+        name = state.rng.choices(names, weights)[0]
+        task = asyncio.create_task(
+            _issue(
+                client,
+                state,
+                name,
+                scheduled=scheduled,
+                in_flight=in_flight,
+                recorder=recorder,
+            )
+        )
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+    recorder.elapsed = loop.time() - start
+    return recorder
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _latency(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)
+    summary = {f"p{p:g}": round(percentile(ordered, p) * 1e3, 3) for p in PERCENTILES}
+    summary["max"] = round(ordered[-1] * 1e3, 3) if ordered else 0.0
+    return summary
+
+
+def summarize(recorder: Recorder) -> dict[str, dict]:
+    groups = {name: [name] for name in recorder.latencies}
+    groups["all"] = list(recorder.latencies)
+    summary = {}
+    for group, names in groups.items():
+        latencies = [v for n in names for v in recorder.latencies[n]]
+        service = [v for n in names for v in recorder.service[n]]
+        statuses = sum((recorder.statuses[n] for n in names), Counter())
+        errors = sum(
+            count
+            for status, count in statuses.items()
+            if not status.isdigit() or int(status) >= 500  # noqa: PLR2004
+        )
+        summary[group] = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / recorder.elapsed, 2)
+            if recorder.elapsed
+            else 0.0,
+            "errors": errors,
+            "statuses": dict(statuses),
+            "latency_ms": _latency(latencies),
+            "service_ms": _latency(service),
+        }
+    return summary
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print the change per operation; True if `all` regressed past `threshold`%."""
+
+    def change(new: float, old: float) -> float:
+        return (new - old) / old * 100 if old else 0.0
+
+    regressed = False
+    print(f"\n{'operation':16s} {'p50':>9s} {'p99':>9s} {'rps':>9s}  (vs baseline)")
+    for name, result in current["operations"].items():
+        old = baseline["operations"].get(name)
+        if old is None:
+            continue
+        p50 = change(result["latency_ms"]["p50"], old["latency_ms"]["p50"])
+        p99 = change(result["latency_ms"]["p99"], old["latency_ms"]["p99"])
+        rps = change(result["throughput_rps"], old["throughput_rps"])
+        print(f"{name:16s} {p50:+8.1f}% {p99:+8.1f}% {rps:+8.1f}%")
+        if name == "all" and (p99 > threshold or rps < -threshold):
+            regressed = True
+    return regressed
+
+
+def report(summary: dict[str, dict], recorder: Recorder) -> None:
+    header = "".join(f"{f'p{p:g}':>10s}" for p in PERCENTILES)
+    print(f"{'operation':16s} {'reqs':>7s} {'rps':>8s} {'errors':>7s}{header}")
+    for name, result in sorted(summary.items(), key=lambda item: item[0] == "all"):
+        latency = "".join(
+            f"{result['latency_ms'][f'p{p:g}']:10.1f}" for p in PERCENTILES
+        )
+        print(
+            f"{name:16s} {result['requests']:7d} {result['throughput_rps']:8.1f} "
+            f"{result['errors']:7d}{latency}"
+        )
+    print("latency in ms from the scheduled start (coordinated-omission corrected)")
+    if recorder.max_schedule_lag > 0.01:  # noqa: PLR2004
+        print(
+            f"warning: the load generator fell {recorder.max_schedule_lag * 1e3:.0f}"
+            " ms behind schedule, results are limited by the client"
+        )
+
+
+async def setup(client: httpx.AsyncClient, args: argparse.Namespace) -> State:
+    response = await client.post(
+        "/auth/login", data={"username": args.username, "password": args.password}
+    )
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    first, last = (int(i) for i in args.user_ids.split("-"))
+    user_ids = range(first, last + 1)
+    state = State(
+        username=args.username,
+        password=args.password,
+        headers=headers,
+        hot_users=list(user_ids[: args.hot_users]),
+        user_ids=user_ids,
+        cache_hit_ratio=args.cache_hit_ratio,
+        list_pages=max(1, len(user_ids) // PAGE_SIZE),
+        orgs=[],
+        rng=random.Random(args.seed),  # noqa: S311
+    )
+    # Read once so they are in Redis when the run starts
+    for user_id in state.hot_users:
+        await client.get(f"/user/{user_id}", headers=headers)
+    for _ in range(args.orgs):
+        await org_create(client, state)
+    if not state.orgs:
+        error_message = "could not create any org during setup"
+        raise RuntimeError(error_message)
+    return state
+
+
+def _parse_mix(value: str) -> dict[str, float]:
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            error_message = f"unknown operation {name!r}, pick from {list(OPERATIONS)}"
+            raise argparse.ArgumentTypeError(error_message)
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rate", type=float, default=100, help="requests/second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument(
+        "--mix",
+        type=_parse_mix,
+        default="mixed",
+        help=f"one of {list(MIXES)} or weights like get_user=8,login=1",
+    )
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--username", default="manish")
+    parser.add_argument("--password", default="1234")
+    parser.add_argument("--user-ids", default="1-1000", help="range, e.g. 1-100000")
+    parser.add_argument("--hot-users", type=int, default=100)
+    parser.add_argument("--cache-hit-ratio", type=float, default=0.9)
+    parser.add_argument("--orgs", type=int, default=20, help="created during setup")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=10, help="percent")
+    return parser.parse_args(argv)
+
+
+async def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    limits = httpx.Limits(max_connections=args.max_in_flight)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=30
+    ) as client:
+        state = await setup(client, args)
+        started_at = datetime.now(timezone.utc).isoformat()
+        recorder = await run_load(
+            client,
+            state,
+            args.mix,
+            rate=args.rate,
+            duration=args.duration,
+            max_in_flight=args.max_in_flight,
+        )
+
+    summary = summarize(recorder)
+    report(summary, recorder)
+    result = {
+        "meta": {
+            "started_at": started_at,
+            "git_revision": _git_revision(),
+            "base_url": args.base_url,
+            "rate": args.rate,
+            "duration": args.duration,
+            "mix": args.mix,
+            "cache_hit_ratio": args.cache_hit_ratio,
+            "max_schedule_lag_ms": round(recorder.max_schedule_lag * 1e3, 3),
+        },
+        "operations": summary,
+    }
+    out = args.out or Path("results/loadtest") / f"{int(time.time())}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f"results written to {out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if compare(result, baseline, args.threshold):
+            print(f"regression: worse than baseline by more than {args.threshold}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,58 @@
+import asyncio
+import sys
+
+from aio_pika import connect
+
+from src.rmq import rmq_publisher
+from src.rmq.topology import (
+    RETRY_COUNT_HEADER,
+    copy_message,
+    dead_letter_queue_name,
+    declare_topology,
+)
+
+
+async def replay_dlq(limit: int | None = None):
+    """Move dead-lettered messages back onto the work queue.
+
+    Replayed messages get a fresh retry budget. Only messages already in the
+    DLQ when the replay starts are moved, so messages that fail again can't
+    keep the replay running forever.
+    """
+    queue_name = rmq_publisher.queue_name
+    connection = await connect(rmq_publisher.connection_url)
+    async with connection:
+        channel = await connection.channel(publisher_confirms=True)
+        await declare_topology(channel, queue_name)
+        dlq = await channel.declare_queue(
+            dead_letter_queue_name(queue_name), passive=True
+        )
+        pending = dlq.declaration_result.message_count
+        if limit is not None:
+            pending = min(pending, limit)
+        print(f"replaying {pending} dead-lettered messages")
+
+        replayed = 0
+        while replayed < pending:
+            message = await dlq.get(fail=False)
+            if message is None:
+                break
+            headers = dict(message.headers or {})
+            headers.pop(RETRY_COUNT_HEADER, None)
+            await channel.default_exchange.publish(
+                copy_message(message, headers), routing_key=queue_name
+            )
+            await message.ack()
+            replayed += 1
+        print(f"replayed {replayed} messages")
+
+
+print("argument list", sys.argv)
+
+for arg in sys.argv[1:]:
+    if arg == "replay_dlq":
+        asyncio.run(replay_dlq())
+    elif arg.startswith("replay_dlq="):
+        asyncio.run(replay_dlq(limit=int(arg.split("=", 1)[1])))
+    else:
+        print("invalid arg", arg)
@@ -1,32 +1,38 @@
 import logging
-import sys
 
-from pythonjsonlogger import json as jsonlogger
+from env import (
+    LOG_CALLER_INFO,
+    LOG_DEBUG_SAMPLE_EVERY,
+    LOG_FILE,
+    LOG_FILE_BACKUP_COUNT,
+    LOG_FILE_MAX_BYTES,
+    LOG_FILE_PER_PROCESS,
+    LOG_QUEUE_POLICY,
+    LOG_QUEUE_SIZE,
+)
+from src.logging_pipeline import LogPipeline
+from src.metrics import Counter
 
 logger = logging.getLogger(__name__)
 
 logger.setLevel(logging.DEBUG)
 
-
-"""creating stream handler, which writes to stdout"""
-stream_handler = logging.StreamHandler(stream=sys.stdout)
-logger.addHandler(stream_handler)
-"""If you don't set level to handler, it fallbacks to loggers default level"""
-
-file_handler = logging.FileHandler("logs.jsonl")
-"""file_handler will only log ERROR and above"""
-# file_handler.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-
-normal_formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s %(threadName)s %(pathname)s:%(lineno)s \
-          - %(funcName)s() - %(message)s"
+"""Records are queued here and written to stdout and LOG_FILE by a background
+thread, see src/logging_pipeline.py"""
+log_pipeline = LogPipeline(
+    LOG_FILE,
+    max_bytes=LOG_FILE_MAX_BYTES,
+    backup_count=LOG_FILE_BACKUP_COUNT,
+    queue_size=LOG_QUEUE_SIZE,
+    policy=LOG_QUEUE_POLICY,
+    debug_sample_every=LOG_DEBUG_SAMPLE_EVERY,
+    caller_info=LOG_CALLER_INFO,
+    per_process=LOG_FILE_PER_PROCESS,
 )
-json_formatter = jsonlogger.JsonFormatter(
-    "%(asctime)s - %(name)s - %(levelname)s %(threadName)s %(pathname)s:%(lineno)s \
-        - %(funcName)s() - %(message)s"
-)
-
-stream_handler.setFormatter(normal_formatter)
+logger.addHandler(log_pipeline.queue_handler)
+log_pipeline.start()
 
-file_handler.setFormatter(json_formatter)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records dropped because the queue was full"
+)
+LOG_RECORDS_DROPPED.set_function(lambda: log_pipeline.queue_handler.dropped_total)
@@ -1,28 +1,132 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
+from env import (
+    DB_CONNECT_TIMEOUT_SECONDS,
+    METRICS_MULTIPROC_DIR,
+    REDIS_CONNECT_TIMEOUT_SECONDS,
+    RMQ_CONNECT_TIMEOUT_SECONDS,
+)
+from src.app.health import HealthMonitor
+from src.app.middleware.concurrency import ConcurrencyLimitMiddleware
+from src.app.middleware.deadline import DeadlineMiddleware
+from src.app.middleware.idempotency import IdempotencyMiddleware
+from src.app.middleware.metrics import MetricsMiddleware
+from src.app.middleware.profiling import ProfileMiddleware
+from src.app.middleware.tracing import TracingMiddleware
+from src.app.routers.admin_router import admin_router
 from src.app.routers.auth_router import auth_router
+from src.app.routers.health_router import health_router
+from src.app.routers.metrics_router import metrics_router
 from src.app.routers.org_router import org_router
 from src.app.routers.user_router import user_router
+from src.database import warm_pool
+from src.exceptions.request_exceptions import DeadlineExceededError
+from src.loop_monitor import LoopMonitor
+from src.metrics import flush_periodically
 from src.redis_client import RedisClient
 from src.rmq import rmq_publisher
 
+logger = logging.getLogger(__name__)
 
-@asynccontextmanager
-async def lifespan(_: FastAPI):
-    # Startup: Connect to RMQ
-    await rmq_publisher.connect()
+
+async def _start(
+    name: str, connect: Callable[[], Awaitable[object]], timeout: float
+) -> None:
+    """Connect one dependency, logging (not raising) if it fails or is slow."""
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            await connect()
+    except Exception:
+        logger.exception("%s unavailable at startup, serving degraded", name)
+    else:
+        logger.info("%s ready in %.0f ms", name, (time.perf_counter() - start) * 1e3)
+
+
+async def _connect_redis() -> None:
+    # RedisClient.connect() logs and swallows connection errors itself
     await RedisClient().connect()
+    if not RedisClient().is_connected:
+        error_message = "Redis did not answer PING"
+        raise ConnectionError(error_message)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: connect everything concurrently, so startup takes as long as the
+    # slowest dependency (capped by its timeout) rather than the sum. A
+    # dependency that is down leaves the app serving without it (the publisher
+    # reconnects on its next publish, Redis reads fall through to Postgres);
+    # the health check below reports it on /readyz and keeps retrying it.
+    await asyncio.gather(
+        _start("rmq", rmq_publisher.connect, RMQ_CONNECT_TIMEOUT_SECONDS),
+        _start("redis", _connect_redis, REDIS_CONNECT_TIMEOUT_SECONDS),
+        # Open the DB pool before the worker starts taking requests
+        _start("postgres", warm_pool, DB_CONNECT_TIMEOUT_SECONDS),
+    )
+    # First snapshot before serving, then refreshed in the background
+    app.state.health = HealthMonitor.default()
+    await app.state.health.check()
+    app.state.health.start()
+    app.state.loop_monitor = LoopMonitor()
+    app.state.loop_monitor.start()
+    # Other workers' /metrics read this worker's snapshot from the shared dir
+    metrics_task = (
+        asyncio.create_task(flush_periodically()) if METRICS_MULTIPROC_DIR else None
+    )
     yield
-    # Shutdown: Close RMQ
-    await rmq_publisher.close()
-    await RedisClient().close()
+    # Shutdown: Close RMQ and Redis
+    await app.state.health.stop()
+    await app.state.loop_monitor.stop()
+    if metrics_task:
+        # Retires this worker's snapshot with its final counts
+        metrics_task.cancel()
+        await asyncio.gather(metrics_task, return_exceptions=True)
+    await asyncio.gather(
+        rmq_publisher.close(), RedisClient().close(), return_exceptions=True
+    )
 
 
 app = FastAPI(lifespan=lifespan)
+# Innermost: a profiled request measures its handling, not its queueing
+app.add_middleware(ProfileMiddleware)
+# Probes and scrapes are never queued, shed or traced
+OPERATIONAL_PATHS = frozenset({"/healthz", "/readyz", "/metrics"})
+# A sampling profile holds its request open for seconds without doing work;
+# it must not take a slot or count as latency for the limiter
+app.add_middleware(
+    ConcurrencyLimitMiddleware, exempt_paths=OPERATIONAL_PATHS | {"/admin/profile"}
+)
+# Replays and in-progress duplicates are answered before taking a limiter slot
+app.add_middleware(IdempotencyMiddleware)
+# Wraps the limiter and idempotency layers, so time spent queued by the
+# limiter counts against the deadline
+app.add_middleware(DeadlineMiddleware)
+# The root span covers queueing as well as handling
+app.add_middleware(TracingMiddleware, exempt_paths=OPERATIONAL_PATHS)
+# Outside everything else, so latency includes queueing and 503/504 responses
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(DeadlineExceededError)
+async def deadline_exceeded_handler(_: Request, exc: DeadlineExceededError):
+    logger.warning("request deadline exceeded: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "Request deadline exceeded"},
+    )
 
 
 app.include_router(org_router)
 app.include_router(user_router)
 app.include_router(auth_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
@@ -0,0 +1,69 @@
+"""Strong ETags and conditional request helpers.
+
+Single resources are tagged from their version column, so a 304 can be
+decided without rendering (or even loading) the row. Lists are tagged from a
+hash of the rendered body.
+"""
+
+import hashlib
+import re
+from collections.abc import Collection
+
+from fastapi import HTTPException, Response, status
+
+_RESOURCE_ETAG = re.compile(
+    r'^"(?P<kind>[a-z]+)-(?P<id>\d+)-v(?P<version>\d+)(;[a-z_.]+)?"$'
+)
+
+
+def resource_etag(
+    kind: str, obj_id: int, version: int, fields: Collection[str] | None = None
+) -> str:
+    # A sparse fieldset is a different representation, so it gets its own tag
+    if fields is None:
+        return f'"{kind}-{obj_id}-v{version}"'
+    return f'"{kind}-{obj_id}-v{version};{".".join(sorted(fields))}"'
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix is ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def conditional(response: Response, if_none_match: str | None) -> Response:
+    """Tag a rendered response by its body and turn it into a 304 on a match."""
+    etag = body_etag(response.body)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return response
+
+
+def expected_version(if_match: str | None, kind: str, obj_id: int) -> int | None:
+    """Version an If-Match header pins a PATCH to, or None if there's no header.
+
+    If-Match needs a strong comparison, so anything but one of our own
+    resource ETags for this object fails the precondition.
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    match = _RESOURCE_ETAG.match(if_match.strip())
+    if not match or match["kind"] != kind or int(match["id"]) != obj_id:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="If-Match does not match the current ETag",
+        )
+    return int(match["version"])
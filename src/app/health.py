@@ -0,0 +1,146 @@
+"""Background dependency probes behind /readyz.
+
+Probes run on an interval in one background task and the rendered snapshot
+is cached. A readiness check is then a single attribute read: however often
+a load balancer polls, it never adds I/O and never waits behind real requests
+for a pool slot.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from pydantic_core import to_json
+from sqlalchemy import text
+
+from env import HEALTH_CHECK_INTERVAL_SECONDS, HEALTH_PROBE_TIMEOUT_SECONDS
+from src.database import engine
+from src.redis_client import RedisClient
+from src.rmq import rmq_publisher
+
+logger = logging.getLogger(__name__)
+
+Probe = Callable[[], Awaitable[dict[str, Any]]]
+
+OK = "ok"
+DEGRADED = "degraded"  # serving, but a non-critical dependency is down
+UNAVAILABLE = "unavailable"
+
+
+async def probe_postgres() -> dict[str, Any]:
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+    pool = engine.pool
+    return {
+        "pool": {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+        }
+    }
+
+
+async def probe_redis() -> dict[str, Any]:
+    client = RedisClient()
+    if not client.is_connected:
+        # Also how the app recovers from Redis being down at startup
+        await client.connect()
+    if not await client.ping():
+        error_message = "Redis did not answer PING"
+        raise ConnectionError(error_message)
+    return {}
+
+
+async def probe_rmq() -> dict[str, Any]:
+    if not rmq_publisher.is_connected:
+        await rmq_publisher.connect()
+    return {
+        "queue_depth": rmq_publisher.queue_depth,
+        "consumer_count": rmq_publisher.consumer_count,
+    }
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        probes: dict[str, Probe],
+        critical: frozenset[str],
+        interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+        timeout: float = HEALTH_PROBE_TIMEOUT_SECONDS,
+    ):
+        self.probes = probes
+        self.critical = critical
+        self.interval = interval
+        self.timeout = timeout
+        self.snapshot: dict[str, Any] | None = None
+        self.body = b""
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def default(cls) -> "HealthMonitor":
+        return cls(
+            {"postgres": probe_postgres, "redis": probe_redis, "rmq": probe_rmq},
+            critical=frozenset({"postgres"}),
+        )
+
+    async def _probe(self, probe: Probe) -> dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                details = await probe()
+        except Exception as e:  # noqa: BLE001
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        else:
+            result = {"ok": True, **details}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1e3, 2)
+        return result
+
+    async def check(self) -> dict[str, Any]:
+        results = await asyncio.gather(*(self._probe(p) for p in self.probes.values()))
+        dependencies = dict(zip(self.probes, results, strict=True))
+        failing = {name for name, result in dependencies.items() if not result["ok"]}
+        if failing & self.critical:
+            status = UNAVAILABLE
+        elif failing:
+            status = DEGRADED
+        else:
+            status = OK
+        if self.snapshot is None or self.snapshot["status"] != status:
+            logger.info("health is %s (failing: %s)", status, sorted(failing) or "-")
+        self.snapshot = {
+            "status": status,
+            "checked_at": time.time(),
+            "dependencies": dependencies,
+        }
+        self.body = to_json(self.snapshot)
+        return self.snapshot
+
+    @property
+    def ready(self) -> bool:
+        # A snapshot the loop stopped refreshing says nothing about now
+        return (
+            self.snapshot is not None
+            and self.snapshot["status"] != UNAVAILABLE
+            and time.time() - self.snapshot["checked_at"] < 3 * self.interval
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("health check failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,274 @@
+"""Adaptive concurrency limiting and load shedding.
+
+Every request is classified into a route group with a priority. Each group
+admits up to `limit` requests at a time and parks the rest in a small
+priority queue. The limit follows AIMD on observed latency: it grows by about
+one per window while requests finish under the target and shrinks by
+`backoff` when they don't. Once the queue is full, or a request has waited
+`max_wait` seconds, the request gets a 503 straight away instead of waiting
+out pool_timeout.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from env import (
+    CONCURRENCY_MAX_LIMIT,
+    CONCURRENCY_MAX_WAIT_MS,
+    CONCURRENCY_QUEUE_SIZE,
+    CONCURRENCY_TARGET_LATENCY_MS,
+)
+from src import deadline
+from src.database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITY_CRITICAL = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BULK = 2
+
+
+@dataclass
+class AdaptiveLimit:
+    initial: float
+    min_limit: float
+    max_limit: float
+    target_latency: float
+    backoff: float = 0.9
+    current: float = field(init=False)
+
+    def __post_init__(self):  # noqa: D105
+        self.current = self.initial
+
+    def on_sample(self, latency: float, failed: bool, in_flight: int) -> None:
+        if failed or latency > self.target_latency:
+            self.current = max(self.min_limit, self.current * self.backoff)
+        elif in_flight >= self.current / 2:
+            # Only grow while the limit is actually being used, otherwise a
+            # quiet period would inflate it without evidence it is safe.
+            self.current = min(self.max_limit, self.current + 1 / self.current)
+
+
+class ConcurrencyGroup:
+    def __init__(
+        self,
+        name: str,
+        limit: AdaptiveLimit,
+        max_queue: int,
+        max_wait: float,
+        adaptive: bool = True,
+    ):
+        self.name = name
+        self.limit = limit
+        # A fixed group only bounds concurrency, its latency says nothing
+        # about load
+        self.adaptive = adaptive
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(1, int(self.limit.current))
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(True)
+
+    def _drop(self, entry: tuple[int, int, asyncio.Future]) -> None:
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+
+    async def acquire(self, priority: int, max_wait: float | None = None) -> bool:
+        """Take a slot, waiting at most `max_wait` (or the group's max_wait)."""
+        if not self._waiters and self._has_capacity():
+            self.in_flight += 1
+            return True
+
+        if len(self._waiters) >= self.max_queue:
+            # Full: shed the least important, newest waiter if we outrank it
+            worst = max(self._waiters)
+            if worst[0] <= priority:
+                self.rejected += 1
+                return False
+            self._drop(worst)
+            worst[2].set_result(False)
+            self.rejected += 1
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._sequence), waiter)
+        heapq.heappush(self._waiters, entry)
+        try:
+            wait = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+            async with asyncio.timeout(wait):
+                return await entry[2]
+        except TimeoutError:
+            self._abandon(entry)
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            # Deadline or client disconnect: the slot must not leak either way
+            self._abandon(entry)
+            raise
+
+    def _abandon(self, entry: tuple[int, int, asyncio.Future]) -> None:
+        if entry in self._waiters:
+            self._drop(entry)
+        elif entry[2].done() and not entry[2].cancelled() and entry[2].result():
+            # Granted a slot in the same tick the wait was given up
+            self.release()
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def record(self, latency: float, failed: bool) -> None:
+        if self.adaptive:
+            self.limit.on_sample(latency, failed, self.in_flight)
+        self._wake()
+
+
+def default_groups() -> dict[str, ConcurrencyGroup]:
+    target = CONCURRENCY_TARGET_LATENCY_MS / 1000
+    max_wait = CONCURRENCY_MAX_WAIT_MS / 1000
+    # More in flight than this worker has DB connections just queues on the pool
+    max_limit = min(CONCURRENCY_MAX_LIMIT, DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    return {
+        # Logins are Argon2-bound, so they get their own small budget and never
+        # queue behind API traffic
+        "auth": ConcurrencyGroup(
+            "auth",
+            AdaptiveLimit(8, 1, max(8, max_limit // 4), target * 2),
+            CONCURRENCY_QUEUE_SIZE,
+            max_wait,
+        ),
+        "api": ConcurrencyGroup(
+            "api",
+            AdaptiveLimit(max(2, max_limit // 2), 2, max(2, max_limit), target),
+            CONCURRENCY_QUEUE_SIZE,
+            max_wait,
+        ),
+        # Job long-polls sit on Redis for up to JOB_MAX_WAIT_SECONDS by design.
+        # Fed to the AIMD, every one of them would back the api limit off.
+        "poll": ConcurrencyGroup(
+            "poll",
+            AdaptiveLimit(
+                CONCURRENCY_MAX_LIMIT,
+                CONCURRENCY_MAX_LIMIT,
+                CONCURRENCY_MAX_LIMIT,
+                target,
+            ),
+            CONCURRENCY_QUEUE_SIZE,
+            max_wait,
+            adaptive=False,
+        ),
+    }
+
+
+BULK_PATHS = frozenset({"/user", "/org", "/user/batch", "/org/batch"})
+JOB_PATH_PREFIX = "/user/register-async/"
+JOB_BACKLOG_PATH = "/user/register-async/backlog"
+
+
+def classify(scope: Scope) -> tuple[str, int]:
+    path = scope["path"].rstrip("/") or "/"
+    if path.startswith("/auth"):
+        return "auth", PRIORITY_CRITICAL
+    if (
+        scope["method"] == "GET"
+        and path.startswith(JOB_PATH_PREFIX)
+        and path != JOB_BACKLOG_PATH
+    ):
+        return "poll", PRIORITY_DEFAULT
+    if scope["method"] == "GET" and path in BULK_PATHS:
+        return "api", PRIORITY_BULK
+    return "api", PRIORITY_DEFAULT
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        groups: dict[str, ConcurrencyGroup] | None = None,
+        classifier: Callable[[Scope], tuple[str, int]] = classify,
+        exempt_paths: frozenset[str] = frozenset(),
+    ):
+        self.app = app
+        self.groups = groups if groups is not None else default_groups()
+        self.classifier = classifier
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        group_name, priority = self.classifier(scope)
+        group = self.groups[group_name]
+        # Time spent queued comes out of the request's deadline
+        if not await group.acquire(priority, deadline.remaining()):
+            logger.warning(
+                "shedding %s %s (group=%s, limit=%.1f, queued=%s)",
+                scope["method"],
+                scope["path"],
+                group_name,
+                group.limit.current,
+                group.queued,
+            )
+            await self._overloaded(send)
+            return
+
+        status_code = None
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            group.release()
+            # Nothing was sent when the client went away or the request was
+            # cancelled, which says nothing about how loaded we are
+            if status_code is not None:
+                # 503s we didn't produce (e.g. pool timeouts) still count as
+                # overload
+                group.record(time.perf_counter() - start, failed=status_code >= 500)  # noqa: PLR2004
+
+    @staticmethod
+    async def _overloaded(send: Send) -> None:
+        body = json.dumps({"detail": "Server is overloaded, retry later"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,65 @@
+"""Sets the request deadline every DB, Redis and RMQ call is bounded by."""
+
+import logging
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from env import (
+    JOB_MAX_WAIT_SECONDS,
+    PROFILE_MAX_SECONDS,
+    REQUEST_TIMEOUT_MAX_SECONDS,
+    REQUEST_TIMEOUT_SECONDS,
+)
+from src.deadline import deadline
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_HEADER = "x-request-timeout"
+
+# Path prefix -> default budget in seconds, for routes that legitimately take
+# longer than REQUEST_TIMEOUT_SECONDS. The longest matching prefix wins.
+ROUTE_TIMEOUTS = {
+    # Long-polled job status
+    "/user/register-async/": JOB_MAX_WAIT_SECONDS + REQUEST_TIMEOUT_SECONDS,
+    # Sampling profiler, runs for up to ?seconds=
+    "/admin/profile": PROFILE_MAX_SECONDS + REQUEST_TIMEOUT_SECONDS,
+}
+
+
+class DeadlineMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        default: float = REQUEST_TIMEOUT_SECONDS,
+        route_timeouts: dict[str, float] | None = None,
+        max_timeout: float = REQUEST_TIMEOUT_MAX_SECONDS,
+    ):
+        self.app = app
+        self.default = default
+        self.max_timeout = max_timeout
+        routes = ROUTE_TIMEOUTS if route_timeouts is None else route_timeouts
+        self.route_timeouts = sorted(routes.items(), key=lambda r: -len(r[0]))
+
+    def timeout_for(self, scope: Scope) -> float:
+        """X-Request-Timeout (seconds) if valid, else the route default."""
+        requested = Headers(scope=scope).get(TIMEOUT_HEADER)
+        if requested:
+            try:
+                seconds = float(requested)
+            except ValueError:
+                logger.debug("ignoring %s: %r", TIMEOUT_HEADER, requested)
+            else:
+                if seconds > 0:
+                    return min(seconds, self.max_timeout)
+        for prefix, seconds in self.route_timeouts:
+            if scope["path"].startswith(prefix):
+                return seconds
+        return self.default
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with deadline(self.timeout_for(scope)):
+            await self.app(scope, receive, send)
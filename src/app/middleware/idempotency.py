@@ -0,0 +1,213 @@
+"""Idempotency-Key handling for non-idempotent POSTs.
+
+The first request with a given key takes a short in-progress lock in Redis,
+runs, and its response (status, headers, body) is stored for
+IDEMPOTENCY_TTL_SECONDS. A retry with the same key and body gets the stored
+response replayed; one that arrives while the first is still running gets a
+409 straight from Redis, before the request reaches a service. Keys are
+scoped per credential and path, and reusing a key with a different body is a
+422. If Redis is unavailable requests are passed through unchanged.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from env import IDEMPOTENCY_LOCK_SECONDS, IDEMPOTENCY_TTL_SECONDS
+from src.redis_client import RedisClient, RedisProtocol
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+IDEMPOTENT_PATHS = frozenset({"/user", "/org"})
+
+PROCESSING = "processing"
+DONE = "done"
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class IdempotencyMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        redis: RedisProtocol | None = None,
+        paths: frozenset[str] = IDEMPOTENT_PATHS,
+        ttl: int = IDEMPOTENCY_TTL_SECONDS,
+        lock_ttl: int = IDEMPOTENCY_LOCK_SECONDS,
+    ):
+        self.app = app
+        self.redis = redis
+        self.paths = paths
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+
+    def _redis(self) -> RedisProtocol:
+        # Resolved per request so the app can be built before Redis connects
+        return self.redis if self.redis is not None else RedisClient()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"].rstrip("/") not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await self._reply(send, 400, "Invalid Idempotency-Key")
+            return
+
+        body = await self._read_body(receive)
+        if body is None:  # client went away
+            return
+        # Different tokens never share a key, even for the same path
+        principal = _digest(headers.get("authorization", "").encode())[:16]
+        redis_key = f"idem:{scope['path'].rstrip('/')}:{principal}:{key}"
+        fingerprint = _digest(body)
+
+        record = json.dumps({"state": PROCESSING, "fingerprint": fingerprint})
+        acquired = await self._redis().set_nx(redis_key, self.lock_ttl, record)
+        if acquired is None:
+            logger.warning("idempotency store unavailable, passing %s through", key)
+            await self.app(scope, self._replay_body(body, receive), send)
+            return
+        if not acquired:
+            await self._duplicate(send, redis_key, fingerprint)
+            return
+        await self._run_and_store(
+            scope, body, receive, send, redis_key=redis_key, fingerprint=fingerprint
+        )
+
+    async def _run_and_store(  # noqa: PLR0913
+        self,
+        scope: Scope,
+        body: bytes,
+        receive: Receive,
+        send: Send,
+        *,
+        redis_key: str,
+        fingerprint: str,
+    ) -> None:
+        start: Message | None = None
+        chunks: list[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, self._replay_body(body, receive), send_wrapper)
+            # 5xx isn't a final answer: drop the lock so a retry runs again
+            if start is not None and start["status"] < 500:  # noqa: PLR2004
+                response = {
+                    "state": DONE,
+                    "fingerprint": fingerprint,
+                    "status": start["status"],
+                    "headers": [
+                        [name.decode("latin-1"), value.decode("latin-1")]
+                        for name, value in start.get("headers", [])
+                    ],
+                    "body": base64.b64encode(b"".join(chunks)).decode(),
+                }
+                stored = await self._redis().setex(
+                    redis_key, self.ttl, json.dumps(response)
+                )
+        finally:
+            if not stored:
+                await self._redis().delete(redis_key)
+
+    async def _duplicate(self, send: Send, redis_key: str, fingerprint: str) -> None:
+        cached = await self._redis().get(redis_key)
+        if cached is None:
+            # Expired or released between SET NX and GET; let the client retry
+            await self._reply(send, 409, "Request with this Idempotency-Key failed")
+            return
+        record = json.loads(cached)
+        if record["fingerprint"] != fingerprint:
+            await self._reply(
+                send, 422, "Idempotency-Key was already used with a different body"
+            )
+            return
+        if record["state"] == PROCESSING:
+            await self._reply(
+                send,
+                409,
+                "A request with this Idempotency-Key is in progress",
+                [(b"retry-after", b"1")],
+            )
+            return
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in record["headers"]
+        ]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": record["status"],
+                "headers": headers,
+            }
+        )
+        await send(
+            {"type": "http.response.body", "body": base64.b64decode(record["body"])}
+        )
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes | None:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _replay_body(body: bytes, receive: Receive) -> Receive:
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return replay
+
+    @staticmethod
+    async def _reply(
+        send: Send,
+        status_code: int,
+        detail: str,
+        extra_headers: list[tuple[bytes, bytes]] | None = None,
+    ) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *(extra_headers or []),
+        ]
+        await send(
+            {"type": "http.response.start", "status": status_code, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,52 @@
+"""Per-route request latency and status counts."""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics import Counter, Histogram
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to the end of its response",
+    ["method", "route"],
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Responses sent", ["method", "route", "status"]
+)
+
+# Paths that didn't match a route share one label, so scanners can't blow up
+# the number of series
+UNMATCHED = "<unmatched>"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the (shared) scope, so the
+            # label is the path template, e.g. /user/{user_id}
+            route = scope.get("route")
+            route = getattr(route, "path", UNMATCHED)
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(
+                time.perf_counter() - start
+            )
+            HTTP_REQUESTS.labels(method, route, status_code).inc()
@@ -0,0 +1,52 @@
+"""Per-request cProfile, for admins.
+
+A request sent with `X-Profile: 1` and a valid X-Admin-Key runs under
+cProfile, and the response is replaced by the stats (sorted by cumulative
+time). X-Profiled-Status carries the status the request would have returned.
+"""
+
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.auth.security import is_admin_key
+from src.exceptions.request_exceptions import ProfilerBusyError
+from src.profiling import profile_call
+
+PROFILE_HEADER = "x-profile"
+ADMIN_KEY_HEADER = "x-admin-key"
+
+
+class ProfileMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get(PROFILE_HEADER) or not is_admin_key(
+            headers.get(ADMIN_KEY_HEADER)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def discard(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        try:
+            _, stats = await profile_call(lambda: self.app(scope, receive, discard))
+        except ProfilerBusyError:
+            response = PlainTextResponse(
+                "a profile is already running", status_code=409
+            )
+        else:
+            response = PlainTextResponse(
+                stats, headers={"x-profiled-status": str(status_code)}
+            )
+        await response(scope, receive, send)
@@ -0,0 +1,40 @@
+"""Root span per request, continuing the caller's trace if it sent one."""
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.tracing import TRACEPARENT, start_trace
+
+TRACE_ID_HEADER = "x-trace-id"
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp, exempt_paths: frozenset[str] = frozenset()):
+        self.app = app
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        parent = Headers(scope=scope).get(TRACEPARENT)
+        with start_trace(f"{method} {scope['path']}", parent, method=method) as root:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    root.attributes["status"] = message["status"]
+                    if root.sampled:
+                        # Lets whoever saw a slow response find its trace
+                        headers = MutableHeaders(scope=message)
+                        headers.append(TRACE_ID_HEADER, root.trace_id)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Named after the route template once routing has matched
+                route = scope.get("route")
+                if route is not None:
+                    root.name = f"{method} {route.path}"
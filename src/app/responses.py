@@ -0,0 +1,45 @@
+from collections.abc import Collection
+from functools import cache
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+
+@cache
+def _adapter(model: type[BaseModel], many: bool) -> TypeAdapter:
+    return TypeAdapter(list[model] if many else model)
+
+
+class ModelResponse(Response):
+    """JSON response for models the service layer has already validated.
+
+    Returning a Response from a route makes FastAPI skip its own
+    response_model validation and serialization, so each object is validated
+    once (in the service) and serialized once (here, by pydantic-core).
+    Keep `response_model=` on the route so the OpenAPI schema stays the same.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,  # noqa: ANN401
+        *args,
+        include: Collection[str] | None = None,
+        **kwargs,  # noqa: ANN003
+    ) -> None:
+        # `include` restricts the rendered fields (sparse fieldsets)
+        self.include = None if include is None else set(include)
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:  # noqa: ANN401
+        if isinstance(content, BaseModel):
+            adapter = _adapter(type(content), many=False)
+            return adapter.dump_json(content, include=self.include)
+        if isinstance(content, list) and content and isinstance(content[0], BaseModel):
+            include = None if self.include is None else {"__all__": self.include}
+            adapter = _adapter(type(content[0]), many=True)
+            return adapter.dump_json(content, include=include)
+        return to_json(content)
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import threading
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from env import PROFILE_MAX_SECONDS
+from src.app.routers.deps import admin_required
+from src.database import query_stats
+from src.exceptions.request_exceptions import ProfilerBusyError
+from src.profiling import collapsed, sample_stacks
+
+admin_router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(admin_required)],
+    include_in_schema=False,
+)
+
+
+@admin_router.get("/queries/top")
+async def top_queries(
+    limit: int = Query(20, ge=1, le=500),
+    order: Literal["total_ms", "mean_ms", "max_ms", "calls"] = "total_ms",
+) -> dict:
+    # Stats are per worker process, the pid says which one answered
+    return {"pid": os.getpid(), "statements": query_stats.top(limit, order)}
+
+
+@admin_router.delete("/queries")
+async def reset_queries() -> dict:
+    query_stats.reset()
+    return {"pid": os.getpid(), "reset": True}
+
+
+@admin_router.get("/profile")
+async def profile(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+) -> PlainTextResponse:
+    """Sample this worker's event loop; returns collapsed stacks for a flamegraph."""
+    loop_thread = threading.get_ident()
+    try:
+        samples = await asyncio.to_thread(
+            sample_stacks, loop_thread, seconds, interval_ms / 1000
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="a profile is already running",
+        ) from e
+    return PlainTextResponse(
+        collapsed(samples),
+        headers={
+            "content-disposition": (
+                f'attachment; filename="profile-{os.getpid()}.folded"'
+            )
+        },
+    )
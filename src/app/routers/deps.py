@@ -1,14 +1,20 @@
-from fastapi import Depends, HTTPException, Request, status
+from collections.abc import Callable
+from typing import Annotated
+
+from fastapi import Depends, Header, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from pydantic import BaseModel
 from redis import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.auth.security import ALGORITHM, SECRET_KEY
+from env import ADMIN_API_KEY, BATCH_MAX_SIZE
+from src.auth.security import decode_access_token, is_admin_key
 from src.database import get_db
 from src.redis_client import RedisClient, get_redis
+from src.services.job_service import RegistrationJobService
 from src.services.org_service import OrgService
 from src.services.user_service import UserService
+from src.tracing import span
 
 # tokenUrl points to the login route for Swagger UI compatibility
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -28,13 +34,66 @@ async def get_org_service(
     return OrgService(session)
 
 
+async def get_job_service(
+    redis: Redis = Depends(get_redis),
+) -> RegistrationJobService:
+    return RegistrationJobService(RedisClient(redis))
+
+
+def get_batch_ids(
+    ids: Annotated[list[str], Query(description="Comma-separated and/or repeated ids")],
+) -> list[int]:
+    """Parse `?ids=1,2,3` (or `?ids=1&ids=2`) into unique ids, in request order."""
+    try:
+        parsed = [int(i) for chunk in ids for i in chunk.split(",") if i.strip()]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=422,
+            detail="ids must be integers",
+        ) from e
+    unique = list(dict.fromkeys(parsed))
+    if not unique or len(unique) > BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"ids must contain between 1 and {BATCH_MAX_SIZE} ids",
+        )
+    return unique
+
+
+def fieldset(model: type[BaseModel]) -> Callable[..., frozenset[str] | None]:
+    """Dependency parsing `?fields=a,b` into names validated against `model`."""
+    allowed = frozenset(model.model_fields)
+
+    def parse_fields(
+        fields: Annotated[
+            str | None,
+            Query(description=f"Comma-separated subset of: {', '.join(allowed)}"),
+        ] = None,
+    ) -> frozenset[str] | None:
+        if fields is None:
+            return None
+        requested = frozenset(f.strip() for f in fields.split(",") if f.strip())
+        if not requested:
+            raise HTTPException(status_code=422, detail="fields must not be empty")
+        unknown = requested - allowed
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"unknown fields: {', '.join(sorted(unknown))}",
+            )
+        return requested
+
+    return parse_fields
+
+
 async def auth_required(
     request: Request,
     token: str = Depends(oauth2_scheme),
     service: UserService = Depends(get_user_service),  # Your existing dependency
 ):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with span("auth.decode_token"):
+            payload = decode_access_token(token)
         user_id_str: str = payload.get("sub")
         if user_id_str is None:
             raise HTTPException(status_code=401, detail="Invalid token payload")
@@ -47,9 +106,19 @@ async def auth_required(
         # Attach user to request state
         request.state.user = user
 
-    except (JWTError, ValueError) as e:
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         ) from e
+
+
+async def admin_required(
+    x_admin_key: Annotated[str | None, Header()] = None,
+) -> None:
+    # Without a configured key the admin endpoints don't exist
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not is_admin_key(x_admin_key):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Request, Response, status
+
+health_router = APIRouter(tags=["health"])
+
+NOT_STARTED = b'{"status":"starting"}'
+
+
+@health_router.get("/healthz")
+async def healthz() -> dict:
+    # Liveness: the event loop is answering. No I/O on purpose, a DB outage
+    # must not get every worker restarted.
+    return {"status": "ok"}
+
+
+@health_router.get("/readyz")
+async def readyz(request: Request) -> Response:
+    # Readiness: the last background snapshot, rendered when it was taken
+    monitor = getattr(request.app.state, "health", None)
+    if monitor is None:
+        return Response(
+            NOT_STARTED,
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            media_type="application/json",
+        )
+    return Response(
+        monitor.body,
+        status_code=status.HTTP_200_OK
+        if monitor.ready
+        else status.HTTP_503_SERVICE_UNAVAILABLE,
+        media_type="application/json",
+    )
@@ -1,11 +1,25 @@
 import logging
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 
-from src.app.routers.deps import auth_required, get_org_service
-from src.exceptions.db_exceptions import NotFoundError
-from src.schemas.org_schema import OrgCreate, OrgPublic, OrgUpdate
+from src.app.etag import (
+    conditional,
+    etag_matches,
+    expected_version,
+    not_modified,
+    resource_etag,
+)
+from src.app.responses import ModelResponse
+from src.app.routers.deps import (
+    auth_required,
+    fieldset,
+    get_batch_ids,
+    get_org_service,
+)
+from src.exceptions.db_exceptions import NotFoundError, VersionConflictError
+from src.exceptions.request_exceptions import DeadlineExceededError
+from src.schemas.org_schema import OrgBatch, OrgCreate, OrgPublic, OrgUpdate
 from src.services.org_service import OrgService
 
 org_router = APIRouter(
@@ -14,59 +28,107 @@ org_router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
+org_fields = fieldset(OrgPublic)
+
 
-@org_router.post("", status_code=status.HTTP_201_CREATED)
+@org_router.post("", status_code=status.HTTP_201_CREATED, response_model=OrgPublic)
 async def create_org(
     org_data: OrgCreate,
     service: OrgService = Depends(get_org_service),
-) -> OrgPublic:
+) -> ModelResponse:
     try:
-        return await service.create_org(org_data)
+        org = await service.create_org(org_data)
+        return ModelResponse(org, status_code=status.HTTP_201_CREATED)
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.exception("error while creating org")
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
-@org_router.get("")
+@org_router.get("", response_model=list[OrgPublic])
 async def list_orgs(
     limit: Annotated[int, Query(le=100)] = 100,
     offset: int = 0,
+    fields: frozenset[str] | None = Depends(org_fields),
+    if_none_match: Annotated[str | None, Header()] = None,
     service: OrgService = Depends(get_org_service),
-) -> list[OrgPublic]:
+) -> ModelResponse:
     try:
-        return list(await service.list_orgs(limit=limit, offset=offset))
+        orgs = await service.list_orgs(limit=limit, offset=offset, fields=fields)
+        response = ModelResponse(list(orgs), include=fields)
+        return conditional(response, if_none_match)
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.exception("error while listing orgs")
         raise HTTPException(status_code=500, detail="Internal Server Error") from e
 
 
-@org_router.get("/{org_id}")
+@org_router.get("/batch", response_model=OrgBatch)
+async def get_orgs_batch(
+    org_ids: list[int] = Depends(get_batch_ids),
+    service: OrgService = Depends(get_org_service),
+) -> ModelResponse:
+    try:
+        return ModelResponse(await service.get_orgs(org_ids))
+    except DeadlineExceededError:
+        raise
+    except Exception as e:
+        logger.exception("error while fetching org batch")
+        raise HTTPException(status_code=500, detail="Internal Server Error") from e
+
+
+@org_router.get("/{org_id}", response_model=OrgPublic)
 async def get_org(
     org_id: int,
+    fields: frozenset[str] | None = Depends(org_fields),
+    if_none_match: Annotated[str | None, Header()] = None,
     service: OrgService = Depends(get_org_service),
-) -> OrgPublic:
+) -> ModelResponse:
     try:
-        org = await service.get_org(org_id)
+        if if_none_match:
+            # Revalidation only needs the version column, not the config blob
+            version = await service.get_org_version(org_id)
+            if version is not None:
+                etag = resource_etag("org", org_id, version, fields)
+                if etag_matches(if_none_match, etag):
+                    return not_modified(etag)
+        org = await service.get_org(org_id, fields)
         if not org:
             raise NotFoundError
-        return org
+        etag = resource_etag("org", org.id, org.version, fields)
+        return ModelResponse(org, headers={"ETag": etag}, include=fields)
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail="Org not found") from e
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.exception("error while fetching org")
         raise HTTPException(status_code=500, detail="Internal Server Error") from e
 
 
-@org_router.patch("/{org_id}")
+@org_router.patch("/{org_id}", response_model=OrgPublic)
 async def update_org(
     org_id: int,
     org_data: OrgUpdate,
+    if_match: Annotated[str | None, Header()] = None,
     service: OrgService = Depends(get_org_service),
-) -> OrgPublic:
+) -> ModelResponse:
+    version = expected_version(if_match, "org", org_id)
     try:
-        return await service.update_org(org_id, org_data)
+        org = await service.update_org(org_id, org_data, version)
+        etag = resource_etag("org", org.id, org.version)
+        return ModelResponse(org, headers={"ETag": etag})
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail="Org not found") from e
+    except VersionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Org has been modified",
+        ) from e
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.exception("error while updating org")
         raise HTTPException(status_code=500, detail="Internal Server Error") from e
@@ -83,6 +145,8 @@ async def delete_org(
             raise NotFoundError
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail="Org not found") from e
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.exception("error while deleting org")
         raise HTTPException(status_code=500, detail="Internal Server Error") from e
@@ -3,13 +3,32 @@ import logging
 import threading
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 
-from src.app.routers.deps import auth_required, get_user_service
-from src.exceptions.db_exceptions import NotFoundError
+from env import JOB_MAX_WAIT_SECONDS
+from src.app.etag import (
+    conditional,
+    etag_matches,
+    expected_version,
+    not_modified,
+    resource_etag,
+)
+from src.app.responses import ModelResponse
+from src.app.routers.deps import (
+    auth_required,
+    fieldset,
+    get_batch_ids,
+    get_job_service,
+    get_user_service,
+)
+from src.exceptions.db_exceptions import NotFoundError, VersionConflictError
+from src.exceptions.request_exceptions import DeadlineExceededError
+from src.exceptions.rmq_exceptions import QueueOverloadedError
 from src.rmq import get_rmq_publisher
 from src.rmq.publisher import RabbitMQPublisher
-from src.schemas.user_schema import UserCreate, UserPublic, UserUpdate
+from src.schemas.job_schema import RegistrationJob
+from src.schemas.user_schema import UserBatch, UserCreate, UserPublic, UserUpdate
+from src.services.job_service import RegistrationJobService
 from src.services.user_service import UserService
 
 user_router = APIRouter(
@@ -18,12 +37,14 @@ user_router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
+user_fields = fieldset(UserPublic)
+
 
-@user_router.post("", status_code=status.HTTP_201_CREATED)
+@user_router.post("", status_code=status.HTTP_201_CREATED, response_model=UserPublic)
 async def create_user(
     user_data: UserCreate,
     service: UserService = Depends(get_user_service),
-) -> UserPublic:
+) -> ModelResponse:
     loop = asyncio.get_running_loop()
     logger.info(
         "router event loop: %s %s %s %s",
@@ -34,66 +55,150 @@ async def create_user(
     )
     try:
         user = await service.register_user(user_data)
-        return UserPublic.model_validate(user)
+        return ModelResponse(user, status_code=status.HTTP_201_CREATED)
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.exception("error while creating user")
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
-@user_router.get("")
+@user_router.get("", response_model=list[UserPublic])
 async def list_users(
     limit: Annotated[int, Query(le=100)] = 100,
     offset: int = 0,
+    fields: frozenset[str] | None = Depends(user_fields),
+    if_none_match: Annotated[str | None, Header()] = None,
     service: UserService = Depends(get_user_service),
-) -> list[UserPublic]:
+) -> ModelResponse:
     try:
         # Now calling the service's list method
-        users = await service.list_active_users(limit=limit, offset=offset)
-        return [UserPublic.model_validate(u) for u in users]
+        users = await service.list_active_users(
+            limit=limit, offset=offset, fields=fields
+        )
+        response = ModelResponse(list(users), include=fields)
+        return conditional(response, if_none_match)
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.exception("error while listing user")
         raise HTTPException(status_code=500, detail="Internal Server Error") from e
 
 
-@user_router.get("/{user_id}")
+@user_router.get("/batch", response_model=UserBatch)
+async def get_users_batch(
+    user_ids: list[int] = Depends(get_batch_ids),
+    service: UserService = Depends(get_user_service),
+) -> ModelResponse:
+    try:
+        return ModelResponse(await service.get_user_profiles(user_ids))
+    except DeadlineExceededError:
+        raise
+    except Exception as e:
+        logger.exception("error while fetching user batch")
+        raise HTTPException(status_code=500, detail="Internal Server Error") from e
+
+
+@user_router.get("/{user_id}", response_model=UserPublic)
 async def get_user(
-    user_id: int, service: UserService = Depends(get_user_service)
-) -> UserPublic:
+    user_id: int,
+    fields: frozenset[str] | None = Depends(user_fields),
+    if_none_match: Annotated[str | None, Header()] = None,
+    service: UserService = Depends(get_user_service),
+) -> ModelResponse:
     try:
-        # Now calling the service's get method
-        user = await service.get_user_profile(user_id)
+        # Now calling the service's get method (served from cache when warm,
+        # which also makes the 304 check free)
+        user = await service.get_user_profile(user_id, fields)
         if not user:
             raise NotFoundError
-        return UserPublic.model_validate(user)
+        etag = resource_etag("user", user.id, user.version, fields)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return ModelResponse(user, headers={"ETag": etag}, include=fields)
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail="User not found") from e
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.exception("error while fetching user")
         raise HTTPException(status_code=500, detail="Internal Server Error") from e
 
 
-@user_router.patch("/{user_id}")
+@user_router.patch("/{user_id}", response_model=UserPublic)
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
+    if_match: Annotated[str | None, Header()] = None,
     service: UserService = Depends(get_user_service),
-) -> UserPublic:
+) -> ModelResponse:
+    version = expected_version(if_match, "user", user_id)
     try:
-        user = await service.update_user_info(user_id, user_data)
-        return UserPublic.model_validate(user)
+        user = await service.update_user_info(user_id, user_data, version)
+        etag = resource_etag("user", user.id, user.version)
+        return ModelResponse(user, headers={"ETag": etag})
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail="User not found") from e
+    except VersionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="User has been modified",
+        ) from e
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.exception("error while updating user")
         raise HTTPException(status_code=500, detail="Internal Server Error") from e
 
 
-@user_router.post("/register-async")
+@user_router.post("/register-async", status_code=status.HTTP_202_ACCEPTED)
 async def register_user_async(
-    user_data: UserCreate, publisher: RabbitMQPublisher = Depends(get_rmq_publisher)
+    user_data: UserCreate,
+    publisher: RabbitMQPublisher = Depends(get_rmq_publisher),
+    jobs: RegistrationJobService = Depends(get_job_service),
 ):
     # Instead of calling UserService (which hits the DB now),
     # we just toss the data into RabbitMQ and return 202 Accepted.
-    await publisher.publish(user_data.model_dump())
+    # The message id is the job id the client polls on.
+    try:
+        job_id = await publisher.publish(user_data.model_dump())
+    except QueueOverloadedError as e:
+        # Shed load while the worker catches up instead of growing the backlog
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Registration queue is full, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        ) from e
+    job = await jobs.create(job_id)
+
+    return {
+        "message": "User registration is being processed in the background",
+        "job_id": job.job_id,
+        "status": job.status,
+    }
+
+
+@user_router.get("/register-async/backlog")
+async def register_async_backlog(
+    publisher: RabbitMQPublisher = Depends(get_rmq_publisher),
+):
+    # Served from the last sampled depth, so polling this costs no broker I/O
+    return {
+        "queue_depth": publisher.queue_depth,
+        "consumer_count": publisher.consumer_count,
+        "high_water_mark": publisher.high_water_mark,
+        "checked_at": publisher.depth_checked_at,
+    }
+
 
-    return {"message": "User registration is being processed in the background"}
+@user_router.get("/register-async/{job_id}")
+async def get_registration_job(
+    job_id: str,
+    wait: Annotated[float, Query(ge=0, le=JOB_MAX_WAIT_SECONDS)] = 0,
+    jobs: RegistrationJobService = Depends(get_job_service),
+) -> RegistrationJob:
+    # wait > 0 long-polls until the job is done/failed or the wait runs out
+    job = await jobs.wait(job_id, wait) if wait else await jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,28 +1,60 @@
+import hmac
 from datetime import datetime, timedelta, timezone
+from functools import cache
 
-from jose import jwt
-from pwdlib import PasswordHash
+from env import ADMIN_API_KEY
 
-# Modern Argon2 hasher - better than bcrypt for high-end hardware
-password_hash = PasswordHash.recommended()
+# jose and pwdlib (argon2) are imported on first use, so the app and scripts
+# that never hash or sign anything don't pay for them at startup.
 
 SECRET_KEY = "your-ultra-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 
+@cache
+def password_hasher():
+    """Modern Argon2 hasher - better than bcrypt for high-end hardware."""
+    from pwdlib import PasswordHash  # noqa: PLC0415
+
+    return PasswordHash.recommended()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies a password against a hash."""
-    return password_hash.verify(plain_password, hashed_password)
+    return password_hasher().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Generates a secure hash using Argon2ID."""
-    return password_hash.hash(password)
+    return password_hasher().hash(password)
 
 
 def create_access_token(user_id: int) -> str:
     """Creates a stateless JWT."""
+    from jose import jwt  # noqa: PLC0415
+
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = {"exp": expire, "sub": str(user_id)}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str) -> dict:
+    """Verifies a JWT and returns its claims, raising ValueError if invalid."""
+    from jose import JWTError, jwt  # noqa: PLC0415
+
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as e:
+        raise ValueError(str(e)) from e
+
+
+def is_admin_key(key: str | None, admin_key: str | None = ADMIN_API_KEY) -> bool:
+    """Checks an X-Admin-Key value; always False while no admin key is set."""
+    # Compared as bytes: compare_digest raises TypeError on non-ASCII str,
+    # and the header value is whatever the client sent
+    return (
+        bool(admin_key)
+        and key is not None
+        and hmac.compare_digest(key.encode(), admin_key.encode())
+    )
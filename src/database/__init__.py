@@ -1,17 +1,111 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from env import (
+    DATABASE_URL,
+    DB_CONNECTION_BUDGET,
+    DB_EXTRA_PROCESSES,
+    WEB_CONCURRENCY,
+)
+from src.database.query_stats import QueryStats
+from src.metrics import Counter, Gauge, Histogram
+from src.tracing import span
+
+logger = logging.getLogger(__name__)
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled connection"
+)
+POOL_CONNECTIONS = Counter(
+    "db_pool_connections_opened_total", "New database connections opened"
+)
+POOL_IN_USE = Gauge("db_pool_checked_out", "Connections currently checked out")
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond pool_size")
+POOL_SIZE = Gauge("db_pool_size", "Configured steady pool size")
+
+
+def pool_sizing(
+    budget: int, workers: int, extra: int = DB_EXTRA_PROCESSES
+) -> tuple[int, int]:
+    """Split a global connection budget into (pool_size, max_overflow) per process.
+
+    The budget is shared by `workers` web workers and `extra` other processes
+    with the same pool: uvicorn starts a replacement before it retires a
+    worker on a rolling restart, and the RMQ worker imports this module too.
+    Half of each share stays open, the other half is burst capacity, so
+    together they never hold more than `budget` connections.
+
+    A pool needs at least one connection of each kind. If the budget is too
+    small for that, the pools can exceed it, and a warning says by how much.
+    """
+    processes = max(1, workers) + max(0, extra)
+    share = budget // processes
+    if share < 2:  # noqa: PLR2004
+        share = 2
+        logger.warning(
+            "DB_CONNECTION_BUDGET=%s is too small for %s processes, their pools"
+            " can hold up to %s connections",
+            budget,
+            processes,
+            share * processes,
+        )
+    pool_size = share // 2
+    return pool_size, share - pool_size
+
+
+DB_POOL_SIZE, DB_MAX_OVERFLOW = pool_sizing(DB_CONNECTION_BUDGET, WEB_CONCURRENCY)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Records how long each checkout waited, including opening a connection."""
+
+    # Keep SQLAlchemy's logger name; under "src" the pool would log every
+    # checkout at DEBUG
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+
+    def _do_get(self):  # noqa: ANN202
+        start = time.perf_counter()
+        try:
+            # SQLAlchemy runs this in a greenlet sharing the task's context, so
+            # the span lands in the request's trace
+            with span("db.pool_checkout"):
+                return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
 
-from env import DATABASE_URL
 
 engine = create_async_engine(
     DATABASE_URL,
-    pool_size=20,  # steady open connections
-    max_overflow=20,  # extra burst connections
+    poolclass=InstrumentedPool,
+    pool_size=DB_POOL_SIZE,  # steady open connections
+    max_overflow=DB_MAX_OVERFLOW,  # extra burst connections
     pool_timeout=30,  # wait before giving up
     pool_recycle=1800,  # recycle stale conns every 30 min
     pool_pre_ping=True,
 )
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(*_) -> None:
+    POOL_CONNECTIONS.inc()
+
+
+# Per-fingerprint latency, slow-query log and sampled EXPLAIN (/admin/queries)
+query_stats = QueryStats()
+query_stats.instrument(engine)
+
+# Read from the pool when scraped, nothing to keep in sync per checkout.
+# Looked up each time: engine.dispose() replaces the pool.
+POOL_IN_USE.set_function(lambda: engine.pool.checkedout())  # noqa: PLW0108
+POOL_OVERFLOW.set_function(lambda: max(0, engine.pool.overflow()))
+POOL_SIZE.set_function(lambda: engine.pool.size())  # noqa: PLW0108
+
 # session factory
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
@@ -23,3 +117,11 @@ class Base(DeclarativeBase):
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def warm_pool(size: int = DB_POOL_SIZE) -> None:
+    """Open `size` connections up front so early requests don't pay for connects."""
+    connections = await asyncio.gather(*(engine.connect() for _ in range(size)))
+    # Closing hands them back to the pool, still open
+    for connection in connections:
+        await connection.close()
@@ -11,6 +11,8 @@ class Org(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, nullable=False, index=True)
     config = Column(JSONB, nullable=True)
+    # bumped on every update; drives ETags and If-Match checks
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     users = relationship("User", back_populates="org")
 
@@ -22,6 +24,7 @@ class User(Base):
     name = Column(String, nullable=False, index=True)
     password = Column(String, nullable=False)
     org_id = Column(Integer, ForeignKey("orgs.id"), nullable=False, index=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     org = relationship("Org", back_populates="users")
 
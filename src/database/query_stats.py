@@ -0,0 +1,196 @@
+"""Per-statement latency stats, slow-query log and sampled EXPLAIN plans.
+
+Cursor events time every statement the engine sends. Statements are grouped
+by fingerprint (whitespace collapsed, inlined literals replaced by `?`; bound
+parameters are already placeholders), so `get` for any id is one entry.
+
+A statement slower than DB_SLOW_QUERY_MS is logged. For a sample of slow
+SELECTs (DB_EXPLAIN_SAMPLE_RATE, at most once per fingerprint every
+DB_EXPLAIN_COOLDOWN_SECONDS) `EXPLAIN (ANALYZE, BUFFERS)` is run with the same
+parameters in a background task, on a spare pool connection only, and the
+plan is kept with the stats. Other statements are never explained: ANALYZE
+executes them.
+
+Stats are per process; with several workers each reports what it ran.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExceptionContext, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from env import (
+    DB_EXPLAIN_COOLDOWN_SECONDS,
+    DB_EXPLAIN_SAMPLE_RATE,
+    DB_SLOW_QUERY_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+# String literals and numbers not part of an identifier or a $n placeholder
+_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![$\w])\d+(?:\.\d+)?\b")
+
+OTHER = "<other>"  # stats for fingerprints beyond `max_statements`
+ORDERS = ("total_ms", "mean_ms", "max_ms", "calls")
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    return _LITERALS.sub("?", _WHITESPACE.sub(" ", statement).strip())
+
+
+@dataclass(slots=True)
+class StatementStats:
+    fingerprint: str
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    slow_calls: int = 0
+    plan: Any = None  # the last sampled EXPLAIN output
+    explained_at: float | None = None
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "total_ms": round(self.total_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "mean_ms": round(self.mean_ms, 3),
+        }
+
+
+class QueryStats:
+    def __init__(
+        self,
+        slow_ms: float = DB_SLOW_QUERY_MS,
+        explain_sample_rate: float = DB_EXPLAIN_SAMPLE_RATE,
+        explain_cooldown: float = DB_EXPLAIN_COOLDOWN_SECONDS,
+        max_statements: int = 1000,
+    ):
+        self.slow_ms = slow_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_cooldown = explain_cooldown
+        self.max_statements = max_statements
+        self.statements: dict[str, StatementStats] = {}
+        self._engine: AsyncEngine | None = None
+        self._explaining: set[asyncio.Task] = set()
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        self._engine = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+        event.listen(engine.sync_engine, "handle_error", self._error)
+
+    def _before(self, conn: Connection, *_) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _error(self, context: ExceptionContext) -> None:
+        # after_cursor_execute doesn't fire for a failed statement; drop its
+        # start so it doesn't leak on the pooled connection or pair up with
+        # the next statement
+        if context.connection is not None and context.connection.info.get(
+            "query_start"
+        ):
+            context.connection.info["query_start"].pop()
+
+    def _after(
+        self,
+        conn: Connection,
+        _cursor: object,
+        statement: str,
+        parameters: object,
+        _context: ExecutionContext,
+        executemany: bool,
+    ) -> None:
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1e3
+        stats = self.record(statement, elapsed_ms)
+        if stats is not None and elapsed_ms >= self.slow_ms and not executemany:
+            self._maybe_explain(stats, statement, parameters)
+
+    def record(self, statement: str, elapsed_ms: float) -> StatementStats | None:
+        if statement.startswith("EXPLAIN"):
+            return None  # our own plan captures
+        key = fingerprint(statement)
+        stats = self.statements.get(key)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                key = OTHER
+            stats = self.statements.setdefault(key, StatementStats(key))
+        stats.calls += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        if elapsed_ms >= self.slow_ms:
+            stats.slow_calls += 1
+            logger.warning("slow query (%.1f ms): %s", elapsed_ms, key)
+        return stats
+
+    def top(self, limit: int = 20, order: str = "total_ms") -> list[dict[str, Any]]:
+        if order not in ORDERS:
+            error_message = f"order must be one of {ORDERS}"
+            raise ValueError(error_message)
+        ranked = sorted(
+            self.statements.values(), key=lambda s: getattr(s, order), reverse=True
+        )
+        return [s.to_dict() for s in ranked[:limit]]
+
+    def reset(self) -> None:
+        self.statements.clear()
+
+    def _maybe_explain(
+        self, stats: StatementStats, statement: str, parameters: object
+    ) -> None:
+        if (
+            self._engine is None
+            or stats.fingerprint == OTHER
+            or statement.lstrip()[:6].upper() != "SELECT"
+            or random.random() >= self.explain_sample_rate  # noqa: S311
+            or (
+                stats.explained_at is not None
+                and time.time() - stats.explained_at < self.explain_cooldown
+            )
+        ):
+            return
+        pool = self._engine.pool
+        if pool.checkedout() >= pool.size():
+            return  # no spare connection, don't compete with requests
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # sync use, e.g. a script
+        stats.explained_at = time.time()
+        task = loop.create_task(self._explain(stats, statement, parameters))
+        self._explaining.add(task)
+        task.add_done_callback(self._explaining.discard)
+
+    async def _explain(
+        self, stats: StatementStats, statement: str, parameters: object
+    ) -> None:
+        timeout_ms = int(max(self.slow_ms * 10, 1000))
+        try:
+            async with self._engine.connect() as connection:
+                await connection.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {timeout_ms}"
+                )
+                result = await connection.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+                )
+                plan = result.scalar_one()
+                await connection.rollback()
+        except Exception:
+            logger.warning("EXPLAIN failed for %s", stats.fingerprint, exc_info=True)
+            return
+        stats.plan = json.loads(plan) if isinstance(plan, str) else plan
+        logger.info("captured plan for slow query: %s", stats.fingerprint)
@@ -0,0 +1,52 @@
+"""Per-request deadlines.
+
+The deadline lives in a context variable, so it follows the request through
+the router, the services and the repositories without being passed around.
+Each client (Postgres, Redis, RabbitMQ) bounds its own I/O by `remaining()`.
+"""
+
+import asyncio
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from src.exceptions.request_exceptions import DeadlineExceededError
+
+# time.monotonic() value the current request must finish by, None = unbounded
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float | None) -> Iterator[None]:
+    """Bound the enclosed block to `seconds`, never extending an outer deadline."""
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left before the deadline (may be negative), None if unbounded."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check() -> float | None:
+    """Raise if the deadline has already passed, otherwise return `remaining()`."""
+    left = remaining()
+    if left is not None and left <= 0:
+        error_message = "request deadline exceeded"
+        raise DeadlineExceededError(error_message)
+    return left
+
+
+def bounded() -> asyncio.Timeout:
+    """asyncio.timeout() for the time left. Raises TimeoutError on expiry."""
+    return asyncio.timeout(remaining())
@@ -15,3 +15,7 @@ class DataBaseIntegrityError(DatabaseError):
 
 class NotFoundError(DatabaseError):
     pass
+
+
+class VersionConflictError(DatabaseError):
+    """The row exists but not at the version the caller expected."""
@@ -15,3 +15,11 @@ class InvalidJSONError(BadRequestError):
     def __init__(self, *args, error_dict: dict | None = None) -> None:
         super().__init__(*args)
         self.error_dict = error_dict
+
+
+class DeadlineExceededError(Exception):
+    """The request ran out of its time budget before the work finished."""
+
+
+class ProfilerBusyError(Exception):
+    """Another profile is already running in this worker."""
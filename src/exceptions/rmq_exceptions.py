@@ -0,0 +1,6 @@
+class QueueOverloadedError(Exception):
+    """The work queue is above its high-water mark."""
+
+    def __init__(self, *args, retry_after: int) -> None:
+        super().__init__(*args)
+        self.retry_after = retry_after
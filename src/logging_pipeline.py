@@ -0,0 +1,181 @@
+"""Non-blocking log pipeline.
+
+Loggers only put records on a bounded in-memory queue. A QueueListener thread
+formats them and writes them to stdout and a size-rotated JSON file, so
+neither the event loop nor a worker thread waits on a disk or pipe write.
+
+    logger -> [DebugSampler] -> BoundedQueueHandler -> queue
+        -> RedactingQueueListener thread -> stdout / logs.<pid>.jsonl
+
+RotatingFileHandler is not safe across processes: each one rolls the file
+over on its own while the others keep writing to the renamed file. Every
+process (web workers, the RMQ worker, the launcher) therefore gets its own
+file unless `per_process` is turned off.
+
+When the queue is full, the "drop" policy discards INFO/DEBUG records and
+counts them, while WARNING and above wait briefly for room. The "block"
+policy makes every record wait.
+"""
+
+import atexit
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+from pathlib import Path
+
+from pythonjsonlogger import json as jsonlogger
+
+DROP = "drop"
+BLOCK = "block"
+
+REDACTED = "[REDACTED]"
+_SECRET_PATTERNS = (
+    # key=value / key: value pairs for obviously secret keys, the key quoted
+    # or not, so dict reprs and JSON are covered too
+    re.compile(
+        r"(?i)\b(password|passwd|secret|token|authorization|api[_-]?key)"
+        r"([\"']?\s*[=:]\s*)(\"[^\"]*\"|'[^']*'|\S+)"
+    ),
+    # password hashes and bearer tokens, wherever they show up
+    re.compile(r"\$argon2(?:id|i|d)\$\S+"),
+    re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]+"),
+)
+
+
+def redact(message: str) -> str:
+    message = _SECRET_PATTERNS[0].sub(rf"\1\2{REDACTED}", message)
+    for pattern in _SECRET_PATTERNS[1:]:
+        message = pattern.sub(REDACTED, message)
+    return message
+
+
+class DebugSampler(logging.Filter):
+    """Keeps one DEBUG record in `every` per call site, the first one included.
+
+    Kept records carry `sample_rate` so readers can scale counts back up.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen: collections.Counter = collections.Counter()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.every == 1:
+            return True
+        site = (record.name, record.msg)
+        self._seen[site] += 1
+        if self._seen[site] % self.every != 1:
+            return False
+        record.sample_rate = self.every
+        return True
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    def __init__(
+        self, log_queue: queue.Queue, policy: str = DROP, block_timeout: float = 0.1
+    ):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped: collections.Counter = collections.Counter()
+        self._lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.policy == DROP and record.levelno < logging.WARNING:
+                self.queue.put_nowait(record)
+            else:
+                self.queue.put(record, timeout=self.block_timeout)
+        except queue.Full:
+            with self._lock:
+                self.dropped[record.levelname] += 1
+
+    @property
+    def dropped_total(self) -> int:
+        return sum(self.dropped.values())
+
+
+class RedactingQueueListener(logging.handlers.QueueListener):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Once per record on the listener thread, before any handler sees it
+        record.msg = redact(record.getMessage())
+        record.args = None
+        return record
+
+    def enqueue_sentinel(self) -> None:
+        # Wait for room: on a full queue put_nowait would fail and stop() would
+        # exit without draining
+        self.queue.put(self._sentinel)
+
+
+def _format(caller_info: bool) -> str:
+    # pathname/lineno/funcName are only known if logging walks the stack for
+    # every record, which is what `caller_info` turns on
+    where = " %(pathname)s:%(lineno)s - %(funcName)s()" if caller_info else ""
+    return f"%(asctime)s - %(name)s - %(levelname)s %(threadName)s{where} - %(message)s"
+
+
+def per_process_filename(filename: str, pid: int) -> str:
+    """logs.jsonl -> logs.<pid>.jsonl"""
+    path = Path(filename)
+    return str(path.with_name(f"{path.stem}.{pid}{path.suffix}"))
+
+
+class LogPipeline:
+    def __init__(  # noqa: PLR0913
+        self,
+        filename: str,
+        *,
+        max_bytes: int,
+        backup_count: int,
+        queue_size: int,
+        policy: str = DROP,
+        debug_sample_every: int = 1,
+        caller_info: bool = False,
+        per_process: bool = True,
+    ):
+        if not caller_info:
+            # Skips the per-record stack walk (findCaller)
+            logging._srcfile = None  # noqa: SLF001
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
+        stream_handler = logging.StreamHandler(stream=sys.stdout)
+        stream_handler.setFormatter(logging.Formatter(_format(caller_info)))
+        if per_process:
+            filename = per_process_filename(filename, os.getpid())
+        # delay=True: the file is only opened on the first record, not at import
+        file_handler = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, delay=True
+        )
+        file_handler.setFormatter(jsonlogger.JsonFormatter(_format(caller_info)))
+
+        self.queue_handler = BoundedQueueHandler(queue.Queue(queue_size), policy)
+        self.queue_handler.addFilter(DebugSampler(debug_sample_every))
+        self.listener = RedactingQueueListener(
+            self.queue_handler.queue,
+            stream_handler,
+            file_handler,
+            respect_handler_level=True,
+        )
+
+    def start(self) -> None:
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        if self.listener._thread is None:  # noqa: SLF001
+            return
+        self.listener.stop()  # drains what is already queued
+        if self.queue_handler.dropped_total:
+            # The listener is gone, so report straight to stderr
+            print(  # noqa: T201
+                f"log pipeline dropped {dict(self.queue_handler.dropped)} records",
+                file=sys.stderr,
+            )
@@ -0,0 +1,156 @@
+"""Event loop lag and blocking-call detection.
+
+LoopMonitor runs two pieces:
+
+- a heartbeat task that sleeps for `interval` and records how late it woke
+  up as `event_loop_lag_seconds`. Every callback that ran meanwhile delayed it.
+- a watchdog thread that notices when the heartbeat is more than `threshold`
+  overdue. The loop is still stuck at that point, so the loop thread's
+  current stack is the blocking code. It is logged once per stall and
+  counted in `event_loop_blocks_total`.
+
+`detect_blocking` is the test-time counterpart. It times every callback any
+asyncio loop runs (Handle._run, the hook asyncio's own debug mode uses) and
+collects the ones over a budget. tests/conftest.py uses it to fail tests.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from env import LOOP_BLOCK_THRESHOLD_MS, LOOP_LAG_INTERVAL_SECONDS
+from src.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "How late the loop heartbeat woke up"
+)
+# Only the watchdog thread increments it
+LOOP_BLOCKS = Counter(
+    "event_loop_blocks_total", "Stalls longer than LOOP_BLOCK_THRESHOLD_MS"
+)
+
+
+@dataclass(slots=True, frozen=True)
+class Stall:
+    at: float
+    blocked_ms: float  # when it was caught, the stall may have lasted longer
+    stack: str
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL_SECONDS,
+        threshold: float = LOOP_BLOCK_THRESHOLD_MS / 1000,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: deque[Stall] = deque(maxlen=20)
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start monitoring the running loop."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._stop.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - start - self.interval))
+            self._beat = time.monotonic()
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold or beat == reported:
+                continue
+            reported = beat  # one report per stall
+            frame = sys._current_frames().get(self._loop_thread)  # noqa: SLF001
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            del frame
+            self.stalls.append(Stall(time.time(), overdue * 1e3, stack))
+            LOOP_BLOCKS.inc()
+            logger.warning(
+                "event loop blocked for %.0f ms so far, at:\n%s", overdue * 1e3, stack
+            )
+
+
+@dataclass(slots=True, frozen=True)
+class SlowCallback:
+    duration_ms: float
+    callback: str
+
+
+class BlockingDetector:
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.violations: list[SlowCallback] = []
+
+    def report(self) -> str:
+        return "\n".join(
+            f"{v.duration_ms:.0f} ms: {v.callback}" for v in self.violations
+        )
+
+
+def _describe(handle: asyncio.Handle) -> str:
+    # A task step shows up as an opaque wrapper; name the task's coroutine
+    owner = getattr(handle._callback, "__self__", None)  # noqa: SLF001
+    return repr(owner) if isinstance(owner, asyncio.Task) else repr(handle)
+
+
+@contextmanager
+def detect_blocking(budget: float) -> Iterator[BlockingDetector]:
+    """Collect callbacks that hold any asyncio loop for longer than `budget`."""
+    detector = BlockingDetector(budget)
+    original = asyncio.events.Handle._run  # noqa: SLF001
+
+    def _run(handle: asyncio.Handle) -> None:
+        start = time.perf_counter()
+        try:
+            original(handle)
+        finally:
+            elapsed = time.perf_counter() - start
+            if elapsed > budget:
+                detector.violations.append(
+                    SlowCallback(elapsed * 1e3, _describe(handle))
+                )
+
+    asyncio.events.Handle._run = _run  # noqa: SLF001
+    try:
+        yield detector
+    finally:
+        asyncio.events.Handle._run = original  # noqa: SLF001
@@ -0,0 +1,399 @@
+"""In-process metrics registry with Prometheus text output.
+
+Counters, gauges and histograms are plain Python objects updated in place.
+There are no locks: everything is updated from the event loop thread (pool
+events run there too). A labelled child is created once and cached, so a hot
+path pays for a dict lookup and an addition.
+
+Pre-forked workers each have their own registry. With METRICS_MULTIPROC_DIR
+set, every process writes a JSON snapshot to `<dir>/<pid>.json` every
+METRICS_FLUSH_INTERVAL_SECONDS, and /metrics merges its own live values with
+the other processes' snapshots (the RMQ worker included). Counters and
+histograms are summed. Each gauge declares whether it is summed (e.g.
+connections in use) or maxed (e.g. queue depth), and gauges from snapshots
+that stopped updating are left out.
+
+When a process exits, its counters and histograms are folded into
+`<dir>/retired.json` and its snapshot is removed, so totals never go
+backwards while dead processes' gauges drop out. A process that died without
+cleaning up is retired by the next /metrics that finds its pid gone, or by
+the process that gets its pid next.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from env import METRICS_FLUSH_INTERVAL_SECONDS, METRICS_MULTIPROC_DIR
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
+SUM = "sum"
+MAX = "max"
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dump(self) -> float:
+        return self.value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "count", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bound plus +Inf, not cumulative
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def dump(self) -> list:
+        return [self.counts, self.sum, self.count]
+
+
+class Metric:
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: "Registry | None" = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+        self._function: Callable[[], float] | None = None
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self) -> Any:  # noqa: ANN401
+        return _Value()
+
+    def labels(self, *values: object) -> Any:  # noqa: ANN401
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                error_message = f"{self.name} expects labels {self.labelnames}"
+                raise ValueError(error_message)
+            child = self._children[key] = self._new_child()
+        return child
+
+    def set_function(self, function: Callable[[], float | None]) -> None:
+        """Read the value from `function` at collection time instead."""
+        self._function = function
+
+    def dump(self) -> dict[str, Any]:
+        samples = {json.dumps(k): c.dump() for k, c in self._children.items()}
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                logger.debug("metric %s callback failed", self.name, exc_info=True)
+                value = None
+            if value is not None:
+                samples[json.dumps([])] = float(value)
+        return {
+            "kind": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": samples,
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, multiprocess_mode: str = SUM, **kwargs) -> None:  # noqa: ANN003
+        super().__init__(*args, **kwargs)
+        self.multiprocess_mode = multiprocess_mode
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def dump(self) -> dict[str, Any]:
+        return {**super().dump(), "mode": self.multiprocess_mode}
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        *args,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        **kwargs,  # noqa: ANN003
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(*args, **kwargs)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def dump(self) -> dict[str, Any]:
+        return {**super().dump(), "buckets": list(self.buckets)}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            error_message = f"metric {metric.name} is already registered"
+            raise ValueError(error_message)
+        self._metrics[metric.name] = metric
+
+    def dump(self) -> dict[str, dict[str, Any]]:
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+
+REGISTRY = Registry()
+
+
+def _merge(into: dict, snapshot: dict, with_gauges: bool = True) -> None:
+    for name, metric in snapshot.items():
+        if metric["kind"] == "gauge" and not with_gauges:
+            continue
+        merged = into.setdefault(name, {**metric, "samples": {}})
+        samples = merged["samples"]
+        for key, value in metric["samples"].items():
+            if key not in samples:
+                samples[key] = json.loads(json.dumps(value))
+            elif metric["kind"] == "histogram":
+                counts, total, count = samples[key]
+                samples[key] = [
+                    [a + b for a, b in zip(counts, value[0], strict=True)],
+                    total + value[1],
+                    count + value[2],
+                ]
+            elif metric["kind"] == "gauge" and metric.get("mode") == MAX:
+                samples[key] = max(samples[key], value)
+            else:
+                samples[key] += value
+
+
+def collect(
+    registry: Registry = REGISTRY, directory: str | None = METRICS_MULTIPROC_DIR
+) -> dict[str, dict[str, Any]]:
+    """Merge live metrics with the snapshots other processes wrote."""
+    return _with_snapshots(registry.dump(), directory)
+
+
+async def collect_async(
+    registry: Registry = REGISTRY, directory: str | None = METRICS_MULTIPROC_DIR
+) -> dict[str, dict[str, Any]]:
+    """collect() with the snapshot files read and merged off the event loop."""
+    # Dumped on the loop, where the values (and callbacks) live
+    return await asyncio.to_thread(_with_snapshots, registry.dump(), directory)
+
+
+def _with_snapshots(
+    live: dict[str, dict[str, Any]], directory: str | None
+) -> dict[str, dict[str, Any]]:
+    merged: dict = {}
+    _merge(merged, live)
+    if not directory:
+        return merged
+    directory = Path(directory)
+    snapshots = [path for path in _snapshots(directory) if path != _own(directory)]
+    if dead := [path for path in snapshots if not _alive(int(path.stem))]:
+        _retire(directory, dead)
+    stale_before = time.time() - 3 * METRICS_FLUSH_INTERVAL_SECONDS
+    with _locked(directory, exclusive=False):
+        if retired := _read(directory / RETIRED):
+            _merge(merged, retired, with_gauges=False)
+        for path in snapshots:
+            try:
+                snapshot = json.loads(path.read_text())
+                fresh = path.stat().st_mtime >= stale_before
+            except (OSError, ValueError):
+                continue  # being replaced, or just retired
+            _merge(merged, snapshot, with_gauges=fresh)
+    return merged
+
+
+RETIRED = "retired.json"
+
+
+def _own(directory: Path) -> Path:
+    return directory / f"{os.getpid()}.json"
+
+
+def _snapshots(directory: Path) -> list[Path]:
+    return [path for path in directory.glob("*.json") if path.stem.isdigit()]
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return True
+
+
+def _read(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _locked(directory: Path, exclusive: bool) -> Iterator[None]:
+    # Readers share the lock and retiring takes it alone, so no reader sees
+    # the same counts in both RETIRED and the snapshot being retired
+    with (directory / ".lock").open("a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield  # released when the file is closed
+
+
+def _retire(directory: Path, paths: list[Path]) -> None:
+    """Fold the counters and histograms of exited processes into RETIRED."""
+    with _locked(directory, exclusive=True):
+        # Re-read under the lock: another process may have retired them
+        found = [(path, data) for path in paths if (data := _read(path)) is not None]
+        if not found:
+            return
+        retired = _read(directory / RETIRED) or {}
+        for _, snapshot in found:
+            _merge(retired, snapshot, with_gauges=False)
+        _replace(directory / RETIRED, json.dumps(retired))
+        for path, _ in found:
+            path.unlink(missing_ok=True)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render(snapshot: dict[str, dict[str, Any]]) -> str:
+    """Prometheus text exposition format 0.0.4."""
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labelnames"]
+        for key, value in sorted(metric["samples"].items()):
+            values = json.loads(key)
+            if metric["kind"] != "histogram":
+                label_names = names if values else []
+                lines.append(f"{name}{_labels(label_names, values)} {_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            bounds = [*metric["buckets"], math.inf]
+            for bound, bucket_count in zip(bounds, counts, strict=True):
+                cumulative += bucket_count
+                labels = _labels([*names, "le"], [*values, _number(bound)])
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, values)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(names, values)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def retire_snapshot(
+    registry: Registry = REGISTRY, directory: str | None = METRICS_MULTIPROC_DIR
+) -> None:
+    """On exit: hand this process's final counts over to RETIRED."""
+    if not directory:
+        return
+    directory = Path(directory)
+    _write(directory, json.dumps(registry.dump()))
+    _retire(directory, [_own(directory)])
+
+
+def _write(directory: Path, data: str) -> None:
+    _replace(_own(directory), data)
+
+
+def _replace(path: Path, data: str) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(data)
+    tmp.replace(path)  # atomic, readers never see half a file
+
+
+async def flush_periodically(
+    registry: Registry = REGISTRY,
+    directory: str | None = METRICS_MULTIPROC_DIR,
+    interval: float = METRICS_FLUSH_INTERVAL_SECONDS,
+) -> None:
+    """Run as a background task in every process when multiprocess is on.
+
+    Cancelling it retires the snapshot with this process's final counts.
+    """
+    if not directory:
+        return
+    # A snapshot under our pid belongs to a dead process that had it before
+    await asyncio.to_thread(_retire, Path(directory), [_own(Path(directory))])
+    try:
+        while True:
+            # Dumped on the loop (where the values change), written off it
+            data = json.dumps(registry.dump())
+            try:
+                await asyncio.to_thread(_write, Path(directory), data)
+            except OSError:
+                logger.warning("could not write metrics snapshot", exc_info=True)
+            await asyncio.sleep(interval)
+    finally:
+        try:
+            retire_snapshot(registry, directory)
+        except OSError:
+            logger.warning("could not retire metrics snapshot", exc_info=True)
@@ -0,0 +1,91 @@
+"""In-process profilers for a live worker, no shell access needed.
+
+`sample_stacks` is a sampling profiler. A helper thread reads the event
+loop thread's stack from `sys._current_frames()` every few milliseconds and
+counts identical stacks. The loop is never paused or instrumented, so the
+cost is in the helper thread only. Output is the collapsed format
+(`frame;frame;frame count` per line) that flamegraph.pl, speedscope and
+inferno read directly.
+
+`profile_call` runs cProfile around one request. It is deterministic and
+much more expensive, and it sees everything the loop runs meanwhile, so
+other requests in flight show up too.
+
+Only one profile of either kind runs per process at a time.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from types import FrameType
+from typing import TypeVar
+
+from src.exceptions.request_exceptions import ProfilerBusyError
+
+T = TypeVar("T")
+
+_busy = threading.Lock()
+
+
+def _label(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}"
+
+
+def _stack(frame: FrameType | None) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))  # root first
+
+
+def sample_stacks(thread_id: int, duration: float, interval: float) -> Counter[str]:
+    """Sample `thread_id`'s stack every `interval` seconds for `duration`.
+
+    Blocks, so run it off the sampled thread (asyncio.to_thread).
+    """
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusyError
+    try:
+        samples: Counter[str] = Counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)  # noqa: SLF001
+            if frame is None:
+                break  # the thread is gone
+            samples[_stack(frame)] += 1
+            del frame  # don't keep the sampled thread's frames alive
+            time.sleep(interval)
+        return samples
+    finally:
+        _busy.release()
+
+
+def collapsed(samples: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+async def profile_call(
+    call: Callable[[], Awaitable[T]], limit: int = 50
+) -> tuple[T, str]:
+    """Await `call()` under cProfile; returns its result and the stats as text."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusyError
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            result = await call()
+        finally:
+            profiler.disable()
+    finally:
+        _busy.release()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+    return result, out.getvalue()
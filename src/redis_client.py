@@ -1,20 +1,69 @@
 import logging
-from collections.abc import AsyncGenerator
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Protocol
 
 import redis.asyncio as redis
 from redis.exceptions import RedisError
 
+from src.deadline import bounded
+from src.metrics import Counter, Histogram
+from src.tracing import span
+
 logger = logging.getLogger(__name__)
 
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_seconds", "Redis command latency", ["command"]
+)
+REDIS_ERRORS = Counter(
+    "redis_errors_total", "Redis commands that failed or timed out", ["command"]
+)
+# Labelled by key prefix ("user", "job", ...), never by the full key
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache reads by key prefix", ["prefix", "result"]
+)
+
+
+def _record_lookups(keys: list[str], values: list[str | None]) -> None:
+    for key, value in zip(keys, values, strict=True):
+        result = "miss" if value is None else "hit"
+        CACHE_LOOKUPS.labels(key.split(":", 1)[0], result).inc()
+
+
+@asynccontextmanager
+async def _command(name: str) -> AsyncIterator[None]:
+    """Bound a command by the request deadline, time it and trace it."""
+    start = time.perf_counter()
+    try:
+        with span(f"redis.{name}"):
+            async with bounded():
+                yield
+    except Exception:
+        REDIS_ERRORS.labels(name).inc()
+        raise
+    finally:
+        REDIS_COMMAND_SECONDS.labels(name).observe(time.perf_counter() - start)
+
 
 class RedisProtocol(Protocol):
+    async def ping(self) -> bool: ...
     async def get(self, key: str) -> str | None: ...
     async def setex(self, key: str, seconds: int, value: str) -> bool: ...
     async def delete(self, key: str) -> bool: ...
+    async def set_nx(self, key: str, seconds: int, value: str) -> bool | None: ...
+    async def incr(self, key: str) -> int | None: ...
+    async def mget(self, keys: list[str]) -> list[str | None]: ...
+    async def setex_many(self, mapping: dict[str, str], seconds: int) -> bool: ...
 
 
 class RedisClient:
+    """Fail-soft Redis wrapper.
+
+    Every command is bounded by the request deadline; running out of time is
+    handled like any other Redis error (a miss, or a False/None result).
+    """
+
     _instance: "RedisClient | None" = None
     _client: redis.Redis | None = None
 
@@ -29,6 +78,10 @@ class RedisClient:
         self.redis_url = f"redis://{host}:{port}/{db}"
         self._initialized = True
 
+    @property
+    def is_connected(self) -> bool:
+        return self._client is not None
+
     async def connect(self):
         if self._client is not None:
             return
@@ -45,20 +98,34 @@ class RedisClient:
             await self._client.aclose()
             self._client = None
 
+    async def ping(self) -> bool:
+        if not self._client:
+            return False
+        try:
+            async with _command("ping"):
+                return bool(await self._client.ping())
+        except (RedisError, ConnectionError, TimeoutError) as e:
+            logger.warning("Redis PING failed: %s", e)
+            return False
+
     async def get(self, key: str) -> str | None:
         if not self._client:
             return None
         try:
-            return await self._client.get(key)
+            async with _command("get"):
+                value = await self._client.get(key)
         except (RedisError, ConnectionError, TimeoutError) as e:
             logger.warning("Redis GET failed for key %s: %s", key, e)
             return None
+        _record_lookups([key], [value])
+        return value
 
     async def setex(self, key: str, seconds: int, value: str) -> bool:
         if not self._client:
             return False
         try:
-            await self._client.setex(key, seconds, value)
+            async with _command("setex"):
+                await self._client.setex(key, seconds, value)
             return True
         except (RedisError, ConnectionError, TimeoutError) as e:
             logger.warning("Redis SETEX failed for key %s: %s", key, e)
@@ -68,12 +135,71 @@ class RedisClient:
         if not self._client:
             return False
         try:
-            await self._client.delete(key)
+            async with _command("delete"):
+                await self._client.delete(key)
             return True
         except (RedisError, ConnectionError, TimeoutError) as e:
             logger.warning("Redis DELETE failed for key %s: %s", key, e)
             return False
 
+    async def set_nx(self, key: str, seconds: int, value: str) -> bool | None:
+        """SET key value NX EX seconds.
+
+        True if the key was set, False if it already existed and None when
+        Redis can't answer, so callers can choose to fail open.
+        """
+        if not self._client:
+            return None
+        try:
+            async with _command("set_nx"):
+                return bool(await self._client.set(key, value, ex=seconds, nx=True))
+        except (RedisError, ConnectionError, TimeoutError) as e:
+            logger.warning("Redis SET NX failed for key %s: %s", key, e)
+            return None
+
+    async def incr(self, key: str) -> int | None:
+        if not self._client:
+            return None
+        try:
+            async with _command("incr"):
+                return await self._client.incr(key)
+        except (RedisError, ConnectionError, TimeoutError) as e:
+            logger.warning("Redis INCR failed for key %s: %s", key, e)
+            return None
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        if not self._client or not keys:
+            return [None] * len(keys)
+        try:
+            async with _command("mget"):
+                values = await self._client.mget(keys)
+        except (RedisError, ConnectionError, TimeoutError) as e:
+            logger.warning("Redis MGET failed for %s keys: %s", len(keys), e)
+            return [None] * len(keys)
+        _record_lookups(keys, values)
+        return values
+
+    async def setex_many(self, mapping: dict[str, str], seconds: int) -> bool:
+        """SETEX every key in one round-trip (pipelined, not transactional)."""
+        if not self._client:
+            return False
+        if not mapping:
+            return True
+        try:
+            async with (
+                _command("setex_many"),
+                self._client.pipeline(transaction=False) as pipe,
+            ):
+                for key, value in mapping.items():
+                    pipe.setex(key, seconds, value)
+                await pipe.execute()
+            return True
+        except (RedisError, ConnectionError, TimeoutError) as e:
+            logger.warning(
+                "Redis pipelined SETEX failed for %s keys: %s", len(mapping), e
+            )
+            return False
+
 
 async def get_redis() -> AsyncGenerator[RedisClient, None]:
     yield RedisClient()
@@ -100,6 +226,9 @@ class MockRedisClient:
         self.storage = {}
         self.should_fail = False
 
+    async def ping(self) -> bool:
+        return not self.should_fail
+
     async def get(self, key: str) -> str | None:
         if self.should_fail:
             return None
@@ -115,3 +244,28 @@ class MockRedisClient:
         if self.should_fail:
             return False
         return self.storage.pop(key, None) is not None
+
+    async def set_nx(self, key: str, _: int, value: str) -> bool | None:
+        if self.should_fail:
+            return None
+        if key in self.storage:
+            return False
+        self.storage[key] = value
+        return True
+
+    async def incr(self, key: str) -> int | None:
+        if self.should_fail:
+            return None
+        self.storage[key] = str(int(self.storage.get(key, 0)) + 1)
+        return int(self.storage[key])
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        if self.should_fail:
+            return [None] * len(keys)
+        return [self.storage.get(key) for key in keys]
+
+    async def setex_many(self, mapping: dict[str, str], _: int) -> bool:
+        if self.should_fail:
+            return False
+        self.storage.update(mapping)
+        return True
@@ -1,13 +1,34 @@
-from collections.abc import Sequence
+from collections.abc import Collection, Sequence
 from typing import Generic, TypeVar
 
 from pydantic import BaseModel
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import (
+    Executable,
+    Integer,
+    Result,
+    any_,
+    bindparam,
+    delete,
+    insert,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src import deadline
+
 # Ensure Base is the actual DeclarativeBase class
 from src.database.models import Base
-from src.exceptions.db_exceptions import NotFoundError
+from src.exceptions.db_exceptions import NotFoundError, VersionConflictError
+from src.exceptions.request_exceptions import DeadlineExceededError
+from src.tracing import span
+
+# SQLSTATE for "canceling statement due to statement timeout"
+QUERY_CANCELED = "57014"
 
 ModelType = TypeVar("ModelType", bound=Base)
 
@@ -17,6 +38,44 @@ class BaseRepository(Generic[ModelType]):
         self.model = model
         self.session = session
 
+    async def _execute(self, query: Executable) -> Result:
+        """Execute `query` within the request deadline.
+
+        The first statement of each transaction runs `SET LOCAL
+        statement_timeout` with the time left, which also bounds the wait for
+        a pool connection. Later statements only check the deadline before
+        running. Timeouts are raised as DeadlineExceededError.
+        """
+        left = deadline.check()
+        transaction = self.session.sync_session.get_transaction()
+        if left is not None and (
+            transaction is None or self.session.info.get("deadline") is not transaction
+        ):
+            timeout_ms = max(1, int(left * 1000))
+            try:
+                async with deadline.bounded():
+                    with span("db.begin", timeout_ms=timeout_ms):
+                        await self.session.execute(
+                            text(f"SET LOCAL statement_timeout = {timeout_ms}")
+                        )
+            except TimeoutError as e:
+                error_message = "deadline exceeded waiting for a connection"
+                raise DeadlineExceededError(error_message) from e
+            transaction = self.session.sync_session.get_transaction()
+            self.session.info["deadline"] = transaction
+        try:
+            with span(
+                "db.query",
+                operation=query.__visit_name__,
+                table=self.model.__tablename__,
+            ):
+                return await self.session.execute(query)
+        except DBAPIError as e:
+            if getattr(e.orig, "sqlstate", None) == QUERY_CANCELED:
+                error_message = "statement timed out at the request deadline"
+                raise DeadlineExceededError(error_message) from e
+            raise
+
     async def create(self, data: BaseModel) -> ModelType:
         """Create user and return without commit"""
         obj = self.model(**data.model_dump())
@@ -24,37 +83,83 @@ class BaseRepository(Generic[ModelType]):
         # raise Exception("boom")
         return obj
 
-    async def get(self, obj_id: int) -> ModelType | None:
-        """Returns a single model instance or None."""
-        query = select(self.model).where(self.model.id == obj_id)
-        result = await self.session.execute(query)
+    def _select(self, columns: Collection[str] | None):  # noqa: ANN202
+        if columns is None:
+            return select(self.model)
+        return select(*(getattr(self.model, name) for name in sorted(columns)))
+
+    async def get(
+        self, obj_id: int, columns: Collection[str] | None = None
+    ) -> ModelType | RowMapping | None:
+        """Returns a single model instance or None.
+
+        With `columns` only those columns are selected and a row mapping is
+        returned instead of a model instance.
+        """
+        query = self._select(columns).where(self.model.id == obj_id)
+        result = await self._execute(query)
+        if columns is not None:
+            return result.mappings().one_or_none()
         return result.scalar_one_or_none()
 
-    async def list(self, limit: int = 100, offset: int = 0) -> Sequence[ModelType]:
-        """Returns a sequence of model instances."""
-        query = select(self.model).limit(limit).offset(offset)
-        result = await self.session.execute(query)
+    async def get_many(self, obj_ids: Sequence[int]) -> Sequence[ModelType]:
+        """Returns the instances that exist among `obj_ids`, in no particular order.
+
+        `id = ANY(:ids)` binds the whole list as one array parameter, so the
+        statement text (and its prepared plan) is the same for any batch size.
+        """
+        ids = bindparam("ids", list(obj_ids), type_=ARRAY(Integer))
+        query = select(self.model).where(self.model.id == any_(ids))
+        result = await self._execute(query)
+        return result.scalars().all()
+
+    async def get_version(self, obj_id: int) -> int | None:
+        """Returns only the version column, without loading the row."""
+        query = select(self.model.version).where(self.model.id == obj_id)
+        result = await self._execute(query)
+        return result.scalar_one_or_none()
+
+    async def list(
+        self, limit: int = 100, offset: int = 0, columns: Collection[str] | None = None
+    ) -> Sequence[ModelType] | Sequence[RowMapping]:
+        """Returns a sequence of model instances (row mappings with `columns`)."""
+        query = self._select(columns).limit(limit).offset(offset)
+        result = await self._execute(query)
+        if columns is not None:
+            return result.mappings().all()
         # result.scalars().all() returns a list which satisfies Sequence
         return result.scalars().all()
 
-    async def update(self, obj_id: int, data: BaseModel) -> ModelType:
-        """Update obj and return with commit"""
+    async def update(
+        self, obj_id: int, data: BaseModel, expected_version: int | None = None
+    ) -> ModelType:
+        """Update obj, bump its version and return with commit.
+
+        With `expected_version` the update only applies if the row is still at
+        that version (optimistic concurrency).
+        """
         update_data = data.model_dump(exclude_unset=True)
-        query = (
-            update(self.model)
-            .where(self.model.id == obj_id)
-            .values(**update_data)
-            .returning(self.model)
+        query = update(self.model).where(self.model.id == obj_id)
+        if expected_version is not None:
+            query = query.where(self.model.version == expected_version)
+        query = query.values(**update_data, version=self.model.version + 1).returning(
+            self.model
         )
-        result = await self.session.execute(query)
+        result = await self._execute(query)
         obj = result.scalar_one_or_none()
         if not obj:
-            error_message = f"User with id {obj_id} not found"
+            if (
+                expected_version is not None
+                and await self.get_version(obj_id) is not None
+            ):
+                error_message = f"{self.model.__name__} {obj_id} has been modified"
+                raise VersionConflictError(error_dict={"error": error_message})
+            error_message = f"{self.model.__name__} with id {obj_id} not found"
             raise NotFoundError(error_dict={"error": error_message})
         return obj
 
     async def delete(self, obj_id: int) -> bool:
         """Deletes an object and returns True if successful."""
         query = delete(self.model).where(self.model.id == obj_id)
-        result = await self.session.execute(query)
+        result = await self._execute(query)
         return result.rowcount > 0
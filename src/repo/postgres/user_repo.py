@@ -12,5 +12,5 @@ class UserRepository(BaseRepository[User]):
     async def get_by_username(self, username: str) -> User | None:
         """Fetch the raw SQLAlchemy model by username."""
         query = select(User).where(User.name == username)
-        result = await self.session.execute(query)
+        result = await self._execute(query)
         return result.scalar_one_or_none()
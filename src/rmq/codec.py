@@ -0,0 +1,88 @@
+"""Message body codecs, negotiated through the AMQP content_type property.
+
+The publisher encodes with the codec named by RMQ_CODEC and stamps its
+content type on the message. The worker picks the decoder from each message's
+content type, so old and new publishers can run side by side during a rollout.
+"""
+
+import json
+import logging
+from typing import Any, Protocol
+
+from env import RMQ_CODEC
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install fastapi-demo-app[msgpack]
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+class MessageCodec(Protocol):
+    name: str
+    content_type: str
+
+    def encode(self, message: dict[str, Any]) -> bytes: ...
+    def decode(self, body: bytes) -> dict[str, Any]: ...
+
+
+class JsonCodec:
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, message: dict[str, Any]) -> bytes:
+        return json.dumps(message).encode()
+
+    def decode(self, body: bytes) -> dict[str, Any]:
+        return json.loads(body)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def encode(self, message: dict[str, Any]) -> bytes:
+        return msgpack.packb(message)
+
+    def decode(self, body: bytes) -> dict[str, Any]:
+        return msgpack.unpackb(body)
+
+
+_codecs_by_content_type: dict[str, MessageCodec] = {}
+_codecs_by_name: dict[str, MessageCodec] = {}
+
+
+def register_codec(codec: MessageCodec) -> None:
+    _codecs_by_content_type[codec.content_type] = codec
+    _codecs_by_name[codec.name] = codec
+
+
+register_codec(JsonCodec())
+if msgpack is not None:
+    register_codec(MsgpackCodec())
+
+
+def codec_for_content_type(content_type: str | None) -> MessageCodec:
+    """Decoder for a delivered message.
+
+    Messages published before codecs existed carry no content type and are
+    JSON. An unknown content type raises, which sends the message through the
+    retry queues until a worker that understands it is deployed.
+    """
+    if not content_type:
+        return _codecs_by_content_type[JsonCodec.content_type]
+    try:
+        return _codecs_by_content_type[content_type]
+    except KeyError:
+        error_message = f"no codec registered for content type {content_type}"
+        raise ValueError(error_message) from None
+
+
+def get_codec(name: str = RMQ_CODEC) -> MessageCodec:
+    """Encoder for publishing, falling back to JSON if `name` is unavailable."""
+    codec = _codecs_by_name.get(name)
+    if codec is None:
+        logger.warning("codec %s is not available, publishing JSON", name)
+        codec = _codecs_by_name[JsonCodec.name]
+    return codec
@@ -0,0 +1,71 @@
+import logging
+
+from env import RMQ_DEDUP_LEASE_SECONDS, RMQ_DEDUP_TTL_SECONDS
+from src.metrics import Counter
+from src.redis_client import RedisProtocol
+
+logger = logging.getLogger(__name__)
+
+DEDUP_HITS = Counter("rmq_dedup_hits_total", "Redelivered messages dropped")
+
+DEDUP_HITS_KEY = "rmq:dedup:hits"
+
+PROCESSING = "processing"
+DONE = "done"
+
+
+class MessageDeduplicator:
+    """Drops redelivered messages before they reach the service layer.
+
+    A consumer claims a message id with a short lease while it works on it and
+    turns the claim into a long-lived DONE marker once the work is committed.
+    If the consumer dies mid-way the lease expires and a redelivery can be
+    processed again, so at-least-once delivery is kept.
+    """
+
+    def __init__(
+        self,
+        redis: RedisProtocol,
+        ttl: int = RMQ_DEDUP_TTL_SECONDS,
+        lease: int = RMQ_DEDUP_LEASE_SECONDS,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.lease = lease
+        self.hits = 0
+
+    @staticmethod
+    def _key(message_id: str) -> str:
+        return f"rmq:dedup:{message_id}"
+
+    async def claim(self, message_id: str | None) -> str | None:
+        """Claim a message id before doing any work on it.
+
+        Returns None if the caller now owns the message, otherwise the state
+        (PROCESSING or DONE) left by whoever claimed it first.
+        """
+        if not message_id:
+            return None
+        key = self._key(message_id)
+        claimed = await self.redis.set_nx(key, self.lease, PROCESSING)
+        # None means Redis is unavailable: fail open and do the work.
+        if claimed is not False:
+            return None
+
+        state = await self.redis.get(key) or PROCESSING
+        self.hits += 1
+        DEDUP_HITS.inc()
+        await self.redis.incr(DEDUP_HITS_KEY)
+        logger.info(
+            "duplicate message %s (%s), dedup hits=%s", message_id, state, self.hits
+        )
+        return state
+
+    async def complete(self, message_id: str | None) -> None:
+        if message_id:
+            await self.redis.setex(self._key(message_id), self.ttl, DONE)
+
+    async def release(self, message_id: str | None) -> None:
+        """Drop the claim so a retry of a failed message isn't a duplicate."""
+        if message_id:
+            await self.redis.delete(self._key(message_id))
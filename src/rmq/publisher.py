@@ -1,34 +1,143 @@
-import json
+import asyncio
+import logging
+import time
+import uuid
 from typing import Any
 
-import aio_pika
+from env import (
+    RMQ_BACKPRESSURE_RETRY_AFTER_SECONDS,
+    RMQ_DEPTH_POLL_INTERVAL_SECONDS,
+    RMQ_QUEUE_HIGH_WATER_MARK,
+)
+from src import deadline
+from src.exceptions.request_exceptions import DeadlineExceededError
+from src.exceptions.rmq_exceptions import QueueOverloadedError
+from src.metrics import Histogram
+from src.rmq.codec import MessageCodec, get_codec
+from src.rmq.topology import declare_topology
+from src.tracing import inject, span
+
+logger = logging.getLogger(__name__)
+
+PUBLISH_SECONDS = Histogram(
+    "rmq_publish_seconds",
+    "Time to publish a message, including reconnects and the broker confirm",
+    ["queue"],
+)
 
 
 class RabbitMQPublisher:
-    def __init__(self, connection_url: str, queue_name: str):
+    def __init__(
+        self,
+        connection_url: str,
+        queue_name: str,
+        high_water_mark: int = RMQ_QUEUE_HIGH_WATER_MARK,
+        poll_interval: float = RMQ_DEPTH_POLL_INTERVAL_SECONDS,
+        codec: MessageCodec | None = None,
+    ):
         self.connection_url = connection_url
         self.queue_name = queue_name
+        self.codec = codec or get_codec()
         self.connection = None
         self.channel = None
 
+        # Backlog as of the last passive declare, refreshed in the background
+        self.high_water_mark = high_water_mark
+        self.poll_interval = poll_interval
+        self.queue_depth: int | None = None
+        self.consumer_count: int | None = None
+        self.depth_checked_at: float | None = None
+        self._depth_task: asyncio.Task | None = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.connection is not None and not self.connection.is_closed
+
     async def connect(self):
         if not self.connection or self.connection.is_closed:
+            # Imported here so processes that never publish don't load aio_pika
+            import aio_pika  # noqa: PLC0415
+
             self.connection = await aio_pika.connect_robust(self.connection_url)
             self.channel = await self.connection.channel()
-            # Ensure the queue exists before publishing
-            await self.channel.declare_queue(self.queue_name, durable=True)
+            # Ensure the queue (and its retry/dead-letter queues) exist
+            await declare_topology(self.channel, self.queue_name)
+        if self._depth_task is None or self._depth_task.done():
+            self._depth_task = asyncio.create_task(self._poll_queue_depth())
+
+    async def refresh_queue_depth(self):
+        # A passive declare is a single round-trip that returns the ready
+        # message count and consumer count without touching the queue.
+        # It gets its own channel: a failing passive declare closes the channel.
+        async with self.connection.channel() as channel:
+            queue = await channel.declare_queue(self.queue_name, passive=True)
+        self.queue_depth = queue.declaration_result.message_count
+        self.consumer_count = queue.declaration_result.consumer_count
+        self.depth_checked_at = time.time()
+
+    async def _poll_queue_depth(self) -> None:
+        while True:
+            try:
+                await self.refresh_queue_depth()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # noqa: BLE001
+                logger.warning("queue depth check failed: %s", e)
+            await asyncio.sleep(self.poll_interval)
+
+    def check_backpressure(self):
+        """Raise QueueOverloadedError when the backlog is above the high-water mark.
+
+        Uses the last sampled depth, so it costs nothing per request.
+        """
+        if self.queue_depth is not None and self.queue_depth >= self.high_water_mark:
+            error_message = (
+                f"queue {self.queue_name} has {self.queue_depth} pending messages"
+            )
+            raise QueueOverloadedError(
+                error_message, retry_after=RMQ_BACKPRESSURE_RETRY_AFTER_SECONDS
+            )
+
+    async def publish(self, message: dict[str, Any], message_id: str | None = None):
+        """Publish a message and return its id.
 
-    async def publish(self, message: dict[str, Any]):
-        if not self.channel:
-            await self.connect()
+        The id doubles as the idempotency key the worker dedups on, so a caller
+        retrying the same logical message should pass the same id.
+        """
+        self.check_backpressure()
+        body = self.codec.encode(message)
+        message_id = message_id or uuid.uuid4().hex
 
-        body = json.dumps(message).encode()
+        from aio_pika import DeliveryMode, Message  # noqa: PLC0415
 
-        await self.channel.default_exchange.publish(
-            aio_pika.Message(body=body, delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
-            routing_key=self.queue_name,
-        )
+        # Reconnects and publisher confirms both count against the deadline
+        start = time.perf_counter()
+        try:
+            with span("rmq.publish", queue=self.queue_name):
+                async with deadline.bounded():
+                    if not self.channel:
+                        await self.connect()
+                    await self.channel.default_exchange.publish(
+                        Message(
+                            body=body,
+                            # The worker's spans join this trace
+                            headers=inject({}),
+                            content_type=self.codec.content_type,
+                            message_id=message_id,
+                            delivery_mode=DeliveryMode.PERSISTENT,
+                        ),
+                        routing_key=self.queue_name,
+                    )
+        except TimeoutError as e:
+            error_message = f"publish to {self.queue_name} hit the request deadline"
+            raise DeadlineExceededError(error_message) from e
+        finally:
+            PUBLISH_SECONDS.labels(self.queue_name).observe(time.perf_counter() - start)
+        return message_id
 
     async def close(self):
+        if self._depth_task:
+            self._depth_task.cancel()
+            self._depth_task = None
         if self.connection:
             await self.connection.close()
@@ -0,0 +1,115 @@
+"""Retry and dead-letter topology for the work queues.
+
+A failed message is re-published to a per-attempt delay queue whose TTL grows
+exponentially. When the TTL expires RabbitMQ dead-letters it back onto the
+work queue through the default exchange. Once the retries are used up the
+message is parked in the dead-letter queue until it is replayed.
+"""
+
+from typing import TYPE_CHECKING
+
+from env import RMQ_MAX_RETRIES, RMQ_RETRY_BASE_DELAY_MS
+
+if TYPE_CHECKING:
+    from aio_pika import IncomingMessage, Message
+    from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractQueue
+
+RETRY_COUNT_HEADER = "x-retry-count"
+
+
+def retry_queue_name(queue_name: str, attempt: int) -> str:
+    return f"{queue_name}.retry.{attempt}"
+
+
+def dead_letter_queue_name(queue_name: str) -> str:
+    return f"{queue_name}.dlq"
+
+
+def retry_delay_ms(attempt: int, base_delay_ms: int = RMQ_RETRY_BASE_DELAY_MS) -> int:
+    """Delay before retry number `attempt` (1-based): base, 2*base, 4*base..."""
+    return base_delay_ms * 2 ** (attempt - 1)
+
+
+def retry_count(message: "IncomingMessage") -> int:
+    return int((message.headers or {}).get(RETRY_COUNT_HEADER, 0))
+
+
+async def declare_topology(
+    channel: "AbstractChannel",
+    queue_name: str,
+    max_retries: int = RMQ_MAX_RETRIES,
+    base_delay_ms: int = RMQ_RETRY_BASE_DELAY_MS,
+) -> "AbstractQueue":
+    """Declare the work queue, its delay queues and its DLQ.
+
+    One queue per attempt (instead of a per-message `expiration`) keeps every
+    delay queue FIFO, so a long delay never blocks a shorter one behind it.
+    """
+    queue = await channel.declare_queue(queue_name, durable=True)
+    # At least one delay queue, `defer` parks messages in the last one
+    for attempt in range(1, max(1, max_retries) + 1):
+        await channel.declare_queue(
+            retry_queue_name(queue_name, attempt),
+            durable=True,
+            arguments={
+                "x-message-ttl": retry_delay_ms(attempt, base_delay_ms),
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": queue_name,
+            },
+        )
+    await channel.declare_queue(dead_letter_queue_name(queue_name), durable=True)
+    return queue
+
+
+def copy_message(message: "IncomingMessage", headers: dict) -> "Message":
+    """Rebuild a publishable message from a delivered one."""
+    from aio_pika import DeliveryMode, Message  # noqa: PLC0415
+
+    return Message(
+        body=message.body,
+        headers=headers,
+        content_type=message.content_type,
+        content_encoding=message.content_encoding,
+        message_id=message.message_id,
+        correlation_id=message.correlation_id,
+        delivery_mode=DeliveryMode.PERSISTENT,
+    )
+
+
+async def retry_or_dead_letter(
+    message: "IncomingMessage",
+    exchange: "AbstractExchange",
+    queue_name: str,
+    max_retries: int = RMQ_MAX_RETRIES,
+) -> bool:
+    """Schedule the next attempt for a failed message.
+
+    Returns False when the message was moved to the dead-letter queue.
+    """
+    attempt = retry_count(message) + 1
+    headers = {**(message.headers or {}), RETRY_COUNT_HEADER: attempt}
+    if attempt > max_retries:
+        routing_key = dead_letter_queue_name(queue_name)
+    else:
+        routing_key = retry_queue_name(queue_name, attempt)
+
+    await exchange.publish(copy_message(message, headers), routing_key=routing_key)
+    return attempt <= max_retries
+
+
+async def defer(
+    message: "IncomingMessage",
+    exchange: "AbstractExchange",
+    queue_name: str,
+    max_retries: int = RMQ_MAX_RETRIES,
+) -> None:
+    """Hand a message back after the longest retry delay, keeping its retries.
+
+    For messages that can't be worked on yet, e.g. while another consumer's
+    dedup lease is still held: those waits must not use up retries, or a
+    redelivery after a crash is dead-lettered before the stale lease expires.
+    """
+    await exchange.publish(
+        copy_message(message, dict(message.headers or {})),
+        routing_key=retry_queue_name(queue_name, max(1, max_retries)),
+    )
@@ -1,24 +1,87 @@
 import asyncio
-import json
 import logging
+import time
 from contextlib import asynccontextmanager
+from functools import partial
 
 from aio_pika import IncomingMessage, connect
+from aio_pika.abc import AbstractExchange
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from src.database import get_db
+from src.loop_monitor import LoopMonitor
+from src.metrics import Histogram, flush_periodically
+from src.redis_client import RedisClient
+from src.rmq.codec import codec_for_content_type
+from src.rmq.dedup import DONE, PROCESSING, MessageDeduplicator
+from src.rmq.topology import (
+    declare_topology,
+    defer,
+    retry_count,
+    retry_or_dead_letter,
+)
+from src.schemas.job_schema import JobStatus
 from src.schemas.user_schema import UserCreate
+from src.services.job_service import RegistrationJobService
 from src.services.user_service import UserService
-
-# Setup Logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-
-async def process_message(message: IncomingMessage):
-    # Using .process() automatically ACKs the message if no error occurs.
-    async with message.process():
-        logger.info(" [x] Received message:")
+from src.tracing import TRACEPARENT, start_trace
+
+# Named explicitly: run as `-m src.rmq.worker`, __name__ is "__main__" and
+# records would bypass the "src" pipeline and its redaction. No basicConfig
+# either, a root handler would print src records a second time, unredacted.
+logger = logging.getLogger("src.rmq.worker")
+
+
+QUEUE_NAME = "user_registration_queue"
+
+PROCESSING_SECONDS = Histogram(
+    "worker_processing_seconds",
+    "Time to handle one registration message, ack included",
+    ["outcome"],
+)
+
+
+async def process_message(
+    message: IncomingMessage,
+    exchange: AbstractExchange,
+    dedup: MessageDeduplicator,
+    jobs: RegistrationJobService,
+):
+    start = time.perf_counter()
+    outcome = "error"  # the ack/nack itself failed
+    # Continues the trace of the request that published the message
+    parent = (message.headers or {}).get(TRACEPARENT)
+    with start_trace("rmq.process", parent, queue=QUEUE_NAME) as root:
+        try:
+            outcome = await _process(message, exchange, dedup, jobs)
+        finally:
+            root.attributes["outcome"] = outcome
+            PROCESSING_SECONDS.labels(outcome).observe(time.perf_counter() - start)
+
+
+async def _process(
+    message: IncomingMessage,
+    exchange: AbstractExchange,
+    dedup: MessageDeduplicator,
+    jobs: RegistrationJobService,
+) -> str:
+    # Failures are re-published to a delay queue (or the DLQ) and the original
+    # is acked, so a poison message can't spin in a tight redelivery loop.
+    # requeue=True only kicks in if that re-publish itself fails.
+    async with message.process(requeue=True):
+        logger.info(" [x] Received message: %s", message.message_id)
+
+        # 0. Drop redeliveries before paying for the password hash and insert
+        state = await dedup.claim(message.message_id)
+        if state == DONE:
+            return "duplicate"
+        if state == PROCESSING:
+            # Another consumer holds the lease, or held it and crashed; look
+            # again later. The lease outlives the whole retry schedule, so
+            # this must not count as a failed attempt.
+            await defer(message, exchange, QUEUE_NAME)
+            return "in_progress"
+        await jobs.mark(message.message_id, JobStatus.PROCESSING)
 
         # 1. Create a fresh session for this specific message
         async_get_db = asynccontextmanager(get_db)
@@ -26,18 +89,38 @@ async def process_message(message: IncomingMessage):
             try:
                 service = UserService(session)
 
-                # Assume the message body is a username for this example
-                data_dict = json.loads(message.body.decode())
+                # The content type says how the publisher encoded the body
+                codec = codec_for_content_type(message.content_type)
+                data_dict = codec.decode(message.body)
                 user_data = UserCreate(**data_dict)
 
                 # 2. Use your existing Service Layer logic
-                await service.register_user(user_data)
-
-                logger.info(" [v] Successfully registered user %s", data_dict)
+                user = await service.register_user(user_data)
+                await dedup.complete(message.message_id)
+                await jobs.mark(message.message_id, JobStatus.DONE, user_id=user.id)
+
+                logger.info(
+                    " [v] Registered user %s from message %s",
+                    user.id,
+                    message.message_id,
+                )
+                return "done"
             except Exception:
-                logger.exception(" [!] Failed to process user")
-                # Re-raise to trigger NACK if you want RabbitMQ to retry
-                raise
+                await dedup.release(message.message_id)
+                logger.exception(
+                    " [!] Failed to process user, attempt %s",
+                    retry_count(message) + 1,
+                )
+                if await retry_or_dead_letter(message, exchange, QUEUE_NAME):
+                    await jobs.mark(message.message_id, JobStatus.QUEUED)
+                    return "retry"
+                logger.warning(" [!] Retries exhausted, moved to dead-letter queue")
+                await jobs.mark(
+                    message.message_id,
+                    JobStatus.FAILED,
+                    error="registration failed after retries",
+                )
+                return "dead_letter"
 
 
 async def main():
@@ -52,16 +135,41 @@ async def main():
         # This limits how many messages the worker grabs at once
         await channel.set_qos(prefetch_count=10)
 
-        # 4. Declare the queue
-        queue = await channel.declare_queue("user_registration_queue", durable=True)
+        # 4. Declare the queue along with its retry and dead-letter queues
+        queue = await declare_topology(channel, QUEUE_NAME)
 
         logger.info(" [*] Waiting for messages. To exit press CTRL+C")
 
-        # 5. Start consuming
-        await queue.consume(process_message)
+        # 5. Redis backs the idempotency keys and job states
+        redis = RedisClient()
+        await redis.connect()
+        dedup = MessageDeduplicator(redis)
+        jobs = RegistrationJobService(redis)
+
+        # 6. Start consuming
+        await queue.consume(
+            partial(
+                process_message,
+                exchange=channel.default_exchange,
+                dedup=dedup,
+                jobs=jobs,
+            )
+        )
+
+        # Publish this process's metrics next to the web workers' snapshots
+        metrics_task = asyncio.create_task(flush_periodically())
+        # Password hashing runs here too, report it if it stalls the loop
+        loop_monitor = LoopMonitor()
+        loop_monitor.start()
 
         # Keep the worker running forever
-        await asyncio.Future()
+        try:
+            await asyncio.Future()
+        finally:
+            # Retires this process's snapshot with its final counts
+            metrics_task.cancel()
+            await asyncio.gather(metrics_task, return_exceptions=True)
+            await loop_monitor.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,24 @@
+from enum import StrEnum
+
+from pydantic import BaseModel, ConfigDict
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class RegistrationJob(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    job_id: str
+    status: JobStatus
+    user_id: int | None = None
+    error: str | None = None
+    updated_at: float
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
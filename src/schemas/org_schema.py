@@ -14,6 +14,13 @@ class OrgPublic(BaseModel):
     id: int
     name: str
     config: dict | None = None
+    version: int = 1
+
+
+class OrgBatch(BaseModel):
+    # keyed in request order; null marks ids that don't exist
+    items: dict[int, OrgPublic | None]
+    not_found: list[int]
 
 
 class OrgUpdate(BaseModel):
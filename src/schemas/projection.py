@@ -0,0 +1,29 @@
+from collections.abc import Collection
+from functools import cache
+
+from pydantic import BaseModel, create_model
+
+# Always selected so projected objects can still be identified and ETagged
+ALWAYS_SELECTED = frozenset({"id", "version"})
+
+
+def selected_columns(fields: Collection[str]) -> frozenset[str]:
+    return ALWAYS_SELECTED | frozenset(fields)
+
+
+@cache
+def projection(model: type[BaseModel], fields: frozenset[str]) -> type[BaseModel]:
+    """A copy of `model` restricted to `fields`, built once per field set.
+
+    Rows loaded with only some columns validate against the projection, so a
+    sparse fetch still goes through exactly one validation.
+    """
+    return create_model(
+        f"{model.__name__}Projection",
+        __config__=model.model_config,
+        **{
+            name: (info.annotation, info)
+            for name, info in model.model_fields.items()
+            if name in fields
+        },
+    )
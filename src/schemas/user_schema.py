@@ -13,6 +13,14 @@ class UserPublic(BaseModel):
     model_config = ConfigDict(from_attributes=True, extra="ignore")
     id: int
     name: str
+    # defaults to 1 so cache entries written before versioning still load
+    version: int = 1
+
+
+class UserBatch(BaseModel):
+    # keyed in request order; null marks ids that don't exist
+    items: dict[int, UserPublic | None]
+    not_found: list[int]
 
 
 class UserUpdate(BaseModel):
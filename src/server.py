@@ -0,0 +1,78 @@
+"""Production entry point.
+
+    python3 -m src.server
+
+Pre-forks WEB_CONCURRENCY workers (the CPU count unless set) that share one
+listening socket. Each worker warms its DB pool, Redis and RMQ connections in
+the app lifespan before it starts accepting requests. It sizes its DB pool to
+an equal share of DB_CONNECTION_BUDGET, split between the workers and
+DB_EXTRA_PROCESSES (a restart replacement and the RMQ worker).
+
+With more than one worker, each process (the RMQ worker too, if it is started
+with the same METRICS_MULTIPROC_DIR) writes its metrics to a shared directory
+and /metrics on any worker reports the totals for the host.
+
+Rolling restart (e.g. after a deploy): `kill -HUP <pid of this process>`
+replaces the workers one at a time, so the rest keep serving. SIGTERM stops
+accepting and drains in-flight requests for up to GRACEFUL_SHUTDOWN_SECONDS.
+"""
+
+import importlib.util
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import uvicorn
+
+# Not __name__: run with -m this module is __main__, outside the "src" logger
+logger = logging.getLogger("src.server")
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _metrics_dir(workers: int) -> str | None:
+    directory = os.getenv("METRICS_MULTIPROC_DIR")
+    if not directory and workers > 1:
+        directory = tempfile.mkdtemp(prefix="metrics-")
+    if directory:
+        # Counters restart from zero with the server, so drop the last run's
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        for snapshot in Path(directory).glob("*.json"):
+            snapshot.unlink(missing_ok=True)
+    return directory
+
+
+def main():
+    # Exported before env.py is imported: workers are spawned, re-import env.py
+    # and size their pools from the same worker count.
+    workers = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if metrics_dir := _metrics_dir(workers):
+        os.environ["METRICS_MULTIPROC_DIR"] = metrics_dir
+
+    from env import GRACEFUL_SHUTDOWN_SECONDS, HOST, PORT, ROOT_PATH  # noqa: PLC0415
+
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    logger.info(
+        "starting %s workers on %s:%s (%s, %s)", workers, HOST, PORT, loop, http
+    )
+
+    uvicorn.run(
+        "src.app:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        root_path=ROOT_PATH or "",
+        proxy_headers=True,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+
+from env import JOB_MAX_WAIT_SECONDS, JOB_TTL_SECONDS
+from src import deadline
+from src.redis_client import RedisProtocol
+from src.schemas.job_schema import JobStatus, RegistrationJob
+
+logger = logging.getLogger(__name__)
+
+
+class RegistrationJobService:
+    """Tracks background registrations in Redis so clients can poll one key."""
+
+    def __init__(self, redis: RedisProtocol, ttl: int = JOB_TTL_SECONDS):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    async def create(self, job_id: str) -> RegistrationJob:
+        job = RegistrationJob(
+            job_id=job_id, status=JobStatus.QUEUED, updated_at=time.time()
+        )
+        # NX: a fast worker may already have moved the job past QUEUED
+        await self.redis.set_nx(self._key(job_id), self.ttl, job.model_dump_json())
+        return job
+
+    async def mark(
+        self,
+        job_id: str | None,
+        status: JobStatus,
+        user_id: int | None = None,
+        error: str | None = None,
+    ) -> None:
+        if not job_id:
+            return
+        job = RegistrationJob(
+            job_id=job_id,
+            status=status,
+            user_id=user_id,
+            error=error,
+            updated_at=time.time(),
+        )
+        await self.redis.setex(self._key(job_id), self.ttl, job.model_dump_json())
+        logger.debug("job %s is %s", job_id, status)
+
+    async def get(self, job_id: str) -> RegistrationJob | None:
+        cached_data = await self.redis.get(self._key(job_id))
+        if not cached_data:
+            return None
+        return RegistrationJob.model_validate_json(cached_data)
+
+    async def wait(self, job_id: str, timeout: float) -> RegistrationJob | None:
+        """Long-poll until the job finishes or `timeout` seconds pass.
+
+        Polls a single Redis key with a growing interval, so a waiting client
+        costs a handful of GETs rather than a stream of HTTP requests. Returns
+        early enough to answer within the request deadline.
+        """
+        budget = min(timeout, JOB_MAX_WAIT_SECONDS)
+        left = deadline.remaining()
+        if left is not None:
+            budget = min(budget, left * 0.9)
+        until = time.monotonic() + budget
+        interval = 0.05
+        while True:
+            job = await self.get(job_id)
+            remaining = until - time.monotonic()
+            if job is None or job.finished or remaining <= 0:
+                return job
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, 1.0)
@@ -5,11 +5,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.repo.postgres.db_helper import UnitOfWork
 from src.repo.postgres.org_repo import OrgRepository
-from src.schemas.org_schema import OrgCreate, OrgPublic, OrgUpdate
+from src.schemas.org_schema import OrgBatch, OrgCreate, OrgPublic, OrgUpdate
+from src.schemas.projection import projection, selected_columns
+from src.tracing import trace_methods
 
 logger = logging.getLogger(__name__)
 
 
+@trace_methods
 class OrgService:
     def __init__(self, session: AsyncSession) -> "OrgService":
         self.repo = OrgRepository(session)
@@ -21,19 +24,41 @@ class OrgService:
         logger.info("org created, id=%s", org_model.id)
         return OrgPublic.model_validate(org_model)
 
-    async def get_org(self, org_id: int) -> OrgPublic | None:
-        org = await self.repo.get(org_id)
-        if not org:
-            return None
-        return OrgPublic.model_validate(org)
+    async def get_org(
+        self, org_id: int, fields: frozenset[str] | None = None
+    ) -> OrgPublic | None:
+        """With `fields`, only those columns are loaded (plus id and version)."""
+        if fields is None:
+            org = await self.repo.get(org_id)
+            return OrgPublic.model_validate(org) if org else None
+        columns = selected_columns(fields)
+        org = await self.repo.get(org_id, columns)
+        return projection(OrgPublic, columns).model_validate(org) if org else None
 
-    async def list_orgs(self, limit: int = 100, offset: int = 0) -> Sequence[OrgPublic]:
-        orgs = await self.repo.list(limit=limit, offset=offset)
-        return [OrgPublic.model_validate(o) for o in orgs]
+    async def get_orgs(self, org_ids: Sequence[int]) -> OrgBatch:
+        orgs = await self.repo.get_many(org_ids)
+        found = {o.id: OrgPublic.model_validate(o) for o in orgs}
+        return OrgBatch(
+            items={org_id: found.get(org_id) for org_id in org_ids},
+            not_found=[org_id for org_id in org_ids if org_id not in found],
+        )
 
-    async def update_org(self, org_id: int, data: OrgUpdate) -> OrgPublic:
+    async def get_org_version(self, org_id: int) -> int | None:
+        return await self.repo.get_version(org_id)
+
+    async def list_orgs(
+        self, limit: int = 100, offset: int = 0, fields: frozenset[str] | None = None
+    ) -> Sequence[OrgPublic]:
+        columns = None if fields is None else selected_columns(fields)
+        orgs = await self.repo.list(limit=limit, offset=offset, columns=columns)
+        model = OrgPublic if columns is None else projection(OrgPublic, columns)
+        return [model.model_validate(o) for o in orgs]
+
+    async def update_org(
+        self, org_id: int, data: OrgUpdate, expected_version: int | None = None
+    ) -> OrgPublic:
         async with self.transaction:
-            org_model = await self.repo.update(org_id, data)
+            org_model = await self.repo.update(org_id, data, expected_version)
         logger.info("org updated, id=%s", org_id)
         return OrgPublic.model_validate(org_model)
 
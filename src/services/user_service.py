@@ -7,11 +7,14 @@ from src.auth.security import get_password_hash, verify_password
 from src.redis_client import MockRedisClient, RedisProtocol
 from src.repo.postgres.db_helper import UnitOfWork
 from src.repo.postgres.user_repo import UserRepository
-from src.schemas.user_schema import UserCreate, UserPublic, UserUpdate
+from src.schemas.projection import projection, selected_columns
+from src.schemas.user_schema import UserBatch, UserCreate, UserPublic, UserUpdate
+from src.tracing import trace_methods
 
 logger = logging.getLogger(__name__)
 
 
+@trace_methods
 class UserService:
     def __init__(
         self, session: AsyncSession, redis: RedisProtocol = MockRedisClient()
@@ -32,7 +35,15 @@ class UserService:
         logger.info("user created, id=%s", user.id)
         return user
 
-    async def get_user_profile(self, user_id: int) -> UserPublic | None:
+    async def get_user_profile(
+        self, user_id: int, fields: frozenset[str] | None = None
+    ) -> UserPublic | None:
+        """Cached profile lookup, optionally projected to `fields`.
+
+        With `fields`, a cache miss loads only those columns (plus id and
+        version) and is not cached; a cache hit returns the full entry and the
+        router projects it when rendering.
+        """
         cache_key = f"user:{user_id}"
 
         # 1. Try Cache (Fastest)
@@ -44,6 +55,13 @@ class UserService:
 
         # 2. Try DB
         logger.debug("cache miss for user, id=%s", user_id)
+        if fields is not None:
+            # Partial rows stay out of the cache so user:<id> is always complete
+            columns = selected_columns(fields)
+            user = await self.repo.get(user_id, columns)
+            return (
+                projection(UserPublic, columns).model_validate(user) if user else None
+            )
         user = await self.repo.get(user_id)
         if not user:
             return None
@@ -54,16 +72,46 @@ class UserService:
         logger.debug("returning user from db, id=%s", user_id)
         return user
 
+    async def get_user_profiles(self, user_ids: Sequence[int]) -> UserBatch:
+        # 1. One MGET for the whole batch
+        cached = await self.redis.mget([f"user:{user_id}" for user_id in user_ids])
+        found = {
+            user_id: UserPublic.model_validate_json(cached_data)
+            for user_id, cached_data in zip(user_ids, cached, strict=True)
+            if cached_data
+        }
+
+        # 2. One query for every miss, then one pipelined cache fill
+        misses = [user_id for user_id in user_ids if user_id not in found]
+        if misses:
+            users = [
+                UserPublic.model_validate(u) for u in await self.repo.get_many(misses)
+            ]
+            found.update({user.id: user for user in users})
+            await self.redis.setex_many(
+                {f"user:{user.id}": user.model_dump_json() for user in users}, 3600
+            )
+        logger.debug("batch of %s users, %s cache misses", len(user_ids), len(misses))
+
+        return UserBatch(
+            items={user_id: found.get(user_id) for user_id in user_ids},
+            not_found=[user_id for user_id in user_ids if user_id not in found],
+        )
+
     async def list_active_users(
-        self, limit: int = 100, offset: int = 0
+        self, limit: int = 100, offset: int = 0, fields: frozenset[str] | None = None
     ) -> Sequence[UserPublic]:
-        users = await self.repo.list(limit=limit, offset=offset)
-        return [UserPublic.model_validate(u) for u in users]
-
-    async def update_user_info(self, user_id: int, data: UserUpdate) -> UserPublic:
+        columns = None if fields is None else selected_columns(fields)
+        users = await self.repo.list(limit=limit, offset=offset, columns=columns)
+        model = UserPublic if columns is None else projection(UserPublic, columns)
+        return [model.model_validate(u) for u in users]
+
+    async def update_user_info(
+        self, user_id: int, data: UserUpdate, expected_version: int | None = None
+    ) -> UserPublic:
         cache_key = f"user:{user_id}"
         async with self.transaction:
-            user_model = await self.repo.update(user_id, data)
+            user_model = await self.repo.update(user_id, data, expected_version)
 
         # Clear cache so next 'get' sees fresh data
         await self.redis.delete(cache_key)
@@ -98,11 +146,6 @@ class UserService:
 
         # 2. Check the password
         # This is a CPU-intensive operation (bcrypt)
-        logger.warning(
-            "Auth failed: Incorrect password for user %s %s",
-            password,
-            user_model.password,
-        )
         if not verify_password(password, user_model.password):
             logger.warning("Auth failed: Incorrect password for user %s", username)
             return None
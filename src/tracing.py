@@ -0,0 +1,250 @@
+"""Lightweight tracing spans.
+
+A trace starts at an entry point (an HTTP request, a consumed message) with
+`start_trace` and every `span` opened under it, in the same task or in tasks
+created from it, becomes a child through a contextvar:
+
+    GET /user/{user_id}
+      auth.decode_token
+      UserService.get_user_profile
+        redis.get
+        db.pool_checkout
+        db.query
+
+Sampling is decided once per trace, at its root: TRACE_SAMPLE_RATE for new
+traces, the caller's decision for traces continued from a `traceparent`
+(W3C format, sent in HTTP and AMQP headers). Spans of an unsampled trace are
+never created, which costs one contextvar read.
+
+Finished spans go to the exporter picked by TRACE_EXPORTER: "memory" keeps the
+latest ones in process, "file" appends JSON lines to TRACE_FILE from a
+background thread, "none" (the default) turns tracing off.
+"""
+
+import contextlib
+import functools
+import inspect
+import json
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Protocol, TypeVar
+
+from env import TRACE_EXPORTER, TRACE_FILE, TRACE_SAMPLE_RATE
+
+TRACEPARENT = "traceparent"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    sampled: bool
+    attributes: dict[str, Any] = field(default_factory=dict)
+    start: float = field(default_factory=time.time)
+    duration_ms: float | None = None
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class Exporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+
+class InMemoryExporter:
+    """Keeps the last `max_spans` finished spans, for tests and debugging."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def trace(self, trace_id: str) -> list[Span]:
+        return sorted(
+            (s for s in self.spans if s.trace_id == trace_id), key=lambda s: s.start
+        )
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileExporter:
+    """Appends spans as JSON lines from a background thread.
+
+    Like the log pipeline, callers only put on a bounded queue; spans are
+    dropped and counted when the writer falls behind.
+    """
+
+    def __init__(self, filename: str, queue_size: int = 10000):
+        self.filename = filename
+        self.dropped = 0
+        self._queue: queue.Queue[Span | None] = queue.Queue(queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="trace-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        with open(self.filename, "a") as file:  # noqa: PTH123
+            while (span := self._queue.get()) is not None:
+                file.write(json.dumps(span.to_dict(), default=str) + "\n")
+                if self._queue.empty():
+                    file.flush()
+
+    def close(self, timeout: float = 5) -> None:
+        self._queue.put(None, timeout=timeout)
+        self._thread.join(timeout)
+
+
+def _default_exporter() -> Exporter | None:
+    if TRACE_EXPORTER == "memory":
+        return InMemoryExporter()
+    if TRACE_EXPORTER == "file":
+        return FileExporter(TRACE_FILE)
+    return None
+
+
+_exporter: Exporter | None = _default_exporter()
+_sample_rate = TRACE_SAMPLE_RATE
+_current: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+def configure(
+    exporter: Exporter | None, sample_rate: float = TRACE_SAMPLE_RATE
+) -> None:
+    """Swap the exporter and sample rate (None turns tracing off)."""
+    global _exporter, _sample_rate  # noqa: PLW0603
+    _exporter = exporter
+    _sample_rate = sample_rate
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def parse_traceparent(value: str | bytes | None) -> tuple[str, str, bool] | None:
+    """(trace_id, parent span_id, sampled) from a traceparent header."""
+    if isinstance(value, bytes):  # AMQP header values may arrive undecoded
+        value = value.decode("ascii", "replace")
+    match = _TRACEPARENT.match(value or "")
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def traceparent() -> str | None:
+    """The current span as a traceparent header value."""
+    current = _current.get()
+    if current is None:
+        return None
+    return f"00-{current.trace_id}-{current.span_id}-{int(current.sampled):02x}"
+
+
+def inject(headers: dict[str, Any]) -> dict[str, Any]:
+    """Add the current trace context to outgoing message or request headers."""
+    value = traceparent()
+    if value is not None:
+        headers[TRACEPARENT] = value
+    return headers
+
+
+@contextlib.contextmanager
+def _run(span: Span) -> Iterator[Span]:
+    token = _current.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.error = type(e).__name__
+        raise
+    finally:
+        span.duration_ms = round((time.perf_counter() - start) * 1e3, 3)
+        _current.reset(token)
+        exporter = _exporter
+        if span.sampled and exporter is not None:
+            exporter.export(span)
+
+
+@contextlib.contextmanager
+def start_trace(
+    name: str, parent: str | bytes | None = None, **attributes: object
+) -> Iterator[Span]:
+    """Open the root span of a trace, continuing `parent` (a traceparent) if given.
+
+    Unsampled roots are still set as current so the decision propagates.
+    """
+    context = parse_traceparent(parent)
+    if context is not None:
+        trace_id, parent_id, sampled = context
+    else:
+        trace_id, parent_id = _new_id(128), None
+        sampled = _exporter is not None and random.random() < _sample_rate  # noqa: S311
+    with _run(
+        Span(name, trace_id, _new_id(64), parent_id, sampled, attributes)
+    ) as root:
+        yield root
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: object) -> Iterator[Span | None]:
+    """Open a child of the current span; a no-op outside a sampled trace."""
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+    with _run(
+        Span(name, parent.trace_id, _new_id(64), parent.span_id, True, attributes)
+    ) as child:
+        yield child
+
+
+def traced(name: str | None = None) -> Callable[[T], T]:
+    """Run a coroutine function in a span named after it (or `name`)."""
+
+    def decorator(function):  # noqa: ANN001, ANN202
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):  # noqa: ANN003, ANN202
+            parent = _current.get()
+            if parent is None or not parent.sampled:
+                return await function(*args, **kwargs)
+            with span(span_name):
+                return await function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(cls: type[T]) -> type[T]:
+    """Class decorator: a span around every public coroutine method."""
+    for attribute, value in list(vars(cls).items()):
+        if not attribute.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attribute, traced()(value))
+    return cls
@@ -1,62 +1,119 @@
-import asyncio
+import os
+
 from httpx import ASGITransport, AsyncClient
 import pytest
 import pytest_asyncio
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
+from sqlalchemy_utils import create_database, database_exists, drop_database
+from env import LOOP_BLOCK_BUDGET_MS
 from src.app import app
-from src.database import Base, DATABASE_URL
+from src.database import Base, DATABASE_URL, get_db
+from src.loop_monitor import detect_blocking
 from src.redis_client import MockRedisClient
 
+# Each pytest-xdist worker (and a plain run, as "main") gets its own database,
+# cloned from a template that has the schema. DATABASE_URL names the prefix:
+# test_db -> test_db_template, test_db_gw0, test_db_gw1, ...
+TEST_DATABASE_URL = make_url(DATABASE_URL)
+TEMPLATE_DATABASE_URL = TEST_DATABASE_URL.set(
+    database=f"{TEST_DATABASE_URL.database}_template"
+)
 
-# 2. Force a single session-wide event loop
-@pytest.fixture(scope="session")
-def event_loop():
-    """Create a single event loop for the entire test session."""
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "loop_block_budget(ms): fail if a loop callback runs longer than ms",
+    )
+
+
+def _sync_url(url: URL) -> URL:
+    # sqlalchemy_utils and create_all run outside the event loop, on psycopg2
+    return url.set(drivername="postgresql")
+
+
+def _recreate_database(url: URL, template: str | None = None) -> None:
+    if database_exists(_sync_url(url)):
+        drop_database(_sync_url(url))
+    create_database(_sync_url(url), template=template)
+
+
+def _is_worker(config) -> bool:
+    return hasattr(config, "workerinput")
+
+
+# 1. Build the template once, in the controller before xdist starts workers.
+# Rebuilt every run so it always matches the models.
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionstart(session):
+    if _is_worker(session.config):
+        return
+    _recreate_database(TEMPLATE_DATABASE_URL)
+    engine = create_engine(_sync_url(TEMPLATE_DATABASE_URL))
     try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-    yield loop
-    loop.close()
+        Base.metadata.create_all(engine)
+    finally:
+        engine.dispose()  # CREATE DATABASE ... TEMPLATE needs it unused
 
 
-# 3. Create the engine inside a session fixture (NOT at the top of the file)
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session):
+    if not _is_worker(session.config) and database_exists(
+        _sync_url(TEMPLATE_DATABASE_URL)
+    ):
+        drop_database(_sync_url(TEMPLATE_DATABASE_URL))
+
+
+# 2. This worker's database, a copy of the template
+@pytest.fixture(scope="session")
+def database_url():
+    worker = os.getenv("PYTEST_XDIST_WORKER", "main")
+    url = TEST_DATABASE_URL.set(database=f"{TEST_DATABASE_URL.database}_{worker}")
+    _recreate_database(url, template=TEMPLATE_DATABASE_URL.database)
+    yield url
+    drop_database(_sync_url(url))
+
+
+# 3. Create the engine inside a session fixture (NOT at the top of the file).
+# Fixtures and tests share the session-scoped loop (pytest.ini), so pooled
+# connections stay on the loop they were opened on.
 @pytest_asyncio.fixture(scope="session")
-async def engine(event_loop):
-    engine = create_async_engine(DATABASE_URL, echo=False)
+async def engine(database_url):
+    engine = create_async_engine(database_url, echo=False)
     yield engine
     await engine.dispose()
 
 
-# 4. Setup tables
-@pytest_asyncio.fixture(scope="session", autouse=True)
-async def setup_test_db(engine):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    yield
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+# 4. Every test runs inside a transaction that is rolled back afterwards
+@pytest_asyncio.fixture
+async def connection(engine):
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            yield connection
+        finally:
+            await transaction.rollback()
+
+
+def _session(connection: AsyncConnection) -> AsyncSession:
+    # commit() (UnitOfWork) releases a SAVEPOINT and rollback() returns to
+    # it; the outer transaction is left alone either way
+    return AsyncSession(
+        bind=connection,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
 
 
 # 5. Provide the session
-@pytest_asyncio.fixture(scope="function")
-async def db_session(engine):
-    async_session = async_sessionmaker(
-        engine, expire_on_commit=False, class_=AsyncSession
-    )
-    async with async_session() as session:
+@pytest_asyncio.fixture
+async def db_session(connection):
+    async with _session(connection) as session:
         yield session
 
 
-# 6. Truncation logic
-@pytest_asyncio.fixture(autouse=True)
-async def truncate_tables(engine):
-    yield
-    async with engine.begin() as conn:
-        for table in reversed(Base.metadata.sorted_tables):
-            await conn.execute(table.delete())
-
-
 @pytest.fixture
 def mock_redis():
     return MockRedisClient()
@@ -67,9 +124,40 @@ def failing_redis():
     return MockRedisClient(should_fail=True)
 
 
+# 6. Requests use the test's connection, so they see its uncommitted rows and
+# their writes are rolled back with it
 @pytest_asyncio.fixture(scope="function")
-async def async_client():
-    async with AsyncClient(
-        transport=ASGITransport(app=app), base_url="http://"
-    ) as client:
-        yield client
+async def async_client(connection):
+    async def get_test_db():
+        async with _session(connection) as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_test_db
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://"
+        ) as client:
+            yield client
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+# 7. Fail tests whose code blocks the event loop
+@pytest.fixture(autouse=True)
+def loop_block_budget(request):
+    """Budget from @pytest.mark.loop_block_budget(ms), else LOOP_BLOCK_BUDGET_MS.
+
+    Off (0) by default, e.g. `LOOP_BLOCK_BUDGET_MS=50 pytest` to hunt for
+    blocking calls.
+    """
+    marker = request.node.get_closest_marker("loop_block_budget")
+    budget_ms = marker.args[0] if marker else LOOP_BLOCK_BUDGET_MS
+    if not budget_ms:
+        yield
+        return
+    with detect_blocking(budget_ms / 1000) as detector:
+        yield
+    if detector.violations:
+        pytest.fail(
+            f"event loop blocked for more than {budget_ms} ms:\n{detector.report()}"
+        )
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from src.app.middleware.concurrency import (
+    PRIORITY_BULK,
+    PRIORITY_CRITICAL,
+    AdaptiveLimit,
+    ConcurrencyGroup,
+    ConcurrencyLimitMiddleware,
+    classify,
+)
+
+
+def make_group(
+    limit: int = 1, max_queue: int = 1, max_wait: float = 1
+) -> ConcurrencyGroup:
+    return ConcurrencyGroup(
+        "test", AdaptiveLimit(limit, 1, 10, target_latency=0.1), max_queue, max_wait
+    )
+
+
+def test_limit_backs_off_on_slow_requests_and_recovers():
+    limit = AdaptiveLimit(10, 1, 20, target_latency=0.1)
+
+    limit.on_sample(0.5, failed=False, in_flight=10)
+    assert limit.current == pytest.approx(9)
+
+    limit.on_sample(0.01, failed=False, in_flight=9)
+    assert limit.current == pytest.approx(9 + 1 / 9)
+    # No growth while the limit isn't being used
+    limit.on_sample(0.01, failed=False, in_flight=0)
+    assert limit.current == pytest.approx(9 + 1 / 9)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_full_queue_sheds_lower_priority():
+    group = make_group()
+    assert await group.acquire(PRIORITY_BULK)
+
+    bulk = asyncio.create_task(group.acquire(PRIORITY_BULK))
+    await asyncio.sleep(0)
+    # Another bulk request can't get in, but a login evicts the queued bulk one
+    assert not await group.acquire(PRIORITY_BULK)
+    login = asyncio.create_task(group.acquire(PRIORITY_CRITICAL))
+    await asyncio.sleep(0)
+    assert await bulk is False
+
+    group.release()
+    assert await login is True
+    assert group.in_flight == 1
+    assert group.rejected == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_waiter_times_out():
+    group = make_group(max_wait=0.01)
+    assert await group.acquire(PRIORITY_BULK)
+
+    assert not await group.acquire(PRIORITY_BULK)
+    assert group.queued == 0
+    group.release()
+    assert group.in_flight == 0
+
+
+def http_scope(path: str, method: str = "GET") -> dict:
+    return {"type": "http", "method": method, "path": path, "query_string": b""}
+
+
+def test_job_long_poll_has_its_own_group():
+    assert classify(http_scope("/user/register-async/abc")) == ("poll", 1)
+    assert classify(http_scope("/user/register-async/backlog"))[0] == "api"
+    assert classify(http_scope("/user/register-async", "POST"))[0] == "api"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_parked_long_poll_does_not_decay_api_limit():
+    api = ConcurrencyGroup("api", AdaptiveLimit(4, 2, 10, 0.01), 1, 1)
+    poll = ConcurrencyGroup("poll", AdaptiveLimit(4, 1, 4, 0.01), 1, 1, adaptive=False)
+    release = asyncio.Event()
+
+    async def app(scope: dict, _receive: object, send: object) -> None:
+        if scope["path"].startswith("/user/register-async/"):
+            await release.wait()  # parked well past the latency target
+        await send({"type": "http.response.start", "status": 200})
+
+    async def send(_message: dict) -> None:
+        pass
+
+    middleware = ConcurrencyLimitMiddleware(app, {"api": api, "poll": poll})
+    waiters = [
+        asyncio.create_task(
+            middleware(http_scope("/user/register-async/job"), None, send)
+        )
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0.02)
+    assert poll.in_flight == 3
+    release.set()
+    await asyncio.gather(*waiters)
+
+    assert poll.in_flight == 0
+    assert api.limit.current == 4
+    assert poll.limit.current == 4
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cancelled_waiter_gives_back_its_slot():
+    group = make_group()
+    assert await group.acquire(PRIORITY_BULK)
+
+    queued = asyncio.create_task(group.acquire(PRIORITY_BULK))
+    await asyncio.sleep(0)
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    assert group.queued == 0
+
+    granted = asyncio.create_task(group.acquire(PRIORITY_BULK))
+    await asyncio.sleep(0)
+    # The slot is handed over in the same tick the waiter is cancelled
+    group.release()
+    granted.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await granted
+    assert group.in_flight == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_request_without_response_is_not_a_sample():
+    api = ConcurrencyGroup("api", AdaptiveLimit(4, 2, 10, 0.01), 1, 1)
+
+    async def app(_scope: dict, _receive: object, _send: object) -> None:
+        await asyncio.sleep(0.02)
+        raise asyncio.CancelledError
+
+    middleware = ConcurrencyLimitMiddleware(app, {"api": api})
+    with pytest.raises(asyncio.CancelledError):
+        await middleware(http_scope("/user/1"), None, None)
+
+    assert api.in_flight == 0
+    assert api.limit.current == 4
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.app.middleware.idempotency import IdempotencyMiddleware
+from src.redis_client import MockRedisClient
+
+
+def make_app(redis: MockRedisClient, gate: asyncio.Event | None = None) -> FastAPI:
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.post("/org", status_code=201)
+    async def create_org(payload: dict) -> dict:
+        app.state.calls += 1
+        if gate is not None:
+            await gate.wait()
+        return {"id": app.state.calls, **payload}
+
+    app.add_middleware(IdempotencyMiddleware, redis=redis)
+    return app
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_retry_replays_first_response(mock_redis: MockRedisClient):
+    mock_redis.reset()
+    app = make_app(mock_redis)
+    headers = {"Idempotency-Key": "create-acme", "Authorization": "Bearer a"}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://") as c:
+        first = await c.post("/org", json={"name": "acme"}, headers=headers)
+        retry = await c.post("/org", json={"name": "acme"}, headers=headers)
+        reused = await c.post("/org", json={"name": "other"}, headers=headers)
+        other_token = await c.post(
+            "/org",
+            json={"name": "acme"},
+            headers={**headers, "Authorization": "Bearer b"},
+        )
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert reused.status_code == 422
+    assert other_token.status_code == 201
+    assert app.state.calls == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_concurrent_duplicate_is_rejected(mock_redis: MockRedisClient):
+    mock_redis.reset()
+    gate = asyncio.Event()
+    app = make_app(mock_redis, gate)
+    headers = {"Idempotency-Key": "slow-create"}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://") as c:
+        first = asyncio.create_task(c.post("/org", json={"name": "a"}, headers=headers))
+        await asyncio.sleep(0.05)
+        duplicate = await c.post("/org", json={"name": "a"}, headers=headers)
+        gate.set()
+        assert (await first).status_code == 201
+
+    assert duplicate.status_code == 409
+    assert duplicate.headers["retry-after"] == "1"
+    assert app.state.calls == 1
@@ -2,7 +2,7 @@ import pytest
 from httpx import AsyncClient
 
 from src.auth.security import create_access_token
-from src.schemas.org_schema import OrgPublic
+from src.schemas.org_schema import OrgCreate, OrgPublic
 from tests.fixtures import org_fixture, user_fixture
 
 
@@ -151,3 +151,96 @@ async def test_delete_org_404(db_session, async_client: AsyncClient):
     response = await async_client.delete("/org/99999", headers=headers)
 
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_org_304_if_none_match(db_session, async_client: AsyncClient):
+    user = await user_fixture(db_session)
+    token = create_access_token(user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+    org = await org_fixture(db_session)
+
+    response = await async_client.get(f"/org/{org.id}", headers=headers)
+    etag = response.headers["ETag"]
+    cached = await async_client.get(
+        f"/org/{org.id}", headers={**headers, "If-None-Match": etag}
+    )
+
+    assert response.status_code == 200
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_update_org_if_match(db_session, async_client: AsyncClient):
+    user = await user_fixture(db_session)
+    token = create_access_token(user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+    org = await org_fixture(db_session)
+    etag = (await async_client.get(f"/org/{org.id}", headers=headers)).headers["ETag"]
+
+    response = await async_client.patch(
+        f"/org/{org.id}", json={"name": "v2"}, headers={**headers, "If-Match": etag}
+    )
+    # The first update bumped the version, so the old ETag is stale now
+    stale = await async_client.patch(
+        f"/org/{org.id}", json={"name": "v3"}, headers={**headers, "If-Match": etag}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["version"] == org.version + 1
+    assert response.headers["ETag"] != etag
+    assert stale.status_code == 412
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_orgs_batch(db_session, async_client: AsyncClient):
+    user = await user_fixture(db_session)
+    token = create_access_token(user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+    first = await org_fixture(db_session)
+    second = await org_fixture(db_session)
+
+    response = await async_client.get(
+        f"/org/batch?ids={second.id},99999,{first.id}", headers=headers
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    # keeps the requested order and marks the missing id
+    assert list(body["items"]) == [str(second.id), "99999", str(first.id)]
+    assert body["items"]["99999"] is None
+    assert body["not_found"] == [99999]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_orgs_batch_422_too_many_ids(db_session, async_client: AsyncClient):
+    user = await user_fixture(db_session)
+    token = create_access_token(user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = ",".join(str(i) for i in range(1, 1002))
+
+    response = await async_client.get(f"/org/batch?ids={ids}", headers=headers)
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_org_sparse_fields(db_session, async_client: AsyncClient):
+    user = await user_fixture(db_session)
+    token = create_access_token(user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+    org = await org_fixture(
+        db_session, OrgCreate(name="sparse_org", config={"plan": "pro"})
+    )
+
+    response = await async_client.get(f"/org/{org.id}?fields=name", headers=headers)
+    listed = await async_client.get("/org?fields=id,name", headers=headers)
+    invalid = await async_client.get(
+        f"/org/{org.id}?fields=name,secret", headers=headers
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"name": "sparse_org"}
+    assert all(set(o) == {"id", "name"} for o in listed.json())
+    assert invalid.status_code == 422
@@ -2,8 +2,14 @@ import asyncio
 import threading
 import pytest
 from httpx import AsyncClient
+from src.app import app
+from src.app.routers.deps import get_job_service
 from src.auth.security import create_access_token
+from src.rmq import get_rmq_publisher
+from src.rmq.publisher import RabbitMQPublisher
+from src.schemas.job_schema import JobStatus
 from src.schemas.user_schema import UserPublic
+from src.services.job_service import RegistrationJobService
 from tests.fixtures import org_fixture, user_fixture
 import logging
 
@@ -41,3 +47,87 @@ async def test_create_user_401(db_session, async_client: AsyncClient):
     headers = {"Authorization": f"Bearer", "Content-Type": "application/json"}
     response = await async_client.post("/user", json=data, headers=headers)
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_register_async_429_above_high_water_mark(
+    db_session, async_client: AsyncClient
+):
+    user: UserPublic = await user_fixture(db_session)
+    token = create_access_token(user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+    publisher = RabbitMQPublisher("amqp://unused/", "test_queue", high_water_mark=10)
+    publisher.channel = object()  # looks connected, nothing is ever sent
+    publisher.queue_depth = 10
+    app.dependency_overrides[get_rmq_publisher] = lambda: publisher
+    try:
+        data = {"name": "queued_user", "password": "1234", "org_id": 1}
+        response = await async_client.post(
+            "/user/register-async", json=data, headers=headers
+        )
+    finally:
+        app.dependency_overrides.pop(get_rmq_publisher)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"].isdigit()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_registration_job_status(
+    db_session, async_client: AsyncClient, mock_redis
+):
+    user: UserPublic = await user_fixture(db_session)
+    token = create_access_token(user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+    jobs = RegistrationJobService(mock_redis)
+    await jobs.create("job-under-test")
+    await jobs.mark("job-under-test", JobStatus.DONE, user_id=user.id)
+    app.dependency_overrides[get_job_service] = lambda: jobs
+    try:
+        response = await async_client.get(
+            "/user/register-async/job-under-test?wait=1", headers=headers
+        )
+        missing = await async_client.get(
+            "/user/register-async/no-such-job", headers=headers
+        )
+    finally:
+        app.dependency_overrides.pop(get_job_service)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+    assert response.json()["user_id"] == user.id
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_user_304_if_none_match(db_session, async_client: AsyncClient):
+    user: UserPublic = await user_fixture(db_session)
+    token = create_access_token(user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = await async_client.get(f"/user/{user.id}", headers=headers)
+    cached = await async_client.get(
+        f"/user/{user.id}",
+        headers={**headers, "If-None-Match": response.headers["ETag"]},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+    assert cached.status_code == 304
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_users_batch(db_session, async_client: AsyncClient):
+    user: UserPublic = await user_fixture(db_session)
+    token = create_access_token(user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = await async_client.get(
+        f"/user/batch?ids=99999&ids={user.id}", headers=headers
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body["items"]) == ["99999", str(user.id)]
+    assert body["items"][str(user.id)]["name"] == user.name
+    assert body["not_found"] == [99999]
@@ -0,0 +1,54 @@
+import pytest
+from httpx import AsyncClient
+
+from src.app import app
+from src.app.health import DEGRADED, UNAVAILABLE, HealthMonitor
+
+
+async def healthy() -> dict:
+    return {"detail": 1}
+
+
+async def down() -> dict:
+    raise ConnectionError
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_monitor_status():
+    monitor = HealthMonitor(
+        {"postgres": healthy, "redis": down}, critical=frozenset({"postgres"})
+    )
+    snapshot = await monitor.check()
+    assert snapshot["status"] == DEGRADED
+    assert snapshot["dependencies"]["postgres"]["detail"] == 1
+    assert snapshot["dependencies"]["redis"]["ok"] is False
+    assert monitor.ready
+
+    monitor.probes["postgres"] = down
+    assert (await monitor.check())["status"] == UNAVAILABLE
+    assert not monitor.ready
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_readyz_serves_cached_snapshot(async_client: AsyncClient):
+    calls = 0
+
+    async def counted() -> dict:
+        nonlocal calls
+        calls += 1
+        return {}
+
+    monitor = HealthMonitor({"postgres": counted}, critical=frozenset({"postgres"}))
+    await monitor.check()
+    app.state.health = monitor
+    try:
+        for _ in range(3):
+            response = await async_client.get("/readyz")
+            assert response.status_code == 200
+            assert response.json()["status"] == "ok"
+    finally:
+        del app.state.health
+    assert calls == 1
+
+    assert (await async_client.get("/readyz")).status_code == 503
+    assert (await async_client.get("/healthz")).json() == {"status": "ok"}
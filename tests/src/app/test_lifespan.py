@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+import pytest
+
+import src.app
+from src.app import app, lifespan
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_startup_is_concurrent_and_degrades(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+):
+    async def slow() -> None:
+        await asyncio.sleep(0.2)
+
+    async def down() -> None:
+        raise ConnectionError
+
+    async def hangs() -> None:
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(src.app.rmq_publisher, "connect", down)
+    monkeypatch.setattr(src.app.rmq_publisher, "close", slow)
+    monkeypatch.setattr(src.app, "_connect_redis", slow)
+    monkeypatch.setattr(src.app, "warm_pool", hangs)
+    monkeypatch.setattr(src.app, "DB_CONNECT_TIMEOUT_SECONDS", 0.3)
+
+    start = time.perf_counter()
+    async with lifespan(app):
+        elapsed = time.perf_counter() - start
+        unavailable = {
+            record.args[0]
+            for record in caplog.records
+            if record.msg == "%s unavailable at startup, serving degraded"
+        }
+        assert unavailable == {"rmq", "postgres"}
+    # Bounded by the slowest timeout, not the sum of the connects
+    assert elapsed < 0.5
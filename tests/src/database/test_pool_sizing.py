@@ -0,0 +1,15 @@
+import logging
+
+from src.database import pool_sizing
+
+
+def test_budget_covers_workers_and_extra_processes():
+    pool_size, max_overflow = pool_sizing(40, workers=2, extra=2)
+    assert (pool_size, max_overflow) == (5, 5)
+    assert (pool_size + max_overflow) * (2 + 2) <= 40
+
+
+def test_floor_warns_when_budget_is_exceeded(caplog):
+    with caplog.at_level(logging.WARNING, logger="src.database"):
+        assert pool_sizing(10, workers=8, extra=2) == (1, 1)
+    assert "can hold up to 20 connections" in caplog.text
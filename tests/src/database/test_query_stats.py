@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from src.database.query_stats import OTHER, QueryStats, fingerprint
+
+
+def test_fingerprint_replaces_literals_not_placeholders():
+    assert fingerprint("SET LOCAL statement_timeout = 1234") == (
+        "SET LOCAL statement_timeout = ?"
+    )
+    assert fingerprint("SELECT users.id \n FROM users2 WHERE users.id = $1") == (
+        "SELECT users.id FROM users2 WHERE users.id = $1"
+    )
+    assert fingerprint("SELECT * FROM users WHERE email = 'a@b.c'") == (
+        "SELECT * FROM users WHERE email = ?"
+    )
+
+
+def test_top_orders_by_total_time():
+    stats = QueryStats(slow_ms=1000)
+    for _ in range(10):
+        stats.record("SELECT 1 FROM users WHERE id = $1", 2)
+    stats.record("SELECT * FROM orgs", 15)
+
+    top = stats.top(order="total_ms")
+    assert [s["calls"] for s in top] == [10, 1]
+    assert top[0]["mean_ms"] == 2
+    assert stats.top(limit=1, order="max_ms")[0]["fingerprint"] == (
+        "SELECT * FROM orgs"
+    )
+    with pytest.raises(ValueError, match="order"):
+        stats.top(order="rows")
+
+
+def test_slow_queries_are_logged(caplog: pytest.LogCaptureFixture):
+    stats = QueryStats(slow_ms=100)
+    with caplog.at_level(logging.WARNING, "src.database.query_stats"):
+        stats.record("SELECT * FROM users", 50)
+        stats.record("SELECT * FROM users", 250)
+
+    assert stats.statements["SELECT * FROM users"].slow_calls == 1
+    assert len(caplog.records) == 1
+
+
+def test_distinct_statements_are_capped():
+    stats = QueryStats(max_statements=2)
+    for table in ("a", "b", "c", "d"):
+        stats.record(f"SELECT * FROM {table}", 1)  # noqa: S608
+
+    assert set(stats.statements) == {"SELECT * FROM a", "SELECT * FROM b", OTHER}
+    assert stats.statements[OTHER].calls == 2
+
+
+@pytest.mark.parametrize(
+    ("statement", "explained"),
+    [("SELECT * FROM users WHERE id = $1", True), ("DELETE FROM users", False)],
+)
+def test_only_selects_are_explained(statement: str, explained: bool):
+    stats = QueryStats(slow_ms=0, explain_sample_rate=1.0)
+    stats._engine = MagicMock()
+    stats._engine.pool.checkedout.return_value = 0
+    stats._engine.pool.size.return_value = 5
+    stats._explain = AsyncMock()
+
+    async def run() -> None:
+        record = stats.record(statement, 10)
+        stats._maybe_explain(record, statement, (1,))
+        # A second slow call within the cooldown is not explained again
+        stats._maybe_explain(record, statement, (1,))
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert stats._explain.await_count == int(explained)
+
+
+def test_failed_statement_does_not_leak_its_start_time():
+    engine = create_engine("sqlite://")
+    stats = QueryStats(slow_ms=1000)
+    stats.instrument(MagicMock(sync_engine=engine))
+
+    with engine.connect() as connection:
+        with pytest.raises(exc.OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+
+        assert connection.info["query_start"] == []
+    assert stats.statements[fingerprint("SELECT 1")].calls == 1
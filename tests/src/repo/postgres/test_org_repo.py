@@ -45,6 +45,17 @@ async def test_repository_get_org(db_session: AsyncSession):
     assert fetched.name == "get_me"
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_repository_get_org_selected_columns(db_session: AsyncSession):
+    repo = OrgRepository(db_session)
+    org = await repo.create(OrgCreate(name="narrow", config={"big": "blob"}))
+    await db_session.commit()
+
+    fetched = await repo.get(org.id, columns={"id", "name"})
+
+    assert dict(fetched) == {"id": org.id, "name": "narrow"}
+
+
 @pytest.mark.asyncio(loop_scope="session")
 async def test_repository_list_orgs(db_session: AsyncSession):
     repo = OrgRepository(db_session)
@@ -70,6 +81,7 @@ async def test_repository_update_org(db_session: AsyncSession):
 
     assert updated.name == "after"
     assert updated.config == {"k": "v"}
+    assert updated.version == org.version + 1
 
 
 @pytest.mark.asyncio(loop_scope="session")
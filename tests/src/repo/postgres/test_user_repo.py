@@ -48,7 +48,7 @@ async def test_service_register_user_persistence(
 async def test_db_isolation_and_truncation(db_session: AsyncSession):
     """
     Proof of isolation: Even if previous tests added users,
-    this test must see an empty table due to the truncate fixture.
+    this test must see an empty table because each test is rolled back.
     """
     result = await db_session.execute(select(User))
     users = result.scalars().all()
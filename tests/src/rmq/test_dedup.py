@@ -0,0 +1,40 @@
+import pytest
+
+from src.redis_client import MockRedisClient
+from src.rmq.dedup import DEDUP_HITS_KEY, DONE, PROCESSING, MessageDeduplicator
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_duplicate_is_dropped_after_completion(mock_redis: MockRedisClient):
+    dedup = MessageDeduplicator(mock_redis)
+
+    assert await dedup.claim("msg-done") is None
+    # A redelivery while the first consumer is still working
+    assert await dedup.claim("msg-done") == PROCESSING
+
+    await dedup.complete("msg-done")
+    assert await dedup.claim("msg-done") == DONE
+    assert dedup.hits == 2
+    assert int(await mock_redis.get(DEDUP_HITS_KEY)) >= 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_released_message_can_be_reclaimed(mock_redis: MockRedisClient):
+    dedup = MessageDeduplicator(mock_redis)
+
+    assert await dedup.claim("msg-failed") is None
+    await dedup.release("msg-failed")
+
+    assert await dedup.claim("msg-failed") is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_fails_open_without_redis(mock_redis: MockRedisClient):
+    # MockRedisClient is a singleton, so flip the flag instead of re-creating it
+    mock_redis.should_fail = True
+    dedup = MessageDeduplicator(mock_redis)
+    try:
+        assert await dedup.claim("msg-no-redis") is None
+        assert await dedup.claim("msg-no-redis") is None
+    finally:
+        mock_redis.should_fail = False
@@ -0,0 +1,52 @@
+import pytest
+
+from src.rmq.topology import (
+    RETRY_COUNT_HEADER,
+    dead_letter_queue_name,
+    defer,
+    retry_or_dead_letter,
+)
+
+
+class FakeMessage:
+    def __init__(self, headers: dict):
+        self.headers = headers
+        self.body = b"{}"
+        self.content_type = "application/json"
+        self.content_encoding = None
+        self.message_id = "msg-1"
+        self.correlation_id = None
+
+
+class FakeExchange:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, message, routing_key: str):
+        self.published.append((routing_key, message.headers))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_retry_counts_attempts_then_dead_letters():
+    exchange = FakeExchange()
+
+    assert await retry_or_dead_letter(FakeMessage({}), exchange, "q", max_retries=2)
+    assert exchange.published[-1] == ("q.retry.1", {RETRY_COUNT_HEADER: 1})
+
+    message = FakeMessage({RETRY_COUNT_HEADER: 2})
+    assert not await retry_or_dead_letter(message, exchange, "q", max_retries=2)
+    assert exchange.published[-1][0] == dead_letter_queue_name("q")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_defer_keeps_the_retry_budget():
+    exchange = FakeExchange()
+    message = FakeMessage({RETRY_COUNT_HEADER: 1, "traceparent": "x"})
+
+    for _ in range(10):
+        await defer(message, exchange, "q", max_retries=5)
+
+    assert exchange.published[-1] == (
+        "q.retry.5",
+        {RETRY_COUNT_HEADER: 1, "traceparent": "x"},
+    )
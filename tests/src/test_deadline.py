@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from src import deadline
+from src.app.middleware.deadline import DeadlineMiddleware
+from src.exceptions.request_exceptions import DeadlineExceededError
+from src.redis_client import MockRedisClient
+from src.services.job_service import RegistrationJobService
+
+
+def test_inner_deadline_cannot_extend_outer():
+    assert deadline.remaining() is None
+    with deadline.deadline(1):
+        with deadline.deadline(60):
+            assert deadline.remaining() <= 1
+        with deadline.deadline(0), pytest.raises(DeadlineExceededError):
+            deadline.check()
+    assert deadline.remaining() is None
+
+
+def test_timeout_header_overrides_route_default():
+    middleware = DeadlineMiddleware(
+        None, default=10, route_timeouts={"/slow/": 30}, max_timeout=60
+    )
+
+    def scope(path: str, timeout: bytes | None = None) -> dict:
+        headers = [(b"x-request-timeout", timeout)] if timeout else []
+        return {"type": "http", "path": path, "headers": headers}
+
+    assert middleware.timeout_for(scope("/user")) == 10
+    assert middleware.timeout_for(scope("/slow/job")) == 30
+    assert middleware.timeout_for(scope("/user", b"0.5")) == 0.5
+    assert middleware.timeout_for(scope("/user", b"600")) == 60
+    assert middleware.timeout_for(scope("/user", b"soon")) == 10
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_job_wait_returns_within_deadline(mock_redis: MockRedisClient):
+    jobs = RegistrationJobService(mock_redis)
+    await jobs.create("job-deadline")
+
+    with deadline.deadline(0.2):
+        job = await asyncio.wait_for(jobs.wait("job-deadline", 30), timeout=1)
+    assert not job.finished
@@ -0,0 +1,69 @@
+import logging
+import os
+import queue
+from pathlib import Path
+
+from src.logging_pipeline import (
+    DROP,
+    REDACTED,
+    BoundedQueueHandler,
+    DebugSampler,
+    LogPipeline,
+    per_process_filename,
+    redact,
+)
+
+
+def make_record(
+    level: int, msg: str = "cache hit for user, id=%s"
+) -> logging.LogRecord:
+    return logging.LogRecord("src.test", level, __file__, 1, msg, (1,), None)
+
+
+def test_redact_secrets():
+    message = redact(
+        "login password=hunter2 hash=$argon2id$v=19$m=65536$salt$hash "
+        "Authorization: eyJhbGciOi.eyJzdWIiOi.c2lnbmF0dXJl"
+    )
+    assert "hunter2" not in message
+    assert "argon2id" not in message
+    assert "eyJ" not in message
+    assert message.count(REDACTED) == 3
+
+
+def test_redact_quoted_keys():
+    as_dict = redact(str({"name": "bob", "password": "hunter2"}))
+    as_json = redact('{"name": "bob", "password": "hunter2", "org_id": 1}')
+    assert "hunter2" not in as_dict
+    assert "hunter2" not in as_json
+    assert "'name': 'bob'" in as_dict
+    assert '"org_id": 1' in as_json
+
+
+def test_debug_sampler_keeps_one_in_n_per_call_site():
+    sampler = DebugSampler(every=10)
+    kept = [sampler.filter(make_record(logging.DEBUG)) for _ in range(25)]
+    assert kept.count(True) == 3
+    assert kept[0]
+    # Other levels are never sampled
+    assert all(sampler.filter(make_record(logging.INFO)) for _ in range(25))
+
+
+def test_full_queue_drops_and_counts_low_levels():
+    handler = BoundedQueueHandler(queue.Queue(1), policy=DROP, block_timeout=0)
+    for _ in range(3):
+        handler.handle(make_record(logging.INFO))
+    handler.handle(make_record(logging.ERROR))
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == {"INFO": 2, "ERROR": 1}
+
+
+def test_each_process_gets_its_own_log_file(tmp_path: Path):
+    assert per_process_filename("logs/app.jsonl", 123) == "logs/app.123.jsonl"
+
+    pipeline = LogPipeline(
+        str(tmp_path / "logs.jsonl"), max_bytes=1024, backup_count=1, queue_size=10
+    )
+    file_handler = pipeline.listener.handlers[1]
+    assert file_handler.baseFilename == str(tmp_path / f"logs.{os.getpid()}.jsonl")
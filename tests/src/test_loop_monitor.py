@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from src.loop_monitor import LoopMonitor, detect_blocking
+
+
+def blocking_call() -> None:
+    time.sleep(0.2)
+
+
+def test_monitor_captures_the_blocking_stack():
+    async def run() -> LoopMonitor:
+        monitor = LoopMonitor(interval=0.01, threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_call()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+
+    assert len(monitor.stalls) == 1
+    assert "blocking_call" in monitor.stalls[0].stack
+
+
+def test_detect_blocking_reports_slow_callbacks():
+    async def slow() -> None:
+        blocking_call()
+
+    async def fast() -> None:
+        await asyncio.sleep(0)
+
+    with detect_blocking(budget=0.1) as detector:
+        asyncio.run(fast())
+        assert not detector.violations
+        asyncio.run(slow())
+
+    assert len(detector.violations) == 1
+    assert "slow" in detector.report()
+    # The hook is removed on exit
+    assert asyncio.events.Handle._run.__name__ == "_run"
+    assert asyncio.events.Handle._run.__module__ == "asyncio.events"
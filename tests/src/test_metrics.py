@@ -0,0 +1,108 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from src import metrics
+from src.metrics import (
+    MAX,
+    RETIRED,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    collect,
+    render,
+    retire_snapshot,
+)
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests", ["route"], registry=registry)
+    requests.labels("/user/{user_id}").inc()
+    requests.labels("/user/{user_id}").inc(2)
+    latency = Histogram(
+        "latency_seconds", "Latency", buckets=(0.1, 1), registry=registry
+    )
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = render(collect(registry, directory=None))
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/user/{user_id}"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+
+
+def test_callback_gauge_is_read_at_collection():
+    registry = Registry()
+    depth = {"value": 1}
+    gauge = Gauge("depth", "Depth", registry=registry)
+    gauge.set_function(lambda: depth["value"])
+    depth["value"] = 7
+
+    assert "depth 7" in render(collect(registry, directory=None))
+
+
+def write_snapshot(
+    directory: Path, pid: int, requests: int, depth: int, age: float = 0
+) -> Path:
+    registry = Registry()
+    Counter("requests_total", "Requests", registry=registry).inc(requests)
+    in_use = Gauge("in_use", "In use", registry=registry)
+    in_use.set(depth)
+    Gauge("depth", "Depth", multiprocess_mode=MAX, registry=registry).set(depth)
+    path = directory / f"{pid}.json"
+    path.write_text(json.dumps(registry.dump()))
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_merges_other_processes_snapshots(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(metrics, "_alive", lambda _pid: True)
+    write_snapshot(tmp_path, 1, requests=2, depth=3)
+    write_snapshot(tmp_path, 2, requests=5, depth=4)
+    # A hung worker: its counts still add up, its gauges no longer do
+    write_snapshot(tmp_path, 3, requests=1, depth=100, age=3600)
+
+    text = render(collect(Registry(), directory=str(tmp_path)))
+
+    assert "requests_total 8" in text
+    assert "in_use 7" in text
+    assert "depth 4" in text
+
+
+def test_dead_process_is_retired(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(metrics, "_alive", lambda pid: pid != 3)  # noqa: PLR2004
+    write_snapshot(tmp_path, 1, requests=2, depth=3)
+    dead = write_snapshot(tmp_path, 3, requests=1, depth=100)
+
+    for _ in range(2):
+        text = render(collect(Registry(), directory=str(tmp_path)))
+        # Counted once, and still counted after its snapshot is gone
+        assert "requests_total 3" in text
+        assert "in_use 3" in text
+        assert not dead.exists()
+    assert (tmp_path / RETIRED).exists()
+
+
+def test_exiting_process_hands_over_its_counts(tmp_path: Path):
+    registry = Registry()
+    Counter("requests_total", "Requests", registry=registry).inc(4)
+    write_snapshot(tmp_path, 1, requests=2, depth=3)
+
+    retire_snapshot(registry, directory=str(tmp_path))
+
+    assert not (tmp_path / f"{os.getpid()}.json").exists()
+    text = render(collect(Registry(), directory=str(tmp_path)))
+    assert "requests_total 6" in text
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from functools import partial
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src import profiling
+from src.app.middleware import profiling as profiling_middleware
+from src.app.middleware.profiling import ProfileMiddleware
+from src.auth.security import is_admin_key
+from src.exceptions.request_exceptions import ProfilerBusyError
+from src.profiling import collapsed, profile_call, sample_stacks
+
+
+def spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sample_stacks_collapses_the_target_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=spin, args=(stop,))
+    thread.start()
+    try:
+        samples = sample_stacks(thread.ident, duration=0.2, interval=0.005)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert sum(samples.values()) > 5
+    assert all("test_profiling:spin" in stack for stack in samples)
+    stack, count = collapsed(samples).splitlines()[0].rsplit(" ", 1)
+    assert stack.startswith("threading:")  # root frame first
+    assert int(count) > 0
+
+
+def test_profile_call_returns_stats():
+    async def handler() -> int:
+        await asyncio.sleep(0)
+        return 42
+
+    result, stats = asyncio.run(profile_call(handler))
+
+    assert result == 42
+    assert "handler" in stats
+
+
+def test_one_profile_at_a_time():
+    with profiling._busy, pytest.raises(ProfilerBusyError):
+        sample_stacks(threading.get_ident(), duration=0.01, interval=0.001)
+
+
+def test_is_admin_key_handles_non_ascii():
+    assert is_admin_key("s3cret", admin_key="s3cret")
+    assert not is_admin_key("sécret", admin_key="s3cret")
+    assert not is_admin_key("s3cret", admin_key=None)
+
+
+async def test_profile_middleware_rejects_non_ascii_admin_key(monkeypatch):
+    monkeypatch.setattr(
+        profiling_middleware, "is_admin_key", partial(is_admin_key, admin_key="s3cret")
+    )
+    app = FastAPI()
+    app.get("/ping")(lambda: {"ok": True})
+    app.add_middleware(ProfileMiddleware)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://"
+    ) as client:
+        response = await client.get(
+            "/ping",
+            headers={"x-profile": "1", "x-admin-key": "s\xe9cret".encode("latin-1")},
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
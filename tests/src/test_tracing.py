@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from src import tracing
+from src.tracing import InMemoryExporter, span, start_trace, trace_methods
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemoryExporter()
+    tracing.configure(exporter, sample_rate=1.0)
+    yield exporter
+    tracing.configure(None)
+
+
+@trace_methods
+class Service:
+    async def lookup(self) -> int:
+        with span("redis.get"):
+            await asyncio.sleep(0)
+        return 1
+
+
+def test_child_spans_join_the_trace(exporter: InMemoryExporter):
+    async def handle() -> None:
+        with start_trace("GET /user/{user_id}") as root:
+            await Service().lookup()
+        return root
+
+    root = asyncio.run(handle())
+
+    spans = {s.name: s for s in exporter.trace(root.trace_id)}
+    assert set(spans) == {"GET /user/{user_id}", "Service.lookup", "redis.get"}
+    assert spans["Service.lookup"].parent_id == root.span_id
+    assert spans["redis.get"].parent_id == spans["Service.lookup"].span_id
+    assert all(s.duration_ms is not None for s in spans.values())
+
+
+def test_traceparent_round_trip(exporter: InMemoryExporter):
+    with start_trace("publish") as root:
+        headers = tracing.inject({})
+    with start_trace("rmq.process", headers["traceparent"]) as child:
+        pass
+
+    assert child.trace_id == root.trace_id
+    assert child.parent_id == root.span_id
+    assert [s.name for s in exporter.trace(root.trace_id)] == ["publish", "rmq.process"]
+
+
+def test_unsampled_trace_records_nothing(exporter: InMemoryExporter):
+    tracing.configure(exporter, sample_rate=0.0)
+    with start_trace("GET /org/") as root, span("db.query") as child:
+        headers = tracing.inject({})
+
+    assert child is None
+    assert not exporter.spans
+    # The decision still travels downstream
+    assert headers["traceparent"].endswith("-00")
+    assert headers["traceparent"].split("-")[1] == root.trace_id
+
+
+def test_errors_are_recorded(exporter: InMemoryExporter):
+    with pytest.raises(KeyError), start_trace("GET /user/"):
+        raise KeyError
+
+    assert exporter.spans[0].error == "KeyError"